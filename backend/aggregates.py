@@ -0,0 +1,322 @@
+"""
+AI Audit Layer - Metrics Aggregates
+Incrementally maintained counters behind the dashboard metrics
+"""
+
+from typing import Optional, List, Dict, Tuple, Type
+import time
+
+import numpy as np
+
+from sketch import DDSketch
+
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+RESOLUTIONS = {"minute": MINUTE, "hour": HOUR, "day": DAY}
+
+# Seconds each bucket width is kept for; None keeps it forever. Every event
+# is counted at every width, so dropping an aged fine bucket loses detail but
+# never counts: the coarser bucket covering it already holds them.
+RETENTION: Dict[int, Optional[int]] = {
+    MINUTE: 2 * DAY,
+    HOUR: 90 * DAY,
+    DAY: None,
+}
+
+PERCENTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+
+
+def group_key(value: Optional[str]) -> str:
+    """Return the breakdown key of a categorical value; missing and empty values are "unknown"."""
+    return value or "unknown"
+
+
+class LatencySketches:
+    """Duration sketches overall, per model_name and per decision_type."""
+
+    __slots__ = ("overall", "by_model", "by_decision_type")
+
+    def __init__(self):
+        self.overall = DDSketch()
+        self.by_model: Dict[str, DDSketch] = {}
+        self.by_decision_type: Dict[str, DDSketch] = {}
+
+    def add(self, record: dict) -> None:
+        duration = record["duration_ms"]
+        self.overall.add(duration)
+        model = record["model_name"]
+        if model not in self.by_model:
+            self.by_model[model] = DDSketch()
+        self.by_model[model].add(duration)
+        dtype = group_key(record.get("decision_type"))
+        if dtype not in self.by_decision_type:
+            self.by_decision_type[dtype] = DDSketch()
+        self.by_decision_type[dtype].add(duration)
+
+    def merge(self, other: "LatencySketches") -> None:
+        self.overall.merge(other.overall)
+        for mine, theirs in (
+            (self.by_model, other.by_model),
+            (self.by_decision_type, other.by_decision_type),
+        ):
+            for key, sketch in theirs.items():
+                if key not in mine:
+                    mine[key] = DDSketch()
+                mine[key].merge(sketch)
+
+
+def percentiles(sketch: DDSketch) -> Dict[str, Optional[float]]:
+    """Return p50/p95/p99 of a sketch, None when it is empty."""
+    return {name: sketch.quantile(q) for name, q in PERCENTILES.items()}
+
+
+# Bins the latency sketches put durations in
+LATENCY_BINS = DDSketch()
+
+
+def latency_bin(duration_ms: int) -> int:
+    """Return a duration's latency sketch bin, offset by one so 0 marks zero."""
+    return 0 if duration_ms == 0 else LATENCY_BINS.key(duration_ms) + 1
+
+
+def sketch_from_counts(counts: np.ndarray) -> DDSketch:
+    """Build a latency sketch from per-bin counts indexed like latency_bin()."""
+    sketch = DDSketch()
+    for index in np.flatnonzero(counts).tolist():
+        sketch.add_bin(None if index == 0 else index - 1, int(counts[index]))
+    return sketch
+
+
+class Rollup:
+    """Counts, duration sum, outcome counts and latency sketches for one time bucket."""
+
+    __slots__ = ("count", "flagged", "duration_sum", "by_outcome", "latency")
+
+    def __init__(self):
+        self.count = 0
+        self.flagged = 0
+        self.duration_sum = 0
+        self.by_outcome: Dict[str, int] = {}
+        self.latency = LatencySketches()
+
+    def add(self, record: dict) -> None:
+        self.count += 1
+        if record.get("flagged"):
+            self.flagged += 1
+        self.duration_sum += record["duration_ms"]
+        outcome = group_key(record.get("decision_outcome"))
+        self.by_outcome[outcome] = self.by_outcome.get(outcome, 0) + 1
+        self.latency.add(record)
+
+    def merge(self, other: "Rollup") -> None:
+        self.count += other.count
+        self.flagged += other.flagged
+        self.duration_sum += other.duration_sum
+        for outcome, count in other.by_outcome.items():
+            self.by_outcome[outcome] = self.by_outcome.get(outcome, 0) + count
+        self.latency.merge(other.latency)
+
+    @property
+    def avg_duration_ms(self) -> float:
+        return self.duration_sum / self.count if self.count > 0 else 0
+
+
+class OrganizationRollup(Rollup):
+    """Rollup with the risk, flag and confidence breakdowns compliance reports need."""
+
+    __slots__ = ("by_risk_level", "flagged_by_model", "confidence_sum", "confidence_count")
+
+    def __init__(self):
+        super().__init__()
+        self.by_risk_level: Dict[str, int] = {}
+        self.flagged_by_model: Dict[str, int] = {}
+        self.confidence_sum: Dict[str, float] = {}
+        self.confidence_count: Dict[str, int] = {}
+
+    def add(self, record: dict) -> None:
+        super().add(record)
+        risk = group_key(record.get("risk_level"))
+        self.by_risk_level[risk] = self.by_risk_level.get(risk, 0) + 1
+        model = record["model_name"]
+        if record.get("flagged"):
+            self.flagged_by_model[model] = self.flagged_by_model.get(model, 0) + 1
+        if record.get("confidence_score") is not None:
+            self.confidence_sum[model] = self.confidence_sum.get(model, 0.0) + record["confidence_score"]
+            self.confidence_count[model] = self.confidence_count.get(model, 0) + 1
+
+    def merge(self, other: "OrganizationRollup") -> None:
+        super().merge(other)
+        for mine, theirs in (
+            (self.by_risk_level, other.by_risk_level),
+            (self.flagged_by_model, other.flagged_by_model),
+            (self.confidence_sum, other.confidence_sum),
+            (self.confidence_count, other.confidence_count),
+        ):
+            for key, value in theirs.items():
+                mine[key] = mine.get(key, 0) + value
+
+
+# Organizations are rolled up by day only, kept forever: their dashboards
+# read calendar-day windows and their reports whole days
+ORGANIZATION_RETENTION: Dict[int, Optional[int]] = {DAY: None}
+
+
+class TimeRollups:
+    """
+    Per-minute, per-hour and per-day rollup buckets keyed by bucket start.
+
+    Ingest updates one bucket per width. A window is answered by covering
+    it with the coarsest whole buckets that fit and filling the edges with
+    finer ones, so a month costs about 30 day-bucket reads. Edges older than
+    a width's retention are rounded out to the enclosing coarser bucket.
+    """
+
+    def __init__(
+        self,
+        retention: Optional[Dict[int, Optional[int]]] = None,
+        rollup: Type[Rollup] = Rollup,
+    ):
+        self.retention = dict(retention or RETENTION)
+        self._rollup = rollup
+        self._widths = sorted(self.retention, reverse=True)
+        self._buckets: Dict[int, Dict[int, Rollup]] = {width: {} for width in self._widths}
+
+    def add(self, record: dict, ts: int, now: Optional[float] = None) -> None:
+        """Count a record stamped `ts` (epoch seconds) in every retained width."""
+        now = time.time() if now is None else now
+        for width in self._widths:
+            keep = self.retention[width]
+            if keep is not None and ts < now - keep:
+                continue
+            buckets = self._buckets[width]
+            start = ts - ts % width
+            bucket = buckets.get(start)
+            if bucket is None:
+                bucket = buckets[start] = self._rollup()
+                if width == self._widths[-1]:
+                    self.compact(now)
+            bucket.add(record)
+
+    def compact(self, now: Optional[float] = None) -> None:
+        """Drop buckets that have aged past their width's retention."""
+        now = time.time() if now is None else now
+        for width, keep in self.retention.items():
+            if keep is None:
+                continue
+            cutoff = now - keep
+            buckets = self._buckets[width]
+            for start in [start for start in buckets if start + width <= cutoff]:
+                del buckets[start]
+
+    def _retained(self, width: int, start: int, now: float) -> bool:
+        keep = self.retention[width]
+        return keep is None or start >= now - keep
+
+    def _cover(self, start: int, end: int, level: int, total: Rollup, now: float) -> None:
+        width = self._widths[level]
+        first = -(-start // width) * width
+        last = end // width * width
+        finer = level + 1
+        can_refine = finer < len(self._widths) and self._retained(self._widths[finer], start, now)
+
+        if not can_refine:
+            # Finest usable width: round the window out to whole buckets
+            first = start - start % width
+            last = -(-end // width) * width
+        elif first >= last:
+            self._cover(start, end, finer, total, now)
+            return
+
+        buckets = self._buckets[width]
+        for bucket_start in range(first, last, width):
+            bucket = buckets.get(bucket_start)
+            if bucket is not None:
+                total.merge(bucket)
+
+        if can_refine:
+            if start < first:
+                self._cover(start, first, finer, total, now)
+            if last < end:
+                self._cover(last, end, finer, total, now)
+
+    def window(self, start: int, end: int, now: Optional[float] = None) -> Rollup:
+        """Merge the buckets covering [start, end) in epoch seconds."""
+        total = self._rollup()
+        if start < end:
+            self._cover(start, end, 0, total, time.time() if now is None else now)
+        return total
+
+    def series(self, width: int, start: int, end: int) -> List[Tuple[int, Rollup]]:
+        """Return (bucket_start, rollup) for every bucket of `width` from start to end inclusive."""
+        buckets = self._buckets[width]
+        first = start - start % width
+        return [
+            (bucket_start, buckets.get(bucket_start) or self._rollup())
+            for bucket_start in range(first, end + 1, width)
+        ]
+
+    def clear(self) -> None:
+        for buckets in self._buckets.values():
+            buckets.clear()
+
+
+class MetricsAggregator:
+    """
+    Running totals for /api/v1/metrics.
+
+    Updated in O(1) as each record is stored, so reading the metrics never
+    touches the records themselves. `rollups` holds the same figures bucketed
+    by event time for windowed metrics and charts, and `latency` the
+    all-time duration sketches. The store keeps one across all records and
+    one per organization, whose daily OrganizationRollup buckets also feed
+    compliance reports.
+    """
+
+    def __init__(
+        self,
+        retention: Optional[Dict[int, Optional[int]]] = None,
+        rollup: Type[Rollup] = Rollup,
+    ):
+        self._retention = retention
+        self._rollup = rollup
+        self.total = 0
+        self.flagged = 0
+        self.duration_sum = 0
+        self.by_outcome: Dict[str, int] = {}
+        self.by_model: Dict[str, int] = {}
+        self.by_decision_type: Dict[str, int] = {}
+        self.rollups = TimeRollups(retention, rollup)
+        self.latency = LatencySketches()
+
+    def add(self, record: dict, ts_ns: int) -> None:
+        """Fold a newly stored record, stamped ts_ns epoch nanoseconds, into the counters."""
+        self.total += 1
+        if record.get("flagged"):
+            self.flagged += 1
+        self.duration_sum += record["duration_ms"]
+
+        outcome = group_key(record.get("decision_outcome"))
+        self.by_outcome[outcome] = self.by_outcome.get(outcome, 0) + 1
+
+        model = record["model_name"]
+        self.by_model[model] = self.by_model.get(model, 0) + 1
+
+        dtype = group_key(record.get("decision_type"))
+        self.by_decision_type[dtype] = self.by_decision_type.get(dtype, 0) + 1
+
+        self.latency.add(record)
+        self.rollups.add(record, ts_ns // 1_000_000_000)
+
+    def clear(self) -> None:
+        self.__init__(self._retention, self._rollup)
+
+    def rate(self, count: int) -> float:
+        """Return count as a percentage of all records."""
+        return count / self.total * 100 if self.total > 0 else 0
+
+    @property
+    def avg_duration_ms(self) -> float:
+        return self.duration_sum / self.total if self.total > 0 else 0
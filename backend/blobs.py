@@ -0,0 +1,432 @@
+"""
+AI Audit Layer - Content-Addressed Blobs
+Store each distinct prompt and response body once, shared by reference
+"""
+
+from typing import Optional, List, Dict, Tuple, Iterator, Callable, Any
+from collections import OrderedDict
+from functools import lru_cache
+import hashlib
+import json
+import os
+import threading
+
+from storage import (
+    StorageBackend, SegmentLogStorage, RecordSource, encode_record, read_source, segment_locations,
+)
+
+
+# Record fields whose values are stored as blobs
+BLOB_FIELDS = ("prompt_content", "response_content")
+
+# Shorter values stay inline: a reference costs about 90 bytes
+BLOB_MIN_CHARS = 128
+
+# Encoded blobs cached in front of a durable blob log
+BLOB_CACHE_BYTES = 16 * 1024 * 1024
+
+# Distinct blobs remembered while one source is read
+BLOB_READ_CACHE = 256
+
+# A record with blobs is stored as {"$refs":[[position, field, sha256], ...],
+# ...fields...} where each field's value is null. Positions index the
+# record's plain encoding with the header removed, so a stored record is
+# rehydrated by splicing bytes; it is never decoded and encoded again.
+_REFS = b'{"$refs":'
+
+# Stands in for blob values while a record is encoded; random per process,
+# so no stored text can collide with it
+_HOLE = "\x00blob:" + os.urandom(16).hex()
+_HOLE_JSON = json.dumps(_HOLE).encode()
+
+# Blob log entries are {"id":"<sha256>","text":<encoded text>}
+_BLOB_PREFIX = len(b'{"id":"') + 64 + len(b'","text":')
+
+Reference = Tuple[int, str, str]  # (position, field, sha256)
+
+
+def blob_key(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def encode_deduplicated(record: dict) -> Tuple[bytes, List[Tuple[str, str]]]:
+    """
+    Encode a record with its long BLOB_FIELDS values left out.
+
+    Returns the payload and the (sha256, text) of each value left out. A
+    record with none is encoded exactly as encode_record() would.
+    """
+    names = [
+        name for name in record
+        if name in BLOB_FIELDS and isinstance(record[name], str) and len(record[name]) >= BLOB_MIN_CHARS
+    ]
+    if not names:
+        return encode_record(record), []
+
+    # Encode once with placeholders, then swap each for null
+    plain = encode_record({**record, **{name: _HOLE for name in names}})
+    pieces: List[bytes] = []
+    refs: List[bytes] = []
+    texts: List[Tuple[str, str]] = []
+    last = 0
+    for i, name in enumerate(names):
+        found = plain.index(_HOLE_JSON, last)
+        pieces.append(plain[last:found])
+        pieces.append(b"null")
+        last = found + len(_HOLE_JSON)
+        # Position of the null once earlier placeholders are swapped too
+        position = found - i * (len(_HOLE_JSON) - len(b"null"))
+        sha = blob_key(record[name])
+        refs.append(b'[%d,"%s","%s"]' % (position, name.encode(), sha.encode()))
+        texts.append((sha, record[name]))
+    pieces.append(plain[last:])
+    # The header replaces the plain encoding's opening brace
+    pieces[0] = _REFS + b"[" + b",".join(refs) + b"]," + pieces[0][1:]
+    return b"".join(pieces), texts
+
+
+def references(payload: bytes) -> Tuple[List[Reference], int]:
+    """Return a stored record's blob references and where its fields start."""
+    if not payload.startswith(_REFS):
+        return [], 0
+    # Neither fields nor hex digests contain "]]"
+    end = payload.index(b"]]", len(_REFS)) + 2
+    return [tuple(ref) for ref in json.loads(payload[len(_REFS):end])], end
+
+
+def rehydrate(payload: bytes, encoded: Callable[[str], Optional[bytes]]) -> Optional[bytes]:
+    """
+    Return a stored record's plain encoding, looking each blob's encoded
+    text up with `encoded`, or None if one is missing.
+    """
+    refs, end = references(payload)
+    if not refs:
+        return payload
+    # Field bytes after the header sit at their plain position + end
+    pieces = [b"{"]
+    last = end + 1
+    for position, _, sha in refs:
+        data = encoded(sha)
+        if data is None:
+            return None
+        pieces.append(payload[last:position + end])
+        pieces.append(data)
+        last = position + end + len(b"null")
+    pieces.append(payload[last:])
+    return b"".join(pieces)
+
+
+# Durable blob stores open in this process, by log directory, with the pid
+# that opened them: a forked worker inherits the entry but not the store's
+# threads, so it loads a BlobLogReader of its own instead
+_open_stores: Dict[str, Tuple[int, "BlobStore"]] = {}
+_readers: Dict[str, "BlobLogReader"] = {}
+
+
+class BlobLogReader:
+    """
+    Read-only view of a durable BlobStore's log for a process that did not
+    open it, such as a verification worker.
+
+    The sha256 -> location index is read from the log's files on first use
+    and again, at most once per refresh(), when a blob is not in it.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._locations: Dict[str, Tuple[str, int, int]] = {}
+        self._stale = True
+
+    def refresh(self) -> None:
+        """Allow the next lookup of an unknown blob to reload the index."""
+        self._stale = True
+
+    def encoded(self, sha: str) -> Optional[bytes]:
+        location = self._locations.get(sha)
+        if location is None and self._stale:
+            self._locations = segment_locations(self.directory)
+            self._stale = False
+            location = self._locations.get(sha)
+        if location is None:
+            return None
+        path, offset, length = location
+        for _, entry in read_source(("segment", path, [sha], [(offset, length)]), decode=False):
+            return entry[_BLOB_PREFIX:-1]
+        return None
+
+
+def _blob_lookup(blobs: Any) -> Callable[[str], Optional[bytes]]:
+    """Return the blob lookup of a dedup source's `blobs`."""
+    if isinstance(blobs, dict):
+        return blobs.get
+    opened = _open_stores.get(blobs)
+    if opened is not None and opened[0] == os.getpid():
+        return opened[1].encoded
+    reader = _readers.get(blobs)
+    if reader is None:
+        reader = _readers[blobs] = BlobLogReader(blobs)
+    reader.refresh()
+    return reader.encoded
+
+
+def read_deduplicated(source: RecordSource, decode: bool = True) -> Iterator[Tuple[str, Any]]:
+    """
+    read_source() for a ("dedup", source, blobs) source: reads the wrapped
+    source and splices each record's blobs back in. `blobs` is a durable
+    BlobStore's log directory or a dict of sha256 -> encoded text. Records
+    with a missing blob read as missing.
+    """
+    _, inner, blobs = source
+    # Records of one source mostly share a few templated bodies
+    encoded = lru_cache(maxsize=BLOB_READ_CACHE)(_blob_lookup(blobs))
+    load = json.loads if decode else bytes
+    for log_id, payload in read_source(inner, decode=False):
+        if payload is not None:
+            payload = rehydrate(payload, encoded)
+        yield log_id, None if payload is None else load(payload)
+
+
+class BlobStore:
+    """
+    Text bodies keyed by the SHA-256 of their content, with reference counts.
+
+    Bodies are kept JSON-encoded, as they appear inside a record. Without a
+    directory they live in memory and are freed when their last reference
+    is released. With one they are appended to a SegmentLogStorage there,
+    so only the key -> location index stays in memory, and the most
+    recently read bodies are cached. A durable body is never rewritten:
+    one whose references all went away is reused if the same text comes
+    back.
+
+    Reference counts are not stored; DedupStorage rebuilds them from the
+    records on its first full scan.
+    """
+
+    def __init__(self, directory: Optional[str] = None, cache_bytes: int = BLOB_CACHE_BYTES):
+        self._lock = threading.Lock()
+        self._refs: Dict[str, int] = {}
+        self._blobs: Dict[str, bytes] = {}
+        self.log = SegmentLogStorage(directory) if directory else None
+        if self.log is not None:
+            _open_stores[self.log.directory] = (os.getpid(), self)
+        self._token = 0
+        self.cache_bytes = cache_bytes
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cache_size = 0
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    def __contains__(self, sha: str) -> bool:
+        return sha in self._refs
+
+    def refcount(self, sha: str) -> int:
+        return self._refs.get(sha, 0)
+
+    def acquire(self, texts: List[Tuple[str, str]]) -> None:
+        """Take a reference to each (sha256, text), storing texts not yet held."""
+        ids: List[str] = []
+        payloads: List[bytes] = []
+        with self._lock:
+            for sha, text in texts:
+                if sha in self._refs:
+                    self._refs[sha] += 1
+                    continue
+                self._refs[sha] = 1
+                if self.log is None:
+                    self._blobs[sha] = json.dumps(text).encode()
+                elif sha not in self.log and sha not in ids:
+                    ids.append(sha)
+                    payloads.append(b'{"id":"' + sha.encode() + b'","text":' + json.dumps(text).encode() + b"}")
+            if ids:
+                self._token = self.log.append_payloads(ids, payloads)
+
+    def release(self, shas: List[str]) -> None:
+        """Drop one reference to each blob, freeing in-memory ones left unreferenced."""
+        with self._lock:
+            for sha in shas:
+                count = self._refs.get(sha, 0) - 1
+                if count > 0:
+                    self._refs[sha] = count
+                    continue
+                self._refs.pop(sha, None)
+                self._blobs.pop(sha, None)
+
+    def recount(self, counts: Dict[str, int]) -> None:
+        """Replace every reference count, as rebuilt from the stored records."""
+        with self._lock:
+            self._refs = dict(counts)
+
+    def encoded(self, sha: str) -> Optional[bytes]:
+        """Return a blob's JSON-encoded text, or None if it is not stored."""
+        if self.log is None:
+            return self._blobs.get(sha)
+        with self._lock:
+            data = self._cache.get(sha)
+            if data is not None:
+                self._cache.move_to_end(sha)
+                return data
+        payload = self.log.payload(sha)
+        if payload is None:
+            return None
+        data = payload[_BLOB_PREFIX:-1]
+        with self._lock:
+            if sha not in self._cache:
+                self._cache[sha] = data
+                self._cache_size += len(data)
+                while self._cache_size > self.cache_bytes and len(self._cache) > 1:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cache_size -= len(evicted)
+        return data
+
+    def text(self, sha: str) -> Optional[str]:
+        data = self.encoded(sha)
+        return None if data is None else json.loads(data)
+
+    async def wait_durable(self) -> None:
+        """Return once every blob stored so far is durable."""
+        if self.log is not None:
+            await self.log.wait_durable(self._token)
+
+    def usage(self) -> Dict[str, int]:
+        """
+        Blobs referenced, references to them, their bytes, and the bytes
+        their sharing saves over storing every reference's copy.
+        """
+        with self._lock:
+            refs = dict(self._refs)
+        lengths = {sha: len(self.encoded(sha) or b"") for sha in refs}
+        return {
+            "blobs": len(refs),
+            "references": sum(refs.values()),
+            "bytes": sum(lengths.values()),
+            "deduplicated_bytes": sum(lengths[sha] * (count - 1) for sha, count in refs.items()),
+        }
+
+    def close(self) -> None:
+        if self.log is not None:
+            if _open_stores.get(self.log.directory, (None, None))[1] is self:
+                del _open_stores[self.log.directory]
+            self.log.close()
+
+
+class DedupStorage(StorageBackend):
+    """
+    Storage engine wrapper that stores each distinct long prompt and
+    response body once, in a BlobStore, and records keep references.
+
+    Identical bodies, as templated prompts produce, then cost one copy in
+    memory and on disk however many records share them, and ingest skips
+    encoding a body it already holds. Reads rehydrate records to exactly
+    what encode_record() produces for them. sources() leaves that to
+    whoever reads them: with a durable BlobStore they name its log
+    directory, so worker processes open the blobs themselves.
+
+    A record written again under its id releases the references of its
+    previous copy. Records whose blobs were lost (an unacknowledged write
+    torn by a crash between the two logs) are left out of scans.
+    """
+
+    def __init__(self, inner: StorageBackend, blobs: Optional[BlobStore] = None):
+        self.inner = inner
+        self.blobs = blobs if blobs is not None else BlobStore()
+        # Reference counts of records already stored are rebuilt by the
+        # first full scan, which opening an AuditLogStore performs
+        self._counted = len(inner) == 0
+
+    def append(self, records: List[dict]) -> int:
+        payloads: List[bytes] = []
+        texts: List[Tuple[str, str]] = []
+        released: List[str] = []
+        batch: Dict[str, List[str]] = {}
+        for record in records:
+            payload, record_texts = encode_deduplicated(record)
+            payloads.append(payload)
+            texts.extend(record_texts)
+
+            log_id = record["id"]
+            if log_id in batch:
+                released.extend(batch[log_id])
+            elif log_id in self.inner:
+                released.extend(self._stored_references(log_id))
+            batch[log_id] = [sha for sha, _ in record_texts]
+
+        self.blobs.acquire(texts)
+        token = self.inner.append_encoded(records, payloads)
+        self.blobs.release(released)
+        return token
+
+    def append_encoded(self, records: List[dict], payloads: List[bytes]) -> int:
+        return self.append(records)
+
+    def _stored_references(self, log_id: str) -> List[str]:
+        record = self.inner.get(log_id)
+        return [sha for _, _, sha in (record or {}).get("$refs", [])]
+
+    async def wait_durable(self, token: int) -> None:
+        await self.blobs.wait_durable()
+        await self.inner.wait_durable(token)
+
+    def _fill(self, record: dict) -> Optional[dict]:
+        for _, name, sha in record.pop("$refs", []):
+            text = self.blobs.text(sha)
+            if text is None:
+                return None
+            record[name] = text
+        return record
+
+    def rehydrate(self, payload: bytes) -> Optional[bytes]:
+        """Return a stored record's plain encoding, or None if a blob is missing."""
+        return rehydrate(payload, self.blobs.encoded)
+
+    def get(self, log_id: str) -> Optional[dict]:
+        record = self.inner.get(log_id)
+        return None if record is None else self._fill(record)
+
+    def scan(self) -> Iterator[dict]:
+        counting = not self._counted
+        counts: Dict[str, int] = {}
+        for record in self.inner.scan():
+            if counting:
+                for _, _, sha in record.get("$refs", []):
+                    counts[sha] = counts.get(sha, 0) + 1
+            record = self._fill(record)
+            if record is not None:
+                yield record
+        if counting:
+            self.blobs.recount(counts)
+            self._counted = True
+
+    def sources(self, log_ids: List[str]) -> List[RecordSource]:
+        """
+        The inner engine's sources, wrapped as ("dedup", source, blobs) for
+        read_source() to rehydrate. With a durable BlobStore, `blobs` is its
+        log directory. In-memory blobs have no files to open, so each source
+        carries the blobs its records reference.
+        """
+        if self.blobs.log is not None:
+            directory = self.blobs.log.directory
+            return [("dedup", source, directory) for source in self.inner.sources(log_ids)]
+        sources: List[RecordSource] = []
+        for source in self.inner.sources(log_ids):
+            blobs: Dict[str, bytes] = {}
+            for _, payload in read_source(source, decode=False):
+                for _, _, sha in references(payload)[0] if payload is not None else []:
+                    data = self.blobs.encoded(sha)
+                    if data is not None:
+                        blobs[sha] = data
+            sources.append(("dedup", source, blobs))
+        return sources
+
+    def __len__(self) -> int:
+        return len(self.inner)
+
+    def __contains__(self, log_id: str) -> bool:
+        return log_id in self.inner
+
+    def usage(self) -> Dict[str, int]:
+        return self.blobs.usage()
+
+    def close(self) -> None:
+        self.inner.close()
+        self.blobs.close()
@@ -0,0 +1,341 @@
+"""
+AI Audit Layer - Columnar Records
+Compact column-oriented storage for the in-memory summary of each audit record
+"""
+
+from typing import Optional, List, Dict, Any, Tuple, Union
+from datetime import datetime, timedelta, timezone
+import math
+import sys
+
+import numpy as np
+
+from aggregates import latency_bin
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Stored in integer columns for a missing value
+NULL_INT = -(2 ** 63)
+INT_MAX = 2 ** 63 - 1
+
+# Rows of a column to operate on: a contiguous slice or an array of row numbers
+Selection = Union[slice, np.ndarray]
+
+# A record's latency bin, content hash digest and indexed_at epoch_ns
+Prepared = Tuple[int, bytes, int]
+
+
+def epoch_ns(value: Union[datetime, str]) -> int:
+    """Convert a datetime (naive values are taken as UTC) or ISO string to epoch nanoseconds."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - _EPOCH
+    return ((delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds) * 1000
+
+
+class GrowableArray:
+    """
+    Append-only NumPy buffer with amortised O(1) appends.
+
+    Capacity doubles when full; view() returns the filled prefix without
+    copying, so vectorised reads see the column as a plain ndarray.
+    """
+
+    __slots__ = ("_data", "_length")
+
+    def __init__(self, dtype, capacity: int = 64):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._length = 0
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._length + extra
+        if needed > len(self._data):
+            grown = np.empty(max(needed, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self._length] = self._data[:self._length]
+            self._data = grown
+
+    def append(self, value) -> None:
+        if self._length == len(self._data):
+            self._reserve(1)
+        self._data[self._length] = value
+        self._length += 1
+
+    def insert(self, position: int, value) -> None:
+        """Insert before `position`, shifting the tail up by one."""
+        self._reserve(1)
+        self._data[position + 1:self._length + 1] = self._data[position:self._length]
+        self._data[position] = value
+        self._length += 1
+
+    def view(self) -> np.ndarray:
+        return self._data[:self._length]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes allocated, spare capacity included."""
+        return self._data.nbytes
+
+    def __getitem__(self, index: int):
+        if index >= self._length:
+            raise IndexError(index)
+        return self._data[index].item()
+
+    def __len__(self) -> int:
+        return self._length
+
+
+class CategoricalColumn:
+    """
+    Dictionary-encoded column.
+
+    Each distinct value (None included) is stored once in `values`; rows
+    hold a 32-bit code into it, so a low-cardinality string costs four
+    bytes per row instead of a pointer to a string object, and equality
+    filters and group-bys run over the integer codes.
+    """
+
+    __slots__ = ("values", "codes", "_lookup")
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self.codes = GrowableArray(np.uint32)
+        self._lookup: Dict[Any, int] = {}
+
+    def append(self, value: Any) -> None:
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def code(self, value: Any) -> Optional[int]:
+        """Return the code of a value, or None if no row holds it."""
+        return self._lookup.get(value)
+
+    def counts(self, selection: Selection, mask: Optional[np.ndarray] = None) -> Dict[Any, int]:
+        """Count each value over the selected rows with a single bincount."""
+        codes = self.codes.view()[selection]
+        if mask is not None:
+            codes = codes[mask]
+        counts = np.bincount(codes, minlength=len(self.values))
+        return {self.values[code]: int(counts[code]) for code in np.flatnonzero(counts)}
+
+    def __getitem__(self, row: int) -> Any:
+        return self.values[self.codes[row]]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + sum(sys.getsizeof(value) for value in self.values)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+class BitColumn:
+    """Boolean column packed eight rows to a byte."""
+
+    __slots__ = ("bits", "_length")
+
+    def __init__(self):
+        self.bits = GrowableArray(np.uint8)
+        self._length = 0
+
+    def append(self, value: bool) -> None:
+        if self._length % 8 == 0:
+            self.bits.append(0)
+        if value:
+            self.bits.view()[-1] |= 1 << (self._length % 8)
+        self._length += 1
+
+    def take(self, selection: Selection) -> np.ndarray:
+        """Return the selected rows as a boolean array, reading only the bytes that hold them."""
+        if isinstance(selection, slice):
+            start, stop, _ = selection.indices(self._length)
+            stop = max(start, stop)
+            bits = np.unpackbits(self.bits.view()[start >> 3:(stop + 7) >> 3], bitorder="little")
+            return bits[start & 7:(start & 7) + stop - start].view(np.bool_)
+        rows = np.asarray(selection, dtype=np.int64)
+        return (self.bits.view()[rows >> 3] >> (rows & 7) & 1).astype(np.bool_)
+
+    def __getitem__(self, row: int) -> bool:
+        return bool(self.bits[row >> 3] >> (row & 7) & 1)
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    def __len__(self) -> int:
+        return self._length
+
+
+class ColumnStore:
+    """
+    Summary columns for every stored record, addressed by row number.
+
+    Repeated strings are dictionary-encoded, counts and timestamps live in
+    64-bit integer arrays (NULL_INT for missing), confidence scores in a
+    float array (NaN for missing) and `flagged` in a bit column; indexed_at
+    is kept as epoch nanoseconds like the timestamp. Content
+    hashes are kept as raw digests, and each duration's latency sketch bin
+    is precomputed so percentiles over any row set are one bincount. Prompt
+    and response text are never held here; the full record stays in the
+    storage engine until asked for.
+
+    Filters are evaluated as boolean masks over whole column slices and
+    group-bys as bincounts of the codes, never row by row in Python.
+    """
+
+    CATEGORICAL = (
+        "organization_id",
+        "user_id",
+        "decision_type",
+        "decision_outcome",
+        "model_provider",
+        "model_name",
+        "risk_level",
+    )
+    INTEGER = ("duration_ms", "prompt_tokens", "response_tokens", "chain_seq")
+    FLOAT = ("confidence_score",)
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.request_ids: List[str] = []
+        self.timestamps = GrowableArray(np.int64)
+        self.indexed_at = GrowableArray(np.int64)
+        self.categorical: Dict[str, CategoricalColumn] = {
+            name: CategoricalColumn() for name in self.CATEGORICAL
+        }
+        self.integer: Dict[str, GrowableArray] = {name: GrowableArray(np.int64) for name in self.INTEGER}
+        self.floats: Dict[str, GrowableArray] = {name: GrowableArray(np.float64) for name in self.FLOAT}
+        self.flagged = BitColumn()
+        self.content_hashes = bytearray()
+        self.latency_bins = GrowableArray(np.uint16)
+        # Bytes held by the id and request_id strings
+        self._string_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the columns, including id strings and spare capacity."""
+        arrays = [self.timestamps, self.indexed_at, self.flagged, self.latency_bins]
+        arrays += list(self.categorical.values())
+        arrays += list(self.integer.values())
+        arrays += list(self.floats.values())
+        return (
+            sum(column.nbytes for column in arrays)
+            + sys.getsizeof(self.ids) + sys.getsizeof(self.request_ids) + self._string_bytes
+            + sys.getsizeof(self.content_hashes)
+        )
+
+    @classmethod
+    def prepare(cls, record: dict) -> Prepared:
+        """
+        Return a record's latency bin, content hash digest and indexed_at
+        epoch_ns (NULL_INT if unset), raising ValueError for any value the
+        columns cannot hold. Checked before a record is stored, so nothing
+        fails once it has been.
+        """
+        for name in cls.INTEGER:
+            value = record.get(name)
+            if value is not None and not NULL_INT < value <= INT_MAX:
+                raise ValueError(f"{name} does not fit a 64-bit integer column: {value}")
+        duration = record["duration_ms"]
+        if duration < 0:
+            raise ValueError(f"duration_ms must not be negative: {duration}")
+        digest = bytes.fromhex(record.get("content_hash") or "0" * 64)
+        if len(digest) != 32:
+            raise ValueError("content_hash must be a SHA-256 hex digest")
+        indexed_at = record.get("indexed_at")
+        indexed_ns = NULL_INT if indexed_at is None else epoch_ns(indexed_at)
+        return latency_bin(duration), digest, indexed_ns
+
+    def append(self, record: dict, ts_ns: int, prepared: Optional[Prepared] = None) -> int:
+        """
+        Add a record stamped ts_ns epoch nanoseconds and return its row
+        number; `prepared` is its prepare() result, computed here if None.
+        """
+        latency, digest, indexed_ns = prepared if prepared is not None else self.prepare(record)
+        row = len(self.ids)
+        self.ids.append(record["id"])
+        self.request_ids.append(record["request_id"])
+        self._string_bytes += sys.getsizeof(record["id"]) + sys.getsizeof(record["request_id"])
+        self.timestamps.append(ts_ns)
+        self.indexed_at.append(indexed_ns)
+        for name, column in self.categorical.items():
+            column.append(record.get(name))
+        for name, column in self.integer.items():
+            value = record.get(name)
+            column.append(NULL_INT if value is None else value)
+        for name, column in self.floats.items():
+            value = record.get(name)
+            column.append(math.nan if value is None else value)
+        self.flagged.append(bool(record.get("flagged")))
+        self.content_hashes += digest
+        self.latency_bins.append(latency)
+        return row
+
+    def mask(self, filters: Dict[str, Any], selection: Selection) -> Optional[np.ndarray]:
+        """
+        Return a boolean mask over the selected rows matching every equality
+        filter, or None when there are no filters. Raises KeyError for a
+        field that cannot be filtered on.
+        """
+        mask = None
+        for name, value in filters.items():
+            if name == "flagged":
+                matches = self.flagged.take(selection) == bool(value)
+            elif name in self.categorical:
+                column = self.categorical[name]
+                code = column.code(value)
+                if code is None:
+                    return np.zeros(len(self.timestamps.view()[selection]), dtype=bool)
+                matches = column.codes.view()[selection] == code
+            else:
+                raise KeyError(f"No index on field: {name}")
+            mask = matches if mask is None else np.logical_and(mask, matches, out=mask)
+        return mask
+
+    def timestamp(self, row: int) -> datetime:
+        return _EPOCH + timedelta(microseconds=self.timestamps[row] // 1000)
+
+    def row(self, row: int) -> dict:
+        """Rebuild the summary dict of a row."""
+        return self.rows(np.array([row]))[0]
+
+    def rows(self, rows: np.ndarray) -> List[dict]:
+        """Rebuild summary dicts for many rows, gathering each column once."""
+        rows = np.asarray(rows, dtype=np.int64)
+        columns: Dict[str, list] = {
+            "id": [self.ids[row] for row in rows.tolist()],
+            "request_id": [self.request_ids[row] for row in rows.tolist()],
+            "timestamp": [
+                _EPOCH + timedelta(microseconds=ts // 1000)
+                for ts in self.timestamps.view()[rows].tolist()
+            ],
+            "indexed_at": [
+                None if ts == NULL_INT else (_EPOCH + timedelta(microseconds=ts // 1000)).isoformat()
+                for ts in self.indexed_at.view()[rows].tolist()
+            ],
+            "flagged": self.flagged.take(rows).tolist(),
+            "content_hash": [
+                bytes(self.content_hashes[row * 32:row * 32 + 32]).hex() for row in rows.tolist()
+            ],
+        }
+        for name, column in self.categorical.items():
+            values = column.values
+            columns[name] = [values[code] for code in column.codes.view()[rows].tolist()]
+        for name, column in self.integer.items():
+            columns[name] = [
+                None if value == NULL_INT else value for value in column.view()[rows].tolist()
+            ]
+        for name, column in self.floats.items():
+            columns[name] = [
+                None if math.isnan(value) else value for value in column.view()[rows].tolist()
+            ]
+        names = list(columns)
+        return [dict(zip(names, values)) for values in zip(*columns.values())]
@@ -0,0 +1,179 @@
+"""
+AI Audit Layer - Bulk Export
+Encode batches of stored records as NDJSON, CSV or Parquet byte chunks
+"""
+
+from typing import List, Dict, Any, Iterable, Iterator
+from datetime import datetime
+import csv
+import io
+import json
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# Columns of CSV and Parquet exports, in order
+EXPORT_FIELDS = (
+    "id",
+    "request_id",
+    "timestamp",
+    "duration_ms",
+    "user_id",
+    "session_id",
+    "organization_id",
+    "prompt_hash",
+    "prompt_content",
+    "prompt_tokens",
+    "response_content",
+    "response_tokens",
+    "model_provider",
+    "model_name",
+    "model_parameters",
+    "decision_type",
+    "decision_outcome",
+    "confidence_score",
+    "reasoning",
+    "factors",
+    "compliance_tags",
+    "risk_level",
+    "metadata",
+    "content_hash",
+    "flagged",
+    "indexed_at",
+    "chain_seq",
+    "chain_hash",
+)
+
+# Records per Parquet row group
+PARQUET_ROW_GROUP = 16384
+
+# Nested fields, written as JSON text in flat formats
+JSON_FIELDS = ("model_parameters", "factors", "compliance_tags", "metadata")
+
+
+def _flatten(record: dict) -> Dict[str, Any]:
+    row = {name: record.get(name) for name in EXPORT_FIELDS}
+    for name in JSON_FIELDS:
+        if row[name] is not None:
+            row[name] = json.dumps(row[name], separators=(",", ":"))
+    return row
+
+
+def ndjson_chunks(batches: Iterable[List[bytes]]) -> Iterator[bytes]:
+    """One JSON object per line, passed through from storage undecoded."""
+    for batch in batches:
+        yield b"".join(payload + b"\n" for payload in batch)
+
+
+def csv_chunks(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    """A header row, then one row per record with nested fields as JSON."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for batch in batches:
+        writer.writerows(_flatten(record) for record in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink:
+    """Write-only file that hands written bytes out in chunks."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _parquet_schema():
+    return pa.schema([
+        ("id", pa.string()),
+        ("request_id", pa.string()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("duration_ms", pa.int64()),
+        ("user_id", pa.string()),
+        ("session_id", pa.string()),
+        ("organization_id", pa.string()),
+        ("prompt_hash", pa.string()),
+        ("prompt_content", pa.string()),
+        ("prompt_tokens", pa.int64()),
+        ("response_content", pa.string()),
+        ("response_tokens", pa.int64()),
+        ("model_provider", pa.string()),
+        ("model_name", pa.string()),
+        ("model_parameters", pa.string()),
+        ("decision_type", pa.string()),
+        ("decision_outcome", pa.string()),
+        ("confidence_score", pa.float64()),
+        ("reasoning", pa.string()),
+        ("factors", pa.string()),
+        ("compliance_tags", pa.string()),
+        ("risk_level", pa.string()),
+        ("metadata", pa.string()),
+        ("content_hash", pa.string()),
+        ("flagged", pa.bool_()),
+        ("indexed_at", pa.string()),
+        ("chain_seq", pa.int64()),
+        ("chain_hash", pa.string()),
+    ])
+
+
+def parquet_chunks(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    """A Parquet file with one row group per batch, streamed as it is written."""
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for batch in batches:
+            columns: Dict[str, list] = {name: [] for name in EXPORT_FIELDS}
+            for record in batch:
+                for name, value in _flatten(record).items():
+                    columns[name].append(value)
+            columns["timestamp"] = [
+                datetime.fromisoformat(value.replace("Z", "+00:00")) if isinstance(value, str) else value
+                for value in columns["timestamp"]
+            ]
+            writer.write_table(pa.table(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def parquet_available() -> bool:
+    return pq is not None
+
+
+# format -> (media type, file extension, encoder, whether it takes decoded records)
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson", ndjson_chunks, False),
+    "csv": ("text/csv", "csv", csv_chunks, True),
+    "parquet": ("application/vnd.apache.parquet", "parquet", parquet_chunks, True),
+}
@@ -0,0 +1,429 @@
+"""
+AI Audit Layer - Integrity Ledger
+Per-organization hash chains and Merkle checkpoints over stored audit logs
+"""
+
+from typing import Optional, List, Dict, Any, Iterable, Tuple, Union
+from datetime import datetime, timezone
+import hashlib
+import json
+import os
+
+
+CHECKPOINT_INTERVAL = 1024
+MAX_REPORTED_FAILURES = 100
+
+_GENESIS = bytes(32)
+
+
+def content_hash(
+    timestamp: Union[datetime, str],
+    prompt_hash: str,
+    response_content: str,
+    model_name: str,
+) -> str:
+    """SHA-256 content hash of a log; stored ISO timestamps hash like the datetime they came from."""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    content = f"{timestamp}{prompt_hash}{response_content}{model_name}"
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def leaf_hash(log_id: str, content_hash: str) -> bytes:
+    """Merkle leaf of a log: binds its id to its content hash."""
+    return hashlib.sha256(b"\x00" + log_id.encode() + bytes.fromhex(content_hash)).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def chain_hash(previous: bytes, leaf: bytes) -> bytes:
+    return hashlib.sha256(previous + leaf).digest()
+
+
+def _split(size: int) -> int:
+    """Largest power of two strictly less than size (size > 1)."""
+    return 1 << ((size - 1).bit_length() - 1)
+
+
+class MerkleLog:
+    """
+    Append-only Merkle tree in the RFC 6962 shape.
+
+    Every complete subtree's root is stored as it closes, level by level,
+    so appends cost O(1) amortised hashes and the root of any prefix, or any
+    sibling on an inclusion path, is assembled from O(log N) stored nodes.
+    """
+
+    __slots__ = ("levels",)
+
+    def __init__(self):
+        self.levels: List[bytearray] = [bytearray()]
+
+    def __len__(self) -> int:
+        return len(self.levels[0]) // 32
+
+    def node(self, level: int, index: int) -> bytes:
+        return bytes(self.levels[level][index * 32:(index + 1) * 32])
+
+    def append(self, leaf: bytes) -> None:
+        self.levels[0] += leaf
+        index = len(self) - 1
+        level = 0
+        # Close every subtree this leaf completes
+        while index & 1:
+            parent = node_hash(self.node(level, index - 1), self.node(level, index))
+            level += 1
+            if level == len(self.levels):
+                self.levels.append(bytearray())
+            self.levels[level] += parent
+            index >>= 1
+
+    def _range_root(self, start: int, size: int) -> bytes:
+        if size & (size - 1) == 0 and start % size == 0:
+            return self.node(size.bit_length() - 1, start // size)
+        k = _split(size)
+        return node_hash(self._range_root(start, k), self._range_root(start + k, size - k))
+
+    def root(self, size: Optional[int] = None) -> bytes:
+        """Return the root of the tree over the first `size` leaves."""
+        size = len(self) if size is None else size
+        if size == 0:
+            return hashlib.sha256(b"").digest()
+        return self._range_root(0, size)
+
+    def inclusion_proof(self, index: int, size: int) -> List[bytes]:
+        """Return the audit path of leaf `index` in the tree of `size` leaves."""
+        path = []
+        start = 0
+        while size > 1:
+            k = _split(size)
+            if index < k:
+                path.append(self._range_root(start + k, size - k))
+                size = k
+            else:
+                path.append(self._range_root(start, k))
+                start += k
+                index -= k
+                size -= k
+        return path[::-1]
+
+
+def verify_inclusion(leaf: bytes, index: int, size: int, proof: List[bytes], root: bytes) -> bool:
+    """Check an inclusion proof (RFC 9162, section 2.1.3.2)."""
+    if index >= size:
+        return False
+    fn, sn = index, size - 1
+    result = leaf
+    for sibling in proof:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            result = node_hash(sibling, result)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            result = node_hash(result, sibling)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and result == root
+
+
+class OrganizationChain:
+    """Hash chain, Merkle log and checkpoints of one organization."""
+
+    __slots__ = ("tree", "chain", "checkpoints")
+
+    def __init__(self):
+        self.tree = MerkleLog()
+        self.chain = bytearray()
+        self.checkpoints: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.tree)
+
+    def chain_at(self, seq: int) -> bytes:
+        if seq < 0:
+            return _GENESIS
+        return bytes(self.chain[seq * 32:(seq + 1) * 32])
+
+
+class IntegrityLedger:
+    """
+    Tamper evidence for stored audit logs, kept per organization.
+
+    Each log takes the next sequence number in its organization's chain and
+    a chain hash over the previous chain hash and its Merkle leaf, so a
+    deleted, reordered or altered log breaks every later link. The leaves
+    also feed a Merkle log, and every `checkpoint_interval` logs its root is
+    recorded as a checkpoint; auditors can pin those roots and later check
+    a single log with an O(log N) inclusion proof.
+
+    Records arriving with chain fields (when a store is rebuilt from its
+    storage engine) are checked against the recomputed chain, and any
+    disagreement is kept in `breaks`.
+
+    Checkpoints are only durable once restore() has given the ledger a
+    file: from then on each is appended and fsynced there as it is
+    recorded, as is every chain's head on close(). A rebuilt ledger is
+    checked against that file by restore(), so records rewritten or
+    removed from storage while the service was down are caught even when
+    their chain fields were rewritten to match.
+    """
+
+    def __init__(self, checkpoint_interval: int = CHECKPOINT_INTERVAL):
+        self.checkpoint_interval = checkpoint_interval
+        self.organizations: Dict[str, OrganizationChain] = {}
+        self.breaks: List[Dict[str, Any]] = []
+        self.path: Optional[str] = None
+
+    def get(self, organization_id: str) -> Optional[OrganizationChain]:
+        return self.organizations.get(organization_id)
+
+    def link(self, records: List[dict]) -> List[Tuple[str, bytes, bytes]]:
+        """
+        Set chain_seq and chain_hash on records about to be stored, in
+        order, without extending any chain. Pass the result to extend()
+        once the records are stored.
+        """
+        links: List[Tuple[str, bytes, bytes]] = []
+        # Sequence number and chain hash each organization's next record follows
+        heads: Dict[str, Tuple[int, bytes]] = {}
+        for record in records:
+            org_id = record["organization_id"]
+            if org_id not in heads:
+                org = self.organizations.get(org_id)
+                seq = 0 if org is None else len(org)
+                heads[org_id] = (seq, _GENESIS if org is None else org.chain_at(seq - 1))
+            seq, previous = heads[org_id]
+            leaf = leaf_hash(record["id"], record["content_hash"])
+            link = chain_hash(previous, leaf)
+            record["chain_seq"] = seq
+            record["chain_hash"] = link.hex()
+            heads[org_id] = (seq + 1, link)
+            links.append((org_id, leaf, link))
+        return links
+
+    def extend(self, links: List[Tuple[str, bytes, bytes]], created_at: Optional[str] = None) -> None:
+        """Append links made by link() to their chains, recording any checkpoints they reach."""
+        for org_id, leaf, link in links:
+            org = self.organizations.get(org_id)
+            if org is None:
+                org = self.organizations[org_id] = OrganizationChain()
+            org.tree.append(leaf)
+            org.chain += link
+            if len(org) % self.checkpoint_interval == 0:
+                self._checkpoint(org_id, org, created_at)
+
+    def add(self, record: dict) -> None:
+        """
+        Link a stored record into its organization's chain, checking any
+        chain fields it arrived with.
+        """
+        stored = (record.get("chain_seq"), record.get("chain_hash"))
+        links = self.link([record])
+        if stored[1] is not None and stored != (record["chain_seq"], record["chain_hash"]):
+            self.breaks.append({
+                "organization_id": record["organization_id"],
+                "chain_seq": record["chain_seq"],
+                "audit_log_id": record["id"],
+                "reason": "stored chain hash does not match the recomputed chain",
+            })
+        self.extend(links, record.get("indexed_at"))
+
+    def _checkpoint(self, org_id: str, org: OrganizationChain, created_at: Optional[str]) -> Dict[str, Any]:
+        checkpoint = self._checkpoint_at(org, len(org), created_at)
+        org.checkpoints.append(checkpoint)
+        if self.path is not None:
+            self._persist([(org_id, checkpoint)])
+        return checkpoint
+
+    def _persist(self, checkpoints: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Append checkpoints to the ledger file and fsync it."""
+        lines = b"".join(
+            json.dumps({"organization_id": org_id, **checkpoint}, separators=(",", ":")).encode() + b"\n"
+            for org_id, checkpoint in checkpoints
+        )
+        with open(self.path, "ab") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _load(path: str) -> List[Dict[str, Any]]:
+        """Read persisted checkpoints; a line torn by a crash ends the file."""
+        checkpoints = []
+        try:
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        checkpoints.append(json.loads(line))
+                    except ValueError:
+                        break
+        except FileNotFoundError:
+            pass
+        return checkpoints
+
+    def restore(self, path: str) -> None:
+        """
+        Check the chains rebuilt from storage against the checkpoints
+        persisted at `path`, then keep persisting checkpoints there.
+
+        A persisted root the rebuilt tree does not reproduce, or a tree now
+        smaller than a persisted checkpoint, is kept in `breaks`. Persisted
+        checkpoints replace the ones the rebuild recomputed, so verify()
+        compares the tree with roots fixed before the restart; interval
+        checkpoints the file lacks (lost to a crash) are appended to it.
+        """
+        persisted: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in self._load(path):
+            org_id = entry.pop("organization_id")
+            persisted.setdefault(org_id, []).append(entry)
+
+        missing: List[Tuple[str, Dict[str, Any]]] = []
+        for org_id, checkpoints in persisted.items():
+            org = self.organizations.get(org_id)
+            if org is None:
+                org = self.organizations[org_id] = OrganizationChain()
+            for checkpoint in checkpoints:
+                size = checkpoint["tree_size"]
+                if size > len(org):
+                    self.breaks.append({
+                        "organization_id": org_id,
+                        "chain_seq": len(org),
+                        "audit_log_id": None,
+                        "reason": f"logs up to checkpoint tree_size {size} are missing from storage",
+                    })
+                elif org.tree.root(size).hex() != checkpoint["root"]:
+                    self.breaks.append({
+                        "organization_id": org_id,
+                        "chain_seq": size - 1,
+                        "audit_log_id": None,
+                        "reason": "checkpoint root does not match the tree",
+                    })
+            sizes = {checkpoint["tree_size"] for checkpoint in checkpoints}
+            recomputed = [checkpoint for checkpoint in org.checkpoints if checkpoint["tree_size"] not in sizes]
+            missing += [(org_id, checkpoint) for checkpoint in recomputed]
+            org.checkpoints = sorted(checkpoints + recomputed, key=lambda checkpoint: checkpoint["tree_size"])
+        for org_id, org in self.organizations.items():
+            if org_id not in persisted:
+                missing += [(org_id, checkpoint) for checkpoint in org.checkpoints]
+
+        self.path = path
+        if missing:
+            self._persist(missing)
+
+    def close(self) -> None:
+        """Persist the head of every chain that grew since its last checkpoint."""
+        if self.path is None:
+            return
+        created_at = datetime.now(timezone.utc).isoformat()
+        heads = []
+        for org_id, org in self.organizations.items():
+            size = len(org)
+            if size and (not org.checkpoints or org.checkpoints[-1]["tree_size"] < size):
+                heads.append((org_id, self._checkpoint_at(org, size, created_at)))
+        if heads:
+            self._persist(heads)
+
+    @staticmethod
+    def _checkpoint_at(org: OrganizationChain, size: int, created_at: Optional[str]) -> Dict[str, Any]:
+        return {
+            "tree_size": size,
+            "root": org.tree.root(size).hex(),
+            "chain_hash": org.chain_at(size - 1).hex(),
+            "created_at": created_at,
+        }
+
+    def head(self, organization_id: str) -> Dict[str, Any]:
+        """Return the current tree size, root and chain hash, without recording a checkpoint."""
+        org = self.organizations[organization_id]
+        return self._checkpoint_at(org, len(org), None)
+
+    def proof(self, organization_id: str, seq: int, tree_size: int) -> List[bytes]:
+        """Return the inclusion proof of log `seq` in the organization's tree of tree_size."""
+        return self.organizations[organization_id].tree.inclusion_proof(seq, tree_size)
+
+    def verify(
+        self,
+        organization_id: str,
+        start: int,
+        end: int,
+        logs: Iterable[Tuple[int, str, str]],
+    ) -> Dict[str, Any]:
+        """
+        Verify sequence numbers [start, end) of an organization.
+
+        `logs` yields (chain_seq, id, content_hash) of the stored logs in that
+        range, in order. Each is checked against its leaf and chain link,
+        every complete Merkle node over the range is recomputed from its
+        children, and each checkpoint is compared with the root rebuilt from
+        the stored nodes; after restore() those are the persisted roots.
+        Log contents are not rehashed.
+        """
+        org = self.organizations[organization_id]
+        failures: List[Dict[str, Any]] = []
+
+        def fail(seq: Optional[int], reason: str) -> None:
+            failure = {"chain_seq": seq, "reason": reason}
+            if len(failures) < MAX_REPORTED_FAILURES and failure not in failures:
+                failures.append(failure)
+
+        for broken in self.breaks:
+            seq = broken["chain_seq"]
+            # Logs missing past the end of the tree belong to a range reaching it
+            if broken["organization_id"] == organization_id and (start <= seq < end or seq >= end == len(org)):
+                fail(seq, broken["reason"])
+
+        expected = start
+        previous = org.chain_at(start - 1)
+        for seq, log_id, content_hash in logs:
+            while expected < seq:
+                fail(expected, "log is missing")
+                previous = org.chain_at(expected)
+                expected += 1
+            leaf = leaf_hash(log_id, content_hash)
+            if leaf != org.tree.node(0, seq):
+                fail(seq, "log does not match its Merkle leaf")
+            previous = chain_hash(previous, leaf)
+            if previous != org.chain_at(seq):
+                fail(seq, "chain link does not match")
+                previous = org.chain_at(seq)
+            expected = seq + 1
+        for seq in range(expected, end):
+            fail(seq, "log is missing")
+
+        # Recompute every stored node whose leaves overlap the range
+        nodes_checked = 0
+        tree = org.tree
+        lo, hi = start, end
+        for level in range(1, len(tree.levels)):
+            lo, hi = lo >> 1, (hi + 1) >> 1
+            complete = len(tree.levels[level]) // 32
+            for index in range(lo, min(hi, complete)):
+                nodes_checked += 1
+                recomputed = node_hash(tree.node(level - 1, 2 * index), tree.node(level - 1, 2 * index + 1))
+                if recomputed != tree.node(level, index):
+                    fail(index << level, f"Merkle node at level {level} does not match its children")
+
+        checkpoints_checked = 0
+        for checkpoint in org.checkpoints:
+            # Checkpoints past the end of the tree are reported as breaks
+            if checkpoint["tree_size"] <= start or checkpoint["tree_size"] > len(tree):
+                continue
+            checkpoints_checked += 1
+            if tree.root(checkpoint["tree_size"]).hex() != checkpoint["root"]:
+                fail(checkpoint["tree_size"] - 1, "checkpoint root does not match the tree")
+
+        return {
+            "organization_id": organization_id,
+            "start_seq": start,
+            "end_seq": end,
+            "logs_checked": end - start,
+            "nodes_checked": nodes_checked,
+            "checkpoints_checked": checkpoints_checked,
+            "valid": not failures,
+            "failures": failures,
+        }
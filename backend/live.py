@@ -0,0 +1,163 @@
+"""
+AI Audit Layer - Live Feed
+Fan newly stored events and metric updates out to streaming subscribers
+"""
+
+from typing import Optional, List, Dict, Any, Callable, Deque, Set
+from collections import deque
+from datetime import datetime
+import asyncio
+import json
+
+
+# Events buffered per subscriber before it is considered lagging
+SUBSCRIBER_BUFFER = 256
+
+# Seconds between metrics events while records keep arriving
+METRICS_INTERVAL = 1.0
+
+# Fields of the summary view sent for each new event
+SUMMARY_FIELDS = (
+    "id",
+    "timestamp",
+    "user_id",
+    "decision_type",
+    "decision_outcome",
+    "model_name",
+    "risk_level",
+    "flagged",
+    "duration_ms",
+)
+
+
+def format_event(event: str, data: str) -> bytes:
+    """Encode one server-sent event."""
+    return f"event: {event}\ndata: {data}\n\n".encode()
+
+
+def summary(record: dict) -> Dict[str, Any]:
+    row = {name: record.get(name) for name in SUMMARY_FIELDS}
+    if isinstance(row["timestamp"], datetime):
+        row["timestamp"] = row["timestamp"].isoformat()
+    row["flagged"] = bool(row["flagged"])
+    return row
+
+
+class Subscriber:
+    """
+    One stream's filters and pending events.
+
+    The buffer is bounded: when a slow client lets it fill, its backlog is
+    dropped and replaced by a single `resync` event telling it to refetch,
+    so publishing never waits on a subscriber.
+    """
+
+    def __init__(self, filters: Dict[str, Any], metrics: bool, buffer: int):
+        self.filters = filters
+        self.metrics = metrics
+        # Metrics events cover only this organization when the stream is scoped to one
+        self.organization_id: Optional[str] = filters.get("organization_id")
+        self.buffer = buffer
+        self.pending: Deque[bytes] = deque()
+        self.dropped = 0
+        self._resyncing = False
+        self._ready = asyncio.Event()
+
+    def wants(self, record: dict) -> bool:
+        return all(record.get(name) == value for name, value in self.filters.items())
+
+    def push(self, event: bytes) -> None:
+        if len(self.pending) >= self.buffer:
+            # A resync queued by an earlier overflow is replaced, not counted
+            self.dropped += len(self.pending) - self._resyncing
+            self.pending.clear()
+            self.pending.append(format_event("resync", json.dumps({"dropped": self.dropped})))
+            self._resyncing = True
+        self.pending.append(event)
+        self._ready.set()
+
+    async def next(self, timeout: Optional[float] = None) -> List[bytes]:
+        """Wait for and take every pending event; empty after a timeout."""
+        if not self.pending:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        events = list(self.pending)
+        self.pending.clear()
+        self._resyncing = False
+        return events
+
+
+class LiveFeed:
+    """
+    Publishes stored records to subscribers as `log` events and coalesces
+    the metric changes they cause into at most one `metrics` event per
+    METRICS_INTERVAL.
+
+    Each record's event is encoded once and shared by every subscriber whose
+    filters it matches. The metrics payload comes from
+    `metrics_snapshot(organization_id)`: streams scoped to an organization
+    get that organization's metrics, and only after it stored records;
+    the rest get the totals. Each snapshot is taken once per interval
+    however many subscribers share it.
+    """
+
+    def __init__(
+        self,
+        metrics_snapshot: Callable[[Optional[str]], str],
+        buffer: int = SUBSCRIBER_BUFFER,
+        interval: float = METRICS_INTERVAL,
+    ):
+        self.metrics_snapshot = metrics_snapshot
+        self.buffer = buffer
+        self.interval = interval
+        self.subscribers: List[Subscriber] = []
+        self._metrics_timer: Optional[asyncio.TimerHandle] = None
+        # Organizations that stored records since the last metrics event
+        self._changed: Set[Optional[str]] = set()
+
+    def subscribe(self, filters: Optional[Dict[str, Any]] = None, metrics: bool = True) -> Subscriber:
+        subscriber = Subscriber(filters or {}, metrics, self.buffer)
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+
+    def publish(self, records: List[dict]) -> None:
+        """Queue newly stored records for their subscribers; never blocks."""
+        if not self.subscribers or not records:
+            return
+        for record in records:
+            event = None
+            for subscriber in self.subscribers:
+                if subscriber.wants(record):
+                    if event is None:
+                        event = format_event("log", json.dumps(summary(record)))
+                    subscriber.push(event)
+            self._changed.add(record.get("organization_id"))
+        if self._metrics_timer is None and any(s.metrics for s in self.subscribers):
+            loop = asyncio.get_running_loop()
+            self._metrics_timer = loop.call_later(self.interval, self._send_metrics)
+
+    def _send_metrics(self) -> None:
+        self._metrics_timer = None
+        changed, self._changed = self._changed, set()
+        events: Dict[Optional[str], bytes] = {}
+        for subscriber in self.subscribers:
+            org = subscriber.organization_id
+            if not subscriber.metrics or (org is not None and org not in changed):
+                continue
+            if org not in events:
+                events[org] = format_event("metrics", self.metrics_snapshot(org))
+            subscriber.push(events[org])
+
+    def close(self) -> None:
+        if self._metrics_timer is not None:
+            self._metrics_timer.cancel()
+            self._metrics_timer = None
+        self._changed.clear()
+        self.subscribers.clear()
@@ -3,19 +3,51 @@ AI Audit Layer - FastAPI Backend
 Main application entry point
 """
 
-from fastapi import FastAPI, HTTPException, Depends, Query, Header
+from fastapi import FastAPI, HTTPException, Depends, Query, Header, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import Response, StreamingResponse, JSONResponse
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 from typing import Optional, List, Dict, Any
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from uuid import UUID, uuid4
+import asyncio
 import hashlib
 import os
 
+import numpy as np
+
+from store import AuditLogStore, epoch_ns, encode_cursor, decode_cursor
+from storage import MemoryStorage, TieredStorage, encode_record
+from blobs import BlobStore, DedupStorage
+from integrity import content_hash
+from verification import VerificationJobs
+from export import FORMATS, PARQUET_ROW_GROUP, parquet_available
+from text_index import parse_query
+from live import LiveFeed, format_event, summary
+from response_cache import ResponseCache
+from reports import ReportEngine, REPORT_TYPES, REPORT_FORMATS, parse_period, render
+from aggregates import (
+    MetricsAggregator, OrganizationRollup, ORGANIZATION_RETENTION, RESOLUTIONS, DAY, HOUR,
+    percentiles,
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stop live streams and verification workers, then flush and checkpoint
+    # the storage engine
+    live_feed.close()
+    verification_jobs.close()
+    audit_logs_db.close()
+
+
 app = FastAPI(
     title="AI Audit Layer API",
     description="Compliance dashboard for AI decision tracking",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS for frontend
@@ -31,11 +63,15 @@ app.add_middleware(
 # Models
 # ============================================================
 
+# Counts and durations are stored in signed 64-bit columns
+INT64_MAX = 2 ** 63 - 1
+
+
 class AuditLogCreate(BaseModel):
     """Request model for creating an audit log"""
     request_id: str
     timestamp: datetime
-    duration_ms: int
+    duration_ms: int = Field(ge=0, le=INT64_MAX)
     
     user_id: str
     session_id: Optional[str] = None
@@ -43,10 +79,10 @@ class AuditLogCreate(BaseModel):
     
     prompt_hash: str
     prompt_content: str
-    prompt_tokens: int
+    prompt_tokens: int = Field(ge=0, le=INT64_MAX)
     
     response_content: str
-    response_tokens: int
+    response_tokens: int = Field(ge=0, le=INT64_MAX)
     
     model_provider: str
     model_name: str
@@ -62,6 +98,31 @@ class AuditLogCreate(BaseModel):
     risk_level: str = "low"
     
     metadata: Dict[str, Any] = Field(default_factory=dict)
+    
+    time_to_first_token_ms: Optional[int] = Field(default=None, ge=0, le=INT64_MAX)
+
+
+class AuditLogBatch(BaseModel):
+    """Request model for batch ingestion; events are validated individually"""
+    events: List[Dict[str, Any]]
+
+
+class BatchItemResult(BaseModel):
+    """Outcome of one event in a batch"""
+    index: int
+    success: bool
+    audit_log_id: Optional[str] = None
+    content_hash: Optional[str] = None
+    duplicate: bool = False
+    errors: Optional[List[Dict[str, Any]]] = None
+
+
+class BatchResponse(BaseModel):
+    """Response model for batch ingestion"""
+    accepted: int
+    rejected: int
+    indexed_at: str
+    results: List[BatchItemResult]
 
 
 class AuditLogResponse(BaseModel):
@@ -92,6 +153,16 @@ class AuditLogDetail(AuditLogResponse):
     factors: Optional[Dict[str, Any]]
     compliance_tags: List[str]
     metadata: Dict[str, Any]
+    time_to_first_token_ms: Optional[int] = None
+    chain_seq: Optional[int] = None
+    chain_hash: Optional[str] = None
+
+
+class LatencyPercentiles(BaseModel):
+    """Duration percentiles in milliseconds (null when there is no data)"""
+    p50: Optional[float]
+    p95: Optional[float]
+    p99: Optional[float]
 
 
 class MetricsResponse(BaseModel):
@@ -103,22 +174,288 @@ class MetricsResponse(BaseModel):
     denial_rate: float
     flagged_rate: float
     avg_duration_ms: float
+    latency: LatencyPercentiles
     by_outcome: Dict[str, int]
     by_model: Dict[str, int]
     by_decision_type: Dict[str, int]
+    latency_by_model: Dict[str, LatencyPercentiles]
+    latency_by_decision_type: Dict[str, LatencyPercentiles]
+
+
+class LatencyResponse(BaseModel):
+    """Duration percentiles over a time window"""
+    start: datetime
+    end: datetime
+    count: int
+    latency: LatencyPercentiles
+    by_model: Dict[str, LatencyPercentiles]
+    by_decision_type: Dict[str, LatencyPercentiles]
+
+
+class MemoryUsage(BaseModel):
+    """Bytes held by a partition's in-memory indexes, spare capacity included"""
+    columns: int
+    time_index: int
+    request_ids: int
+    text_index: int
+    total: int
+
+
+class ResponseCacheStats(BaseModel):
+    """Size and effectiveness of the encoded response cache"""
+    entries: int
+    bytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+
+
+class OrganizationUsageResponse(BaseModel):
+    """Records and memory of one organization's partition"""
+    organization_id: str
+    records: int
+    memory: MemoryUsage
+
+
+class TimeSeriesPoint(BaseModel):
+    """One rollup bucket of a metrics time series"""
+    timestamp: datetime
+    count: int
+    flagged: int
+    avg_duration_ms: float
+    latency: LatencyPercentiles
+    by_outcome: Dict[str, int]
+
+
+class TimeSeriesResponse(BaseModel):
+    """Metrics time series at a fixed resolution"""
+    resolution: str
+    start: datetime
+    end: datetime
+    points: List[TimeSeriesPoint]
+
+
+class InclusionProofResponse(BaseModel):
+    """Merkle inclusion proof of one audit log in its organization's tree"""
+    audit_log_id: str
+    organization_id: str
+    chain_seq: int
+    chain_hash: str
+    leaf_hash: str
+    tree_size: int
+    root: str
+    proof: List[str]
+
+
+class IntegrityCheckpoint(BaseModel):
+    """Merkle root and chain hash after the first tree_size logs"""
+    tree_size: int
+    root: str
+    chain_hash: str
+    created_at: Optional[str]
+
+
+class CheckpointListResponse(BaseModel):
+    """An organization's current chain head and recorded checkpoints"""
+    organization_id: str
+    head: IntegrityCheckpoint
+    checkpoints: List[IntegrityCheckpoint]
+
+
+class VerificationFailure(BaseModel):
+    """One integrity check that did not hold"""
+    chain_seq: Optional[int]
+    reason: str
+
+
+class VerificationResponse(BaseModel):
+    """Result of verifying a chain_seq range against the ledger"""
+    organization_id: str
+    start_seq: int
+    end_seq: int
+    logs_checked: int
+    nodes_checked: int
+    checkpoints_checked: int
+    valid: bool
+    failures: List[VerificationFailure]
+
+
+class ReportJobRequest(BaseModel):
+    """Request model for building a compliance report in the background"""
+    organization_id: str
+    report_type: str
+    period: str
+
+
+class ReportJobResponse(BaseModel):
+    """Status of a background report build"""
+    id: str
+    organization_id: str
+    report_type: str
+    period: str
+    status: str
+    error: Optional[str]
+    created_at: datetime
+    finished_at: Optional[datetime]
+
+
+class VerificationJobRequest(BaseModel):
+    """Request model for a bulk content hash verification job"""
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    organization_id: Optional[str] = None
+
+
+class ContentMismatch(BaseModel):
+    """A log whose content no longer matches its hash"""
+    audit_log_id: str
+    reason: str
+    stored_hash: Optional[str] = None
+    computed_hash: Optional[str] = None
+
+
+class VerificationJobResponse(BaseModel):
+    """Progress and findings of a bulk verification job"""
+    id: str
+    status: str
+    start_date: Optional[datetime]
+    end_date: Optional[datetime]
+    organization_id: Optional[str]
+    total: int
+    verified: int
+    mismatched: int
+    chunks_total: int
+    chunks_done: int
+    mismatches: List[ContentMismatch]
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
 
 
 # ============================================================
-# In-Memory Storage (Demo - replace with PostgreSQL)
+# Storage
 # ============================================================
 
-audit_logs_db: Dict[str, dict] = {}
+# Set AUDIT_STORAGE_DIR to persist records in a local segment log;
+# without it records are kept in memory for the demo. Records older than
+# AUDIT_HOT_DAYS move to compressed cold segments in the same directory,
+# and Merkle checkpoints are appended to checkpoints.jsonl there. Either
+# way, identical prompt and response bodies are stored once.
+STORAGE_DIR = os.environ.get("AUDIT_STORAGE_DIR")
+HOT_DAYS = float(os.environ.get("AUDIT_HOT_DAYS", "30"))
+
+audit_logs_db = AuditLogStore(
+    DedupStorage(
+        TieredStorage(STORAGE_DIR, hot_seconds=HOT_DAYS * 86400),
+        BlobStore(os.path.join(STORAGE_DIR, "blobs")),
+    ) if STORAGE_DIR else DedupStorage(MemoryStorage()),
+    ledger_path=os.path.join(STORAGE_DIR, "checkpoints.jsonl") if STORAGE_DIR else None,
+)
+
+verification_jobs = VerificationJobs()
+
+report_engine = ReportEngine(audit_logs_db)
+
+# Pushes new events and metric updates to dashboards as they are stored
+live_feed = LiveFeed(lambda organization_id: current_metrics(organization_id).model_dump_json())
+
+# Encoded detail and summary views of records, which never change once
+# written; AUDIT_RESPONSE_CACHE_MB bounds it
+RESPONSE_CACHE_MB = float(os.environ.get("AUDIT_RESPONSE_CACHE_MB", "64"))
+response_cache = ResponseCache(int(RESPONSE_CACHE_MB * 1024 * 1024))
+
+# Seconds between progress events on a verification job stream
+PROGRESS_INTERVAL = 0.5
+
+# Records read from storage per export chunk
+EXPORT_BATCH_SIZE = 1000
+
+# Seconds of silence after which a live stream sends a keepalive comment
+LIVE_KEEPALIVE = 15.0
 
 
 def generate_content_hash(log: AuditLogCreate) -> str:
     """Generate SHA-256 hash for immutability"""
-    content = f"{log.timestamp}{log.prompt_hash}{log.response_content}{log.model_name}"
-    return hashlib.sha256(content.encode()).hexdigest()
+    return content_hash(log.timestamp, log.prompt_hash, log.response_content, log.model_name)
+
+
+def build_record(log: AuditLogCreate, indexed_at: str) -> dict:
+    """Build the stored record for a validated audit event"""
+    # Flag low confidence or risky decisions for review
+    flagged = (
+        (log.confidence_score is not None and log.confidence_score < 0.7) or
+        log.risk_level in ["high", "critical"]
+    )
+    # The validated field values are taken as they are; the model is
+    # discarded, so nothing needs the deep copy model_dump() would make
+    return {
+        "id": str(uuid4()),
+        **vars(log),
+        "content_hash": generate_content_hash(log),
+        "flagged": flagged,
+        "indexed_at": indexed_at
+    }
+
+
+# ============================================================
+# Fast validation and serialization
+# ============================================================
+
+# Validates request bytes in one pass, without decoding them to Python first
+AUDIT_EVENT = TypeAdapter(AuditLogCreate)
+
+# Request body schema for endpoints that read their body themselves
+AUDIT_EVENT_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": AuditLogCreate.model_json_schema()}},
+    }
+}
+
+# Fields of the detail view, in response order
+DETAIL_FIELDS = tuple(AuditLogDetail.model_fields)
+
+
+def parse_event(body: bytes) -> AuditLogCreate:
+    """Validate a JSON audit event, failing the way a body parameter would."""
+    try:
+        return AUDIT_EVENT.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**error, "loc": ("body", *error["loc"])}
+            for error in e.errors(include_url=False)
+        ])
+
+
+def json_response(content: Any) -> Response:
+    """Encode a response once, skipping response model validation."""
+    return Response(content=encode_record(content), media_type="application/json")
+
+
+def encode_summary(row: dict) -> bytes:
+    """Serialize a query result row as its summary view."""
+    return encode_record(summary(row))
+
+
+def encode_detail(record: dict) -> bytes:
+    """
+    Serialize a stored record as an AuditLogDetail.
+
+    Records were validated when they were ingested, so the detail view is
+    projected from the stored fields without building the model again.
+    """
+    return encode_record({name: record.get(name) for name in DETAIL_FIELDS})
+
+
+def _filters(flagged: Optional[bool] = None, **values: Optional[str]) -> Dict[str, Any]:
+    """Build store equality filters from query parameters, leaving out those not given."""
+    filters: Dict[str, Any] = {k: v for k, v in values.items() if v}
+    if flagged is not None:
+        filters["flagged"] = flagged
+    return filters
 
 
 # ============================================================
@@ -150,102 +487,267 @@ async def health_check():
     return {"status": "healthy", "version": "1.0.0"}
 
 
-@app.post("/api/v1/audit/log", response_model=dict)
+@app.post("/api/v1/audit/log", response_model=dict, openapi_extra=AUDIT_EVENT_BODY)
 async def create_audit_log(
-    log: AuditLogCreate,
+    request: Request,
     api_key: str = Depends(verify_api_key)
 ):
-    """Record an audit event"""
-    log_id = str(uuid4())
-    content_hash = generate_content_hash(log)
+    """
+    Record an audit event (an AuditLogCreate).
     
-    # Determine if flagged (low confidence or risky)
-    flagged = (
-        (log.confidence_score is not None and log.confidence_score < 0.7) or
-        log.risk_level in ["high", "critical"]
-    )
+    request_id is an idempotency key per organization: resending an event
+    returns the original log instead of storing a duplicate.
+    The response is sent once the event is durable.
+    """
+    log = parse_event(await request.body())
+    record = audit_logs_db.find_request(log.organization_id, log.request_id)
+    duplicate = record is not None
+    if not duplicate:
+        record = build_record(log, datetime.now(timezone.utc).isoformat())
+        await audit_logs_db.commit(audit_logs_db.insert(record))
+        live_feed.publish([record])
     
-    record = {
-        "id": log_id,
-        **log.model_dump(),
-        "content_hash": content_hash,
-        "flagged": flagged,
-        "indexed_at": datetime.now(timezone.utc).isoformat()
-    }
+    return json_response({
+        "success": True,
+        "audit_log_id": record["id"],
+        "content_hash": record["content_hash"],
+        "indexed_at": record["indexed_at"],
+        "duplicate": duplicate
+    })
+
+
+MAX_BATCH_SIZE = 10000
+
+
+@app.post("/api/v1/audit/logs:batch", response_model=BatchResponse)
+async def create_audit_logs_batch(
+    batch: AuditLogBatch,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Record many audit events in one request.
     
-    audit_logs_db[log_id] = record
+    Each event is validated on its own: invalid events are reported in
+    their result slot and do not prevent the rest from being stored.
+    Events whose request_id was already stored are reported as duplicates
+    of the original log. All new events are written with one storage
+    append and the response is sent once they are durable.
+    """
+    if len(batch.events) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds maximum of {MAX_BATCH_SIZE} events"
+        )
     
-    return {
-        "success": True,
-        "audit_log_id": log_id,
-        "content_hash": content_hash,
-        "indexed_at": record["indexed_at"]
-    }
+    indexed_at = datetime.now(timezone.utc).isoformat()
+    results = []
+    accepted = 0
+    new_records = []
+    # Events stored by this batch, so a request_id repeated within it dedups too
+    pending: Dict[tuple, dict] = {}
+    
+    for index, event in enumerate(batch.events):
+        try:
+            log = AUDIT_EVENT.validate_python(event)
+        except ValidationError as e:
+            results.append({
+                "index": index,
+                "success": False,
+                "audit_log_id": None,
+                "content_hash": None,
+                "duplicate": False,
+                "errors": e.errors(include_url=False, include_context=False)
+            })
+            continue
+        
+        key = (log.organization_id, log.request_id)
+        record = pending.get(key) or audit_logs_db.find_request(*key)
+        duplicate = record is not None
+        if not duplicate:
+            record = pending[key] = build_record(log, indexed_at)
+            new_records.append(record)
+        accepted += 1
+        results.append({
+            "index": index,
+            "success": True,
+            "audit_log_id": record["id"],
+            "content_hash": record["content_hash"],
+            "duplicate": duplicate,
+            "errors": None
+        })
+    
+    if new_records:
+        await audit_logs_db.commit(audit_logs_db.insert_many(new_records))
+        live_feed.publish(new_records)
+    
+    # Results are built in the BatchResponse shape and encoded directly
+    return json_response({
+        "accepted": accepted,
+        "rejected": len(results) - accepted,
+        "indexed_at": indexed_at,
+        "results": results
+    })
 
 
 @app.get("/api/v1/audit/logs", response_model=dict)
 async def query_audit_logs(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    organization_id: Optional[str] = None,
     user_id: Optional[str] = None,
     decision_type: Optional[str] = None,
     decision_outcome: Optional[str] = None,
     model_provider: Optional[str] = None,
     risk_level: Optional[str] = None,
     flagged: Optional[bool] = None,
+    q: Optional[str] = None,
     limit: int = Query(default=50, le=100),
-    offset: int = Query(default=0),
+    offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = None,
     api_key: str = Depends(verify_api_key)
 ):
-    """Query audit logs with filters"""
-    results = list(audit_logs_db.values())
-    
-    # Apply filters
-    if start_date:
-        results = [r for r in results if datetime.fromisoformat(r["timestamp"].replace("Z", "+00:00")) >= start_date]
-    if end_date:
-        results = [r for r in results if datetime.fromisoformat(r["timestamp"].replace("Z", "+00:00")) <= end_date]
-    if user_id:
-        results = [r for r in results if r["user_id"] == user_id]
-    if decision_type:
-        results = [r for r in results if r.get("decision_type") == decision_type]
-    if decision_outcome:
-        results = [r for r in results if r.get("decision_outcome") == decision_outcome]
-    if model_provider:
-        results = [r for r in results if r["model_provider"] == model_provider]
-    if risk_level:
-        results = [r for r in results if r["risk_level"] == risk_level]
-    if flagged is not None:
-        results = [r for r in results if r.get("flagged") == flagged]
+    """
+    Query audit logs with filters, newest first.
     
-    # Sort by timestamp desc
-    results.sort(key=lambda x: x["timestamp"], reverse=True)
+    With organization_id only that organization's partition is searched.
     
-    total = len(results)
-    paginated = results[offset:offset + limit]
+    `q` searches prompt, response and reasoning text: words must all match,
+    "quoted phrases" must appear in order and `word*` matches by prefix.
     
-    # Return summary view
-    logs = [
-        {
-            "id": r["id"],
-            "timestamp": r["timestamp"],
-            "user_id": r["user_id"],
-            "decision_type": r.get("decision_type"),
-            "decision_outcome": r.get("decision_outcome"),
-            "model_name": r["model_name"],
-            "risk_level": r["risk_level"],
-            "flagged": r.get("flagged", False),
-            "duration_ms": r["duration_ms"]
-        }
-        for r in paginated
-    ]
+    Pass the returned next_cursor back as `cursor` to fetch the following
+    page; each page then costs the same however deep it is. `total` is only
+    computed for the first page of a cursor walk and is null afterwards, and
+    also when a phrase search has too many candidates to count exactly.
+    """
+    before = None
+    if cursor:
+        try:
+            before = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    return {
+    text = None
+    if q:
+        try:
+            text = parse_query(q)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    # Equality filters are answered from the store's secondary indexes
+    filters = _filters(
+        organization_id=organization_id,
+        user_id=user_id,
+        decision_type=decision_type,
+        decision_outcome=decision_outcome,
+        model_provider=model_provider,
+        risk_level=risk_level,
+        flagged=flagged,
+    )
+    
+    # Fetch one extra row to learn whether another page follows
+    total, paginated = audit_logs_db.query(
+        filters,
+        start=start_date,
+        end=end_date,
+        limit=limit + 1,
+        offset=offset,
+        before=before,
+        count_total=before is None,
+        text=text,
+    )
+    next_cursor = None
+    if len(paginated) > limit:
+        paginated = paginated[:limit]
+        next_cursor = encode_cursor(audit_logs_db.time_key(paginated[-1]["id"]))
+    
+    # Summary rows are encoded once per record and spliced into the page
+    logs = []
+    for r in paginated:
+        row = response_cache.get(("summary", r["id"]))
+        if row is None:
+            row = encode_summary(r)
+            response_cache.put(("summary", r["id"]), row)
+        logs.append(row)
+    
+    page = encode_record({
         "total": total,
         "limit": limit,
         "offset": offset,
-        "logs": logs
-    }
+        "next_cursor": next_cursor,
+    })
+    content = page[:-1] + b',"logs":[' + b",".join(logs) + b"]}"
+    return Response(content=content, media_type="application/json")
+
+
+@app.get("/api/v1/audit/export")
+async def export_audit_logs(
+    format: str = Query(default="ndjson"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    organization_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    decision_type: Optional[str] = None,
+    decision_outcome: Optional[str] = None,
+    model_provider: Optional[str] = None,
+    risk_level: Optional[str] = None,
+    flagged: Optional[bool] = None,
+    after_id: Optional[str] = None,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Stream every full audit log matching the filters, oldest first.
+    
+    Takes the same filters as the query endpoint, with no page limit.
+    Records are read from storage a batch at a time, so memory stays flat
+    however large the export. To resume an interrupted download, pass the
+    id of the last complete record received as `after_id`.
+    """
+    if format not in FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"format must be one of: {', '.join(FORMATS)}"
+        )
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+    
+    after = None
+    if after_id:
+        if after_id not in audit_logs_db:
+            raise HTTPException(status_code=400, detail="Unknown after_id")
+        after = audit_logs_db.time_key(after_id)
+    
+    filters = _filters(
+        organization_id=organization_id,
+        user_id=user_id,
+        decision_type=decision_type,
+        decision_outcome=decision_outcome,
+        model_provider=model_provider,
+        risk_level=risk_level,
+        flagged=flagged,
+    )
+    
+    media_type, extension, encode, decode = FORMATS[format]
+    batches = audit_logs_db.scan_range(
+        filters,
+        start=start_date,
+        end=end_date,
+        after=after,
+        batch_size=PARQUET_ROW_GROUP if format == "parquet" else EXPORT_BATCH_SIZE,
+        decode=decode,
+    )
+    
+    async def body():
+        # Advance the scan on the event loop so it never runs beside an insert
+        for chunk in encode(batches):
+            if chunk:
+                yield chunk
+            await asyncio.sleep(0)
+    
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="audit_logs.{extension}"'}
+    )
 
 
 @app.get("/api/v1/audit/logs/{log_id}", response_model=AuditLogDetail)
@@ -253,57 +755,518 @@ async def get_audit_log(
     log_id: str,
     api_key: str = Depends(verify_api_key)
 ):
-    """Get single audit log with full details"""
+    """
+    Get single audit log with full details.
+    
+    Records never change once written, so each one's encoded detail is
+    cached after its first view.
+    """
+    content = response_cache.get(("detail", log_id))
+    if content is None:
+        if log_id not in audit_logs_db:
+            raise HTTPException(status_code=404, detail="Audit log not found")
+        content = encode_detail(audit_logs_db[log_id])
+        response_cache.put(("detail", log_id), content)
+    return Response(content=content, media_type="application/json")
+
+
+@app.get("/api/v1/audit/logs/{log_id}/proof", response_model=InclusionProofResponse)
+async def get_inclusion_proof(
+    log_id: str,
+    tree_size: Optional[int] = None,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Prove a log is included in its organization's Merkle tree.
+    
+    Defaults to the current tree; pass the tree_size of a pinned
+    checkpoint to prove against that checkpoint's root instead.
+    """
     if log_id not in audit_logs_db:
         raise HTTPException(status_code=404, detail="Audit log not found")
     
-    record = audit_logs_db[log_id]
-    return AuditLogDetail(**record)
+    row = audit_logs_db.row(log_id)
+    organization_id = row["organization_id"]
+    seq = row["chain_seq"]
+    org = audit_logs_db.ledger.get(organization_id)
+    size = len(org) if tree_size is None else tree_size
+    if not seq < size <= len(org):
+        raise HTTPException(
+            status_code=400,
+            detail=f"tree_size must be between {seq + 1} and {len(org)}"
+        )
+    
+    return InclusionProofResponse(
+        audit_log_id=log_id,
+        organization_id=organization_id,
+        chain_seq=seq,
+        chain_hash=org.chain_at(seq).hex(),
+        leaf_hash=org.tree.node(0, seq).hex(),
+        tree_size=size,
+        root=org.tree.root(size).hex(),
+        proof=[node.hex() for node in audit_logs_db.ledger.proof(organization_id, seq, size)]
+    )
 
 
-@app.get("/api/v1/metrics", response_model=MetricsResponse)
-async def get_metrics(
+@app.get("/api/v1/integrity/{organization_id}/checkpoints", response_model=CheckpointListResponse)
+async def get_integrity_checkpoints(
+    organization_id: str,
+    api_key: str = Depends(verify_api_key)
+):
+    """List an organization's Merkle checkpoints and current chain head"""
+    if audit_logs_db.ledger.get(organization_id) is None:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    
+    return CheckpointListResponse(
+        organization_id=organization_id,
+        head=audit_logs_db.ledger.head(organization_id),
+        checkpoints=audit_logs_db.ledger.get(organization_id).checkpoints
+    )
+
+
+@app.get("/api/v1/integrity/{organization_id}/verify", response_model=VerificationResponse)
+async def verify_integrity(
+    organization_id: str,
+    start_seq: int = Query(default=0, ge=0),
+    end_seq: Optional[int] = Query(default=None, ge=0),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Verify an organization's logs with chain_seq in [start_seq, end_seq).
+    
+    Checks chain links, Merkle nodes over the range and the recorded
+    checkpoint roots without rehashing log contents.
+    """
+    org = audit_logs_db.ledger.get(organization_id)
+    if org is None:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    end_seq = len(org) if end_seq is None else end_seq
+    if not start_seq <= end_seq <= len(org):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range must satisfy start_seq <= end_seq <= {len(org)}"
+        )
+    
+    return audit_logs_db.verify_chain(organization_id, start_seq, end_seq)
+
+
+@app.post("/api/v1/integrity/jobs", response_model=VerificationJobResponse, status_code=202)
+async def create_verification_job(
+    request: VerificationJobRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Start re-verifying the content hash of every log in a date range.
+    
+    The range is split into chunks that a process pool rehashes straight
+    from storage; poll the job or follow its progress stream for results.
+    """
+    if request.start_date and request.end_date and request.start_date > request.end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    
+    job = verification_jobs.submit(
+        audit_logs_db, request.start_date, request.end_date, request.organization_id
+    )
+    return job.to_dict()
+
+
+def get_verification_job(job_id: str):
+    job = verification_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Verification job not found")
+    return job
+
+
+@app.get("/api/v1/integrity/jobs/{job_id}", response_model=VerificationJobResponse)
+async def get_verification_job_status(
+    job_id: str,
+    api_key: str = Depends(verify_api_key)
+):
+    """Get the progress and mismatches of a verification job"""
+    return get_verification_job(job_id).to_dict()
+
+
+@app.get("/api/v1/integrity/jobs/{job_id}/progress")
+async def stream_verification_job(
+    job_id: str,
+    api_key: str = Depends(verify_api_key)
+):
+    """Stream a verification job's progress as server-sent events until it finishes"""
+    job = get_verification_job(job_id)
+    
+    async def events():
+        while True:
+            done = job.done
+            snapshot = VerificationJobResponse(**job.to_dict())
+            yield f"event: progress\ndata: {snapshot.model_dump_json()}\n\n"
+            if done:
+                return
+            await asyncio.sleep(PROGRESS_INTERVAL)
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def validate_report_request(organization_id: str, report_type: str, period: str) -> None:
+    if report_type not in REPORT_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"report_type must be one of: {', '.join(REPORT_TYPES)}"
+        )
+    try:
+        parse_period(period)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="period must be a year (2024), quarter (2024-Q4) or month (2024-10)"
+        )
+    if organization_id not in audit_logs_db.partitions:
+        raise HTTPException(status_code=404, detail="Organization not found")
+
+
+@app.post("/api/v1/reports/jobs", response_model=ReportJobResponse, status_code=202)
+async def create_report_job(
+    request: ReportJobRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """Build a compliance report in the background; download it once the job completes"""
+    validate_report_request(request.organization_id, request.report_type, request.period)
+    job = report_engine.submit(request.organization_id, request.report_type, request.period)
+    return job.to_dict()
+
+
+@app.get("/api/v1/reports/jobs/{job_id}", response_model=ReportJobResponse)
+async def get_report_job(
+    job_id: str,
+    api_key: str = Depends(verify_api_key)
+):
+    """Get the status of a background report build"""
+    job = report_engine.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return job.to_dict()
+
+
+@app.get("/api/v1/reports/{organization_id}/{report_type}")
+async def get_report(
+    organization_id: str,
+    report_type: str,
+    period: str,
+    format: str = Query(default="markdown"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Stream a compliance report for an organization and period.
+    
+    Reports come from the organization's rollups and are cached until new
+    data lands in the period. Decision audits are built on request; a
+    system audit that is not cached is built by a background job and this
+    returns 202 with the job to poll before asking again.
+    """
+    validate_report_request(organization_id, report_type, period)
+    if format not in REPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"format must be one of: {', '.join(REPORT_FORMATS)}"
+        )
+    
+    report = report_engine.cached(organization_id, report_type, period)
+    if report is None:
+        if report_type == "system_audit":
+            job = report_engine.submit(organization_id, report_type, period)
+            return JSONResponse(
+                status_code=202,
+                content=ReportJobResponse(**job.to_dict()).model_dump(mode="json")
+            )
+        report = report_engine.build(organization_id, report_type, period)
+    
+    media_type, extension = REPORT_FORMATS[format]
+    filename = f"{report_type}_{organization_id}_{period}.{extension}"
+    return StreamingResponse(
+        render(report, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@app.get("/api/v1/live")
+async def stream_live_feed(
+    organization_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    decision_type: Optional[str] = None,
+    decision_outcome: Optional[str] = None,
+    model_provider: Optional[str] = None,
+    risk_level: Optional[str] = None,
+    flagged: Optional[bool] = None,
+    metrics: bool = True,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Stream newly stored audit events as server-sent events.
+    
+    A `log` event carries the summary view of each new event matching the
+    filters. With `metrics`, the stream opens with the current dashboard
+    metrics and sends a `metrics` event at most once a second while events
+    arrive; with organization_id, both cover that organization only. A
+    `resync` event means the client fell behind and buffered events were
+    dropped; it should refetch before carrying on.
+    """
+    filters = _filters(
+        organization_id=organization_id,
+        user_id=user_id,
+        decision_type=decision_type,
+        decision_outcome=decision_outcome,
+        model_provider=model_provider,
+        risk_level=risk_level,
+        flagged=flagged,
+    )
+    
+    subscriber = live_feed.subscribe(filters, metrics=metrics)
+    if metrics:
+        snapshot = current_metrics(organization_id).model_dump_json()
+        subscriber.push(format_event("metrics", snapshot))
+    
+    async def events():
+        try:
+            while True:
+                pending = await subscriber.next(LIVE_KEEPALIVE)
+                yield b"".join(pending) if pending else b": keepalive\n\n"
+        finally:
+            live_feed.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/v1/organizations/{organization_id}/usage", response_model=OrganizationUsageResponse)
+async def get_organization_usage(
+    organization_id: str,
     api_key: str = Depends(verify_api_key)
 ):
-    """Get dashboard metrics"""
+    """Get the record count and in-memory footprint of an organization's partition"""
+    usage = audit_logs_db.memory_usage(organization_id)
+    if usage is None:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    return OrganizationUsageResponse(
+        organization_id=organization_id,
+        records=len(audit_logs_db.partitions[organization_id]),
+        memory=usage
+    )
+
+
+@app.get("/api/v1/cache/stats", response_model=ResponseCacheStats)
+async def get_response_cache_stats(api_key: str = Depends(verify_api_key)):
+    """Get the entries, bytes, hit and miss counts of the response cache"""
+    return ResponseCacheStats(**response_cache.stats())
+
+
+def organization_metrics(organization_id: Optional[str] = None) -> MetricsAggregator:
+    """
+    The store's overall running aggregates, or those of one organization's
+    partition (empty if it has no records)
+    """
+    if organization_id is None:
+        return audit_logs_db.metrics
+    if organization_id in audit_logs_db.partitions:
+        return audit_logs_db.partitions[organization_id].metrics
+    return MetricsAggregator(ORGANIZATION_RETENTION, OrganizationRollup)
+
+
+def current_metrics(organization_id: Optional[str] = None) -> MetricsResponse:
+    """Dashboard metrics from running aggregates, overall or for one organization"""
     now = datetime.now(timezone.utc)
-    logs = list(audit_logs_db.values())
+    today = int(now.replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+    tomorrow = today + DAY
     
-    # Calculate metrics
-    total = len(logs)
+    metrics = organization_metrics(organization_id)
+    rollups = metrics.rollups
+    
+    return MetricsResponse(
+        total_today=rollups.window(today, tomorrow).count,
+        total_week=rollups.window(today - 6 * DAY, tomorrow).count,
+        total_month=rollups.window(today - 29 * DAY, tomorrow).count,
+        approval_rate=metrics.rate(metrics.by_outcome.get("approved", 0)),
+        denial_rate=metrics.rate(metrics.by_outcome.get("denied", 0)),
+        flagged_rate=metrics.rate(metrics.flagged),
+        avg_duration_ms=metrics.avg_duration_ms,
+        latency=percentiles(metrics.latency.overall),
+        by_outcome=metrics.by_outcome,
+        by_model=metrics.by_model,
+        by_decision_type=metrics.by_decision_type,
+        latency_by_model={k: percentiles(v) for k, v in metrics.latency.by_model.items()},
+        latency_by_decision_type={
+            k: percentiles(v) for k, v in metrics.latency.by_decision_type.items()
+        }
+    )
+
+
+@app.get("/api/v1/metrics", response_model=MetricsResponse)
+async def get_metrics(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    organization_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    decision_type: Optional[str] = None,
+    model_provider: Optional[str] = None,
+    risk_level: Optional[str] = None,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Get dashboard metrics, optionally for one organization.
     
-    by_outcome = {}
-    by_model = {}
-    by_type = {}
-    total_duration = 0
+    Unfiltered metrics come from running aggregates, kept overall and per
+    organization. With another filter or a date range they are computed by
+    the vectorised column engine over the matching records, with latency
+    percentiles from sketch bins; an organization_id limits that to the
+    organization's partition.
+    """
+    # Calendar windows in UTC, each a handful of day-bucket reads
+    now = datetime.now(timezone.utc)
+    today = int(now.replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+    tomorrow = today + DAY
     
-    for log in logs:
-        outcome = log.get("decision_outcome", "unknown")
-        by_outcome[outcome] = by_outcome.get(outcome, 0) + 1
+    filters = _filters(
+        organization_id=organization_id,
+        user_id=user_id,
+        decision_type=decision_type,
+        model_provider=model_provider,
+        risk_level=risk_level,
+    )
+    if set(filters) - {"organization_id"} or start_date or end_date:
+        summary = audit_logs_db.aggregate(filters, start=start_date, end=end_date)
+        total = summary["count"]
+        timestamps = summary["timestamps"] // 1_000_000_000
         
-        model = log["model_name"]
-        by_model[model] = by_model.get(model, 0) + 1
+        def window_count(start: int) -> int:
+            return int(np.count_nonzero((timestamps >= start) & (timestamps < tomorrow)))
         
-        dtype = log.get("decision_type", "unknown")
-        by_type[dtype] = by_type.get(dtype, 0) + 1
+        def rate(count: int) -> float:
+            return count / total * 100 if total > 0 else 0
         
-        total_duration += log["duration_ms"]
+        return MetricsResponse(
+            total_today=window_count(today),
+            total_week=window_count(today - 6 * DAY),
+            total_month=window_count(today - 29 * DAY),
+            approval_rate=rate(summary["by_outcome"].get("approved", 0)),
+            denial_rate=rate(summary["by_outcome"].get("denied", 0)),
+            flagged_rate=rate(summary["flagged"]),
+            avg_duration_ms=summary["duration_sum"] / total if total > 0 else 0,
+            latency=summary["latency"],
+            by_outcome=summary["by_outcome"],
+            by_model=summary["by_model"],
+            by_decision_type=summary["by_decision_type"],
+            latency_by_model=summary["latency_by_model"],
+            latency_by_decision_type=summary["latency_by_decision_type"]
+        )
     
-    approved = by_outcome.get("approved", 0)
-    denied = by_outcome.get("denied", 0)
-    flagged_count = sum(1 for l in logs if l.get("flagged"))
+    return current_metrics(organization_id)
+
+
+@app.get("/api/v1/metrics/latency", response_model=LatencyResponse)
+async def get_latency_percentiles(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    organization_id: Optional[str] = None,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Get p50/p95/p99 durations over a window, overall and per model and
+    decision type. Defaults to the last 24 hours.
     
-    return MetricsResponse(
-        total_today=total,  # Demo - all treated as today
-        total_week=total,
-        total_month=total,
-        approval_rate=approved / total * 100 if total > 0 else 0,
-        denial_rate=denied / total * 100 if total > 0 else 0,
-        flagged_rate=flagged_count / total * 100 if total > 0 else 0,
-        avg_duration_ms=total_duration / total if total > 0 else 0,
-        by_outcome=by_outcome,
-        by_model=by_model,
-        by_decision_type=by_type
+    Percentiles come from merging the rollup buckets' sketches, never from
+    the raw durations. With organization_id they come from that
+    organization's daily buckets, so the window is rounded out to whole
+    UTC days.
+    """
+    now = int(datetime.now(timezone.utc).timestamp())
+    end_s = epoch_ns(end) // 1_000_000_000 if end else now
+    start_s = epoch_ns(start) // 1_000_000_000 if start else end_s - 24 * HOUR
+    if start_s > end_s:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    
+    window = organization_metrics(organization_id).rollups.window(start_s, end_s + 1)
+    
+    return LatencyResponse(
+        start=datetime.fromtimestamp(start_s, tz=timezone.utc),
+        end=datetime.fromtimestamp(end_s, tz=timezone.utc),
+        count=window.count,
+        latency=percentiles(window.latency.overall),
+        by_model={k: percentiles(v) for k, v in window.latency.by_model.items()},
+        by_decision_type={k: percentiles(v) for k, v in window.latency.by_decision_type.items()}
+    )
+
+
+MAX_SERIES_POINTS = 1440
+
+
+@app.get("/api/v1/metrics/timeseries", response_model=TimeSeriesResponse)
+async def get_metrics_timeseries(
+    resolution: str = Query(default="hour"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    organization_id: Optional[str] = None,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Get event counts, flags, latency and outcomes per time bucket, overall
+    or for one organization.
+    
+    Defaults to the last 60 buckets of the chosen resolution. Organizations
+    are only rolled up by day, so with organization_id the resolution must
+    be "day".
+    """
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"resolution must be one of: {', '.join(RESOLUTIONS)}"
+        )
+    width = RESOLUTIONS[resolution]
+    
+    now = int(datetime.now(timezone.utc).timestamp())
+    end_s = epoch_ns(end) // 1_000_000_000 if end else now
+    start_s = epoch_ns(start) // 1_000_000_000 if start else end_s - 59 * width
+    if start_s > end_s:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end_s - start_s) // width + 1 > MAX_SERIES_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail="Too many points requested, use a coarser resolution"
+        )
+    rollups = organization_metrics(organization_id).rollups
+    if width not in rollups.retention:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{resolution} buckets are not kept per organization, use day"
+        )
+    keep = rollups.retention[width]
+    if keep is not None and start_s < now - keep:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"{resolution} buckets are only kept for {keep // DAY} days, "
+                "use a coarser resolution"
+            )
+        )
+    
+    points = [
+        TimeSeriesPoint(
+            timestamp=datetime.fromtimestamp(bucket_start, tz=timezone.utc),
+            count=bucket.count,
+            flagged=bucket.flagged,
+            avg_duration_ms=bucket.avg_duration_ms,
+            latency=percentiles(bucket.latency.overall),
+            by_outcome=bucket.by_outcome
+        )
+        for bucket_start, bucket in rollups.series(width, start_s, end_s)
+    ]
+    
+    return TimeSeriesResponse(
+        resolution=resolution,
+        start=datetime.fromtimestamp(start_s, tz=timezone.utc),
+        end=datetime.fromtimestamp(end_s, tz=timezone.utc),
+        points=points
     )
 
 
@@ -333,7 +1296,10 @@ def seed_demo_data():
             "decision_outcome": "approved",
             "confidence_score": 0.92,
             "reasoning": "Credit score exceeds 700 threshold, DTI below 40%",
-            "factors": {"credit_score": {"value": 720, "passed": True}, "dti": {"value": 0.35, "passed": True}},
+            "factors": {
+                "credit_score": {"value": 720, "passed": True},
+                "dti": {"value": 0.35, "passed": True}
+            },
             "compliance_tags": ["SOC2", "FCRA"],
             "risk_level": "low",
             "metadata": {"loan_amount": 25000}
@@ -357,7 +1323,10 @@ def seed_demo_data():
             "decision_outcome": "denied",
             "confidence_score": 0.87,
             "reasoning": "DTI 48% exceeds maximum 45% threshold",
-            "factors": {"credit_score": {"value": 680, "passed": True}, "dti": {"value": 0.48, "passed": False}},
+            "factors": {
+                "credit_score": {"value": 680, "passed": True},
+                "dti": {"value": 0.48, "passed": False}
+            },
             "compliance_tags": ["SOC2", "FCRA", "ECOA"],
             "risk_level": "high",
             "metadata": {"loan_amount": 50000}
@@ -390,23 +1359,12 @@ def seed_demo_data():
     
     for log_data in demo_logs:
         log = AuditLogCreate(**log_data)
-        log_id = str(uuid4())
-        content_hash = generate_content_hash(log)
-        flagged = (
-            (log.confidence_score is not None and log.confidence_score < 0.7) or
-            log.risk_level in ["high", "critical"]
-        )
-        audit_logs_db[log_id] = {
-            "id": log_id,
-            **log.model_dump(),
-            "content_hash": content_hash,
-            "flagged": flagged,
-            "indexed_at": datetime.now(timezone.utc).isoformat()
-        }
+        audit_logs_db.insert(build_record(log, datetime.now(timezone.utc).isoformat()))
 
 
-# Seed on startup
-seed_demo_data()
+# Seed on first startup; a persistent store keeps its records across restarts
+if len(audit_logs_db) == 0:
+    seed_demo_data()
 
 
 if __name__ == "__main__":
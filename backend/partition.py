@@ -0,0 +1,371 @@
+"""
+AI Audit Layer - Tenant Partitions
+Per-organization columns, time index, text index and metrics
+"""
+
+from typing import Optional, List, Dict, Any, Tuple, Iterator, Callable, TypeVar
+import sys
+import threading
+
+import numpy as np
+
+from aggregates import MetricsAggregator, OrganizationRollup, ORGANIZATION_RETENTION, group_key
+from columns import ColumnStore, GrowableArray, Prepared, Selection
+from text_index import TextIndex, TextQuery
+
+
+# Sort key of the time index: (epoch nanoseconds, log id)
+TimeKey = Tuple[int, str]
+
+# Phrase candidates checked against stored text to give an exact total
+PHRASE_COUNT_LIMIT = 2000
+# Phrase candidates read from storage at a time
+PHRASE_BATCH = 256
+
+T = TypeVar("T")
+
+
+class Partition:
+    """
+    One organization's in-memory indexes over the shared storage engine.
+
+    Holds the organization's summary `columns`, addressed by a row number
+    local to the partition, and a time index of (epoch_ns, id) order kept
+    as a sorted timestamp array beside the matching row numbers, so
+    timestamp ranges and cursors are binary searches. Equality filters are
+    boolean masks over the columns of that range; while records have
+    arrived in time order the range is a plain slice of every column and
+    nothing is gathered.
+
+    `metrics` holds the organization's running aggregates with daily
+    OrganizationRollup buckets, `text` its inverted index and `request_ids`
+    its idempotency keys. Nothing here is shared with other organizations,
+    so every cost of a query scoped to one grows with that organization's
+    records only. Times are epoch nanoseconds throughout; `read` fetches
+    full records from storage for phrase checks.
+
+    Inserts and queries run on the event loop. Walks may also be advanced
+    from a verification job's thread, so add() and each step of a walk
+    hold the partition's lock; an insert that shifts the time index never
+    lands between a step reading positions and mapping them to rows.
+    """
+
+    def __init__(
+        self,
+        organization_id: Optional[str],
+        number: int,
+        read: Callable[[List[str]], Dict[str, dict]],
+    ):
+        self.organization_id = organization_id
+        self.number = number
+        self._read = read
+        self.columns = ColumnStore()
+        # request_id -> log id
+        self.request_ids: Dict[str, str] = {}
+        self._time_ts = GrowableArray(np.int64)
+        self._time_rows = GrowableArray(np.int64)
+        # True while time order equals row order
+        self._in_order = True
+        self.metrics = MetricsAggregator(ORGANIZATION_RETENTION, OrganizationRollup)
+        self.text = TextIndex()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def add(self, record: dict, ts: int, prepared: Optional[Prepared] = None) -> int:
+        """
+        Index a record stamped ts epoch nanoseconds and return its row
+        number; `prepared` is its ColumnStore.prepare() result, if known.
+        """
+        log_id = record["id"]
+        with self._lock:
+            row = self.columns.append(record, ts, prepared)
+            self.text.add(row, record)
+            self.request_ids[record["request_id"]] = log_id
+
+            key = (ts, log_id)
+            # Events mostly arrive in time order, making this an append
+            n = len(self._time_ts)
+            if n == 0 or key > (self._time_ts[n - 1], self.columns.ids[self._time_rows[n - 1]]):
+                self._time_ts.append(ts)
+                self._time_rows.append(row)
+            else:
+                position = self.position(key)
+                self._time_ts.insert(position, ts)
+                self._time_rows.insert(position, row)
+                self._in_order = False
+
+            self.metrics.add(record, ts)
+        return row
+
+    def position(self, key: TimeKey) -> int:
+        """Return the index of the first time index key >= key."""
+        ts, log_id = key
+        times = self._time_ts.view()
+        position = int(np.searchsorted(times, ts, "left"))
+        end = int(np.searchsorted(times, ts, "right"))
+        # Equal timestamps are ordered by id
+        ids = self.columns.ids
+        while position < end and ids[self._time_rows[position]] < log_id:
+            position += 1
+        return position
+
+    def _selection(self, lo: int, hi: int) -> Selection:
+        """Return the rows of time index positions [lo, hi) for indexing columns."""
+        if self._in_order:
+            return slice(lo, hi)
+        return self._time_rows.view()[lo:hi]
+
+    def _rows_at(self, positions: np.ndarray) -> np.ndarray:
+        """Map time index positions to row numbers."""
+        if self._in_order:
+            return positions
+        return self._time_rows.view()[positions]
+
+    def _key_at(self, position: int) -> TimeKey:
+        return self._time_ts[position], self.columns.ids[self._time_rows[position]]
+
+    def bounds(self, start: Optional[int], end: Optional[int]) -> Tuple[int, int]:
+        """Return the [lo, hi) slice of the time index covering start..end inclusive."""
+        times = self._time_ts.view()
+        lo = 0 if start is None else int(np.searchsorted(times, start, "left"))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, "right"))
+        return lo, max(lo, hi)
+
+    def newest(
+        self,
+        filters: Dict[str, Any],
+        start: Optional[int],
+        end: Optional[int],
+        count: int,
+        before: Optional[TimeKey] = None,
+        count_total: bool = True,
+        text: Optional[TextQuery] = None,
+    ) -> Tuple[Optional[int], np.ndarray]:
+        """
+        Return (total, rows) of the records matching every filter, with at
+        most `count` row numbers, newest first.
+
+        Unfiltered queries are answered straight from the time index. With
+        equality filters, one mask is built over the time range and the rows
+        are its last `count` set positions, reversed. A text query adds its
+        inverted index candidates as one more mask. `before` restricts the
+        rows to keys strictly older than a cursor key.
+
+        Phrase candidates are checked against the stored text newest first,
+        only until `count` are found. The total is exact when there are at
+        most PHRASE_COUNT_LIMIT candidates and None beyond that, as it is
+        with count_total=False.
+        """
+        lo, hi = self.bounds(start, end)
+        if before is not None:
+            hi = max(lo, min(hi, self.position(before)))
+        selection = self._selection(lo, hi)
+        mask = self.columns.mask(filters, selection)
+        if text is not None:
+            matches = self.text.mask(text, len(self.columns))[selection]
+            mask = matches if mask is None else np.logical_and(mask, matches, out=mask)
+
+        if mask is None:
+            total = hi - lo
+            positions = np.arange(max(lo, hi - count), hi)[::-1]
+        elif text is not None and text.phrases:
+            matched = np.flatnonzero(mask)[::-1] + lo
+            exact = count_total and len(matched) <= PHRASE_COUNT_LIMIT
+            verified = self._verify_phrases(matched, text, None if exact else count)
+            total = len(verified) if exact else None
+            positions = verified[:count]
+        else:
+            matched = np.flatnonzero(mask)
+            total = len(matched)
+            positions = matched[::-1][:count] + lo
+
+        return (total if count_total else None), self._rows_at(positions)
+
+    def _verify_phrases(self, positions: np.ndarray, text: TextQuery, needed: Optional[int]) -> np.ndarray:
+        """Return the positions whose stored text holds every phrase, stopping at `needed`."""
+        verified: List[int] = []
+        ids = self.columns.ids
+        for first in range(0, len(positions), PHRASE_BATCH):
+            batch = positions[first:first + PHRASE_BATCH]
+            log_ids = [ids[row] for row in self._rows_at(batch).tolist()]
+            found = self._read(log_ids)
+            for position, log_id in zip(batch.tolist(), log_ids):
+                record = found.get(log_id)
+                if record is not None and self.text.matches(text, record):
+                    verified.append(position)
+            if needed is not None and len(verified) >= needed:
+                break
+        return np.array(verified, dtype=np.int64)
+
+    def matching_rows(self, filters: Dict[str, Any], start: Optional[int], end: Optional[int]) -> Selection:
+        """
+        Return the rows matching filters and range, oldest first.
+
+        Matches are resolved to row numbers once; an unfiltered range over
+        in-order rows stays a slice, so column reads through it are views.
+        """
+        lo, hi = self.bounds(start, end)
+        selection = self._selection(lo, hi)
+        mask = self.columns.mask(filters, selection)
+        return selection if mask is None else self._rows_at(np.flatnonzero(mask) + lo)
+
+    def _walk(
+        self,
+        filters: Dict[str, Any],
+        start: Optional[int],
+        end: Optional[int],
+        after: Optional[TimeKey],
+        batch_size: int,
+        window: int,
+        read: Callable[[np.ndarray], Optional[T]],
+    ) -> Iterator[T]:
+        """
+        Find the time index positions of matching records in batches, oldest
+        first, and yield what `read` makes of each batch unless it is None;
+        for scan_keys(), counts() and content_digests().
+
+        The walk resumes from the last key it yielded (or `after`, exclusive)
+        each step, masking at most `window` time index positions at a time, so
+        memory stays flat however many records match and records inserted
+        meanwhile never shift it. Positions are only valid until the next
+        insert, so `read` maps them under the lock in the same step.
+        """
+        while True:
+            with self._lock:
+                lo, hi = self.bounds(start, end)
+                if after is not None:
+                    position = self.position(after)
+                    if position < len(self._time_ts) and self._key_at(position) == after:
+                        position += 1
+                    lo = max(lo, position)
+                if lo >= hi:
+                    return
+                top = min(hi, lo + window)
+                mask = self.columns.mask(filters, self._selection(lo, top))
+                if mask is None:
+                    positions = np.arange(lo, min(top, lo + batch_size))
+                else:
+                    positions = np.flatnonzero(mask)[:batch_size] + lo
+                # A window with fewer matches than a batch is finished
+                last = int(positions[-1]) if len(positions) == batch_size else top - 1
+                after = self._key_at(last)
+                result = read(positions) if len(positions) else None
+            if result is not None:
+                yield result
+
+    def scan_keys(
+        self,
+        filters: Dict[str, Any],
+        start: Optional[int],
+        end: Optional[int],
+        after: Optional[TimeKey],
+        batch_size: int,
+        window: int,
+    ) -> Iterator[List[TimeKey]]:
+        """Yield the keys of matching records in batches, oldest first (see _walk)."""
+        def keys(positions: np.ndarray) -> List[TimeKey]:
+            ids = self.columns.ids
+            times = self._time_ts.view()[positions].tolist()
+            return [(ts, ids[row]) for ts, row in zip(times, self._rows_at(positions).tolist())]
+
+        return self._walk(filters, start, end, after, batch_size, window, keys)
+
+    def counts(
+        self,
+        filters: Dict[str, Any],
+        start: Optional[int],
+        end: Optional[int],
+        rows: int,
+        window: int,
+    ) -> Iterator[int]:
+        """Yield how many matching records among the first `rows` each window holds (see _walk)."""
+        def count(positions: np.ndarray) -> int:
+            return int(np.count_nonzero(self._rows_at(positions) < rows))
+
+        return self._walk(filters, start, end, None, window, window, count)
+
+    def content_digests(
+        self,
+        filters: Dict[str, Any],
+        start: Optional[int],
+        end: Optional[int],
+        rows: int,
+        batch_size: int,
+        window: int,
+    ) -> Iterator[Tuple[List[str], bytes]]:
+        """
+        Yield (ids, indexed content hash digests joined 32 bytes each) of
+        the matching records among the first `rows`, in batches, oldest
+        first (see _walk).
+        """
+        def digests(positions: np.ndarray) -> Optional[Tuple[List[str], bytes]]:
+            found = self._rows_at(positions)
+            found = found[found < rows].tolist()
+            if not found:
+                return None
+            ids = self.columns.ids
+            # Sliced out one by one: a NumPy view would pin the growing hash buffer
+            hashes = self.columns.content_hashes
+            return [ids[row] for row in found], b"".join(hashes[row * 32:row * 32 + 32] for row in found)
+
+        return self._walk(filters, start, end, None, batch_size, window, digests)
+
+    def aggregate(self, filters: Dict[str, Any], start: Optional[int], end: Optional[int]) -> Dict[str, Any]:
+        """
+        Compute mergeable dashboard figures over the records matching filters
+        and range.
+
+        Counts are mask sums, and the outcome histogram a bincount of codes.
+        Models and decision types map to per-latency-bin counts from one
+        bincount over (code, latency bin) pairs: a group's sum is its count,
+        its bins its latency sketch. `latency` holds the bins of every match
+        and `timestamps` the matching epoch_ns values.
+        """
+        rows = self.matching_rows(filters, start, end)
+        columns = self.columns
+
+        bins = columns.latency_bins.view()[rows]
+        n_bins = int(bins.max()) + 1 if len(bins) else 1
+
+        def by_code(field: str, key: Callable[[Any], Any]) -> Dict[str, np.ndarray]:
+            column = columns.categorical[field]
+            pairs = column.codes.view()[rows].astype(np.int64) * n_bins + bins
+            counts = np.bincount(pairs, minlength=len(column.values) * n_bins)
+            counts = counts.reshape(len(column.values), n_bins)
+            groups: Dict[str, np.ndarray] = {}
+            for code in np.flatnonzero(counts.sum(axis=1)).tolist():
+                name = key(column.values[code])
+                # None and "" are distinct codes that share the "unknown" group
+                groups[name] = groups[name] + counts[code] if name in groups else counts[code]
+            return groups
+
+        outcomes: Dict[str, int] = {}
+        for value, n in columns.categorical["decision_outcome"].counts(rows).items():
+            outcomes[group_key(value)] = outcomes.get(group_key(value), 0) + n
+        return {
+            "count": len(bins),
+            "flagged": int(np.count_nonzero(columns.flagged.take(rows))),
+            "duration_sum": int(columns.integer["duration_ms"].view()[rows].sum()),
+            "timestamps": columns.timestamps.view()[rows],
+            "by_outcome": outcomes,
+            "by_model": by_code("model_name", lambda value: value),
+            "by_decision_type": by_code("decision_type", group_key),
+            "latency": np.bincount(bins, minlength=n_bins),
+        }
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Return the bytes held by each of the partition's indexes, spare
+        capacity included. Metric rollups are left out: they grow with days
+        of data, not with records.
+        """
+        usage = {
+            "columns": self.columns.nbytes,
+            "time_index": self._time_ts.nbytes + self._time_rows.nbytes,
+            "request_ids": sys.getsizeof(self.request_ids),
+            "text_index": self.text.nbytes,
+        }
+        usage["total"] = sum(usage.values())
+        return usage
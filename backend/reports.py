@@ -0,0 +1,550 @@
+"""
+AI Audit Layer - Compliance Reports
+Decision and system audit reports built from per-organization rollups
+"""
+
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+import json
+import re
+import threading
+
+from aggregates import percentiles
+
+
+REPORT_TYPES = ("decision_audit", "system_audit")
+
+REPORT_FORMATS = {
+    "markdown": ("text/markdown", "md"),
+    "json": ("application/json", "json"),
+    "pdf": ("application/pdf", "pdf"),
+}
+
+# Most recent flagged decisions listed in a report
+FLAGGED_SAMPLE = 25
+# Integrity failures listed in a system audit report
+MAX_LISTED_FAILURES = 10
+
+_PERIOD = re.compile(r"^(\d{4})(?:-(?:Q([1-4])|(\d{2})))?$")
+
+
+def _month_start(year: int, month: int) -> datetime:
+    """First instant of a month, normalising months outside 1..12."""
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def parse_period(period: str) -> Tuple[datetime, datetime, datetime]:
+    """
+    Parse a reporting period: a year ("2024"), quarter ("2024-Q4") or month
+    ("2024-10"). Returns (start, end, previous start); the period is
+    [start, end) and the one before it [previous start, start). Raises
+    ValueError for anything else.
+    """
+    match = _PERIOD.match(period)
+    if match is None:
+        raise ValueError(f"Invalid period: {period}")
+    year, quarter, month = match.groups()
+    year = int(year)
+    if quarter:
+        first, months = 3 * int(quarter) - 2, 3
+    elif month:
+        first, months = int(month), 1
+        if not 1 <= first <= 12:
+            raise ValueError(f"Invalid period: {period}")
+    else:
+        first, months = 1, 12
+    return (
+        _month_start(year, first),
+        _month_start(year, first + months),
+        _month_start(year, first - months),
+    )
+
+
+def _rate(count: int, total: int) -> float:
+    return count / total * 100 if total > 0 else 0
+
+
+class ReportEngine:
+    """
+    Builds compliance reports for an organization and period.
+
+    Every figure comes from the daily rollups in the organization's
+    partition metrics, so a quarter costs about ninety bucket merges
+    however many decisions it holds. Only the sample of
+    recent flagged decisions and, for system audits, the ledger check
+    look past the rollups. The ledger check reports the latest persisted
+    checkpoint and verifies only from it to the chain head: logs up to it
+    were checked against the persisted roots when the ledger was restored,
+    and any break found then is listed with the failures.
+
+    Built reports are cached by (organization, period, report type) along
+    with the record counts of the period and the one before it, and for
+    system audits the chain length. The store only ever appends, so the
+    cache entry is stale exactly when one of those has moved, i.e. when new
+    data has landed in the period or, for a system audit, in the chain.
+
+    The rollups, columns and ledger are only updated on the event loop, so
+    everything a report reads from the store is copied there first (see
+    _snapshot) and a background job only assembles the copies.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._cache: Dict[Tuple[str, str, str], Tuple[Tuple[int, ...], Dict[str, Any]]] = {}
+        self._jobs: Dict[str, "ReportJob"] = {}
+        self._lock = threading.Lock()
+
+    def _version(self, organization_id: str, report_type: str, period: str) -> Tuple[int, ...]:
+        start, end, previous = parse_period(period)
+        rollups = self.store.partitions[organization_id].metrics.rollups
+        version = (
+            rollups.window(int(start.timestamp()), int(end.timestamp())).count,
+            rollups.window(int(previous.timestamp()), int(start.timestamp())).count,
+        )
+        if report_type == "system_audit":
+            version += (len(self.store.ledger.get(organization_id)),)
+        return version
+
+    def cached(self, organization_id: str, report_type: str, period: str) -> Optional[Dict[str, Any]]:
+        """Return the cached report if no data has landed in its period since it was built."""
+        entry = self._cache.get((organization_id, period, report_type))
+        if entry is None or entry[0] != self._version(organization_id, report_type, period):
+            return None
+        return entry[1]
+
+    def build(self, organization_id: str, report_type: str, period: str) -> Dict[str, Any]:
+        """Build a report, or return the cached one if it is still current."""
+        report = self.cached(organization_id, report_type, period)
+        if report is not None:
+            return report
+        snapshot = self._snapshot(organization_id, report_type, period)
+        return self._store(organization_id, report_type, period, snapshot)
+
+    def _store(
+        self, organization_id: str, report_type: str, period: str, snapshot: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        report = self._build(organization_id, report_type, period, snapshot)
+        self._cache[(organization_id, period, report_type)] = (snapshot["version"], report)
+        return report
+
+    def _snapshot(self, organization_id: str, report_type: str, period: str) -> Dict[str, Any]:
+        """
+        Read what a report needs from the store: the merged rollup windows
+        of the period and the one before, the flagged sample, the audit
+        trail of a system audit and the cache version they make up. Call on
+        the event loop; the windows are fresh merges and the rest new
+        objects, so nothing returned changes with later inserts.
+        """
+        start, end, previous = parse_period(period)
+        rollups = self.store.partitions[organization_id].metrics.rollups
+        window = rollups.window(int(start.timestamp()), int(end.timestamp()))
+        before = rollups.window(int(previous.timestamp()), int(start.timestamp())).count
+        # The newest flagged decisions, answered by the column engine
+        _, recent = self.store.query(
+            {"organization_id": organization_id, "flagged": True},
+            start=start,
+            end=end - timedelta(microseconds=1),
+            limit=FLAGGED_SAMPLE,
+            count_total=False,
+        )
+        snapshot = {"version": (window.count, before), "window": window, "before": before, "recent": recent}
+        if report_type == "system_audit":
+            snapshot["audit_trail"] = self._audit_trail(organization_id, start, end)
+            snapshot["version"] += (snapshot["audit_trail"]["chain_length"],)
+        return snapshot
+
+    def _build(
+        self, organization_id: str, report_type: str, period: str, snapshot: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        start, end, _ = parse_period(period)
+        window = snapshot["window"]
+        before = snapshot["before"]
+        total = window.count
+
+        report: Dict[str, Any] = {
+            "report_id": f"{'SYS' if report_type == 'system_audit' else 'DEC'}-{period}-{organization_id}",
+            "report_type": report_type,
+            "organization_id": organization_id,
+            "period": period,
+            "period_start": start.isoformat(),
+            "period_end": end.isoformat(),
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "summary": {
+                "total_decisions": total,
+                "previous_period_decisions": before,
+                "change_pct": (total - before) / before * 100 if before else None,
+                "approval_rate": _rate(window.by_outcome.get("approved", 0), total),
+                "denial_rate": _rate(window.by_outcome.get("denied", 0), total),
+                "flagged": window.flagged,
+                "flagged_rate": _rate(window.flagged, total),
+                "avg_duration_ms": window.avg_duration_ms,
+            },
+            "distribution": {
+                "by_decision_type": {k: v.count for k, v in window.latency.by_decision_type.items()},
+                "by_outcome": dict(window.by_outcome),
+                "by_model": {k: v.count for k, v in window.latency.by_model.items()},
+                "by_risk_level": dict(window.by_risk_level),
+            },
+        }
+
+        report["flagged_decisions"] = {
+            "count": window.flagged,
+            "recent": [
+                {
+                    "id": r["id"],
+                    "timestamp": r["timestamp"].isoformat(),
+                    "decision_type": r["decision_type"],
+                    "decision_outcome": r["decision_outcome"],
+                    "model_name": r["model_name"],
+                    "risk_level": r["risk_level"],
+                    "confidence_score": r["confidence_score"],
+                }
+                for r in snapshot["recent"]
+            ],
+        }
+
+        if report_type == "system_audit":
+            report["model_performance"] = [
+                {
+                    "model_name": model,
+                    "decisions": sketch.count,
+                    "share_pct": _rate(sketch.count, total),
+                    "flagged_rate": _rate(window.flagged_by_model.get(model, 0), sketch.count),
+                    "avg_confidence": (
+                        window.confidence_sum[model] / window.confidence_count[model]
+                        if window.confidence_count.get(model) else None
+                    ),
+                    "latency": percentiles(sketch),
+                }
+                for model, sketch in sorted(window.latency.by_model.items(), key=lambda item: -item[1].count)
+            ]
+            report["audit_trail"] = snapshot["audit_trail"]
+        return report
+
+    def _audit_trail(self, organization_id: str, start: datetime, end: datetime) -> Dict[str, Any]:
+        ledger = self.store.ledger
+        org = ledger.get(organization_id)
+        length = len(org)
+        latest = org.checkpoints[-1] if org.checkpoints else None
+        # From the last log the checkpoint covers, so its root is compared too
+        first = latest["tree_size"] - 1 if latest else 0
+        result = self.store.verify_chain(organization_id, first, length)
+        earlier = [
+            {"chain_seq": broken["chain_seq"], "reason": broken["reason"]}
+            for broken in ledger.breaks
+            if broken["organization_id"] == organization_id and broken["chain_seq"] < first
+        ]
+        checkpoints = [
+            checkpoint for checkpoint in org.checkpoints
+            if checkpoint["created_at"]
+            and start <= datetime.fromisoformat(checkpoint["created_at"].replace("Z", "+00:00")) < end
+        ]
+        return {
+            "chain_length": length,
+            "head": ledger.head(organization_id),
+            "latest_checkpoint": latest,
+            "verified_from_seq": first,
+            "checkpoints_in_period": checkpoints,
+            "valid": result["valid"] and not earlier,
+            "logs_checked": result["logs_checked"],
+            "nodes_checked": result["nodes_checked"],
+            "checkpoints_checked": result["checkpoints_checked"],
+            "failures": (earlier + result["failures"])[:MAX_LISTED_FAILURES],
+        }
+
+    def submit(self, organization_id: str, report_type: str, period: str) -> "ReportJob":
+        """
+        Build a report in the background, joining a job already building it.
+        Call on the event loop, where the job's snapshot is taken.
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if not job.done and (job.organization_id, job.report_type, job.period) == (
+                    organization_id, report_type, period
+                ):
+                    return job
+            job = ReportJob(organization_id, report_type, period)
+            self._jobs[job.id] = job
+        try:
+            snapshot = self._snapshot(organization_id, report_type, period)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            job.finished_at = datetime.now(timezone.utc)
+            return job
+        threading.Thread(target=self._run, args=(job, snapshot), name=f"report-{job.id}", daemon=True).start()
+        return job
+
+    def _run(self, job: "ReportJob", snapshot: Dict[str, Any]) -> None:
+        job.status = "running"
+        try:
+            self._store(job.organization_id, job.report_type, job.period, snapshot)
+            job.status = "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+
+    def get_job(self, job_id: str) -> Optional["ReportJob"]:
+        return self._jobs.get(job_id)
+
+
+class ReportJob:
+    """A report being built in the background."""
+
+    def __init__(self, organization_id: str, report_type: str, period: str):
+        self.id = str(uuid4())
+        self.organization_id = organization_id
+        self.report_type = report_type
+        self.period = period
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "organization_id": self.organization_id,
+            "report_type": self.report_type,
+            "period": self.period,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+# ============================================================
+# Rendering
+# ============================================================
+
+def _table(headers: List[str], rows: Iterable[List[Any]]) -> List[str]:
+    lines = ["| " + " | ".join(headers) + " |", "|" + "|".join("---" for _ in headers) + "|"]
+    lines.extend("| " + " | ".join("-" if v is None else str(v) for v in row) + " |" for row in rows)
+    return lines
+
+
+def _pct(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.1f}%"
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:,.0f} ms"
+
+
+def _distribution(counts: Dict[str, int], total: int) -> List[str]:
+    ordered = sorted(counts.items(), key=lambda item: -item[1])
+    return _table(["Value", "Count", "Percentage"], ([k, f"{v:,}", _pct(_rate(v, total))] for k, v in ordered))
+
+
+def render_markdown(report: Dict[str, Any]) -> Iterator[str]:
+    """Yield a report as Markdown, one section at a time."""
+    summary = report["summary"]
+    total = summary["total_decisions"]
+    title = "SYSTEM AUDIT REPORT" if report["report_type"] == "system_audit" else "DECISION AUDIT REPORT"
+    yield "\n".join([
+        f"# {title}",
+        f"{report['period']} | {report['period_start'][:10]} to {report['period_end'][:10]} (exclusive)",
+        "",
+        f"**Organization:** {report['organization_id']}",
+        f"**Report ID:** {report['report_id']}",
+        f"**Generated:** {report['generated_at']}",
+        "",
+    ]) + "\n"
+
+    yield "\n".join([
+        "## EXECUTIVE SUMMARY",
+        "",
+        *_table(["Metric", "Value"], [
+            ["Total Decisions", f"{total:,}"],
+            ["Previous Period", f"{summary['previous_period_decisions']:,}"],
+            ["Change", _pct(summary["change_pct"])],
+            ["Approval Rate", _pct(summary["approval_rate"])],
+            ["Denial Rate", _pct(summary["denial_rate"])],
+            ["Flagged for Review", f"{summary['flagged']:,} ({_pct(summary['flagged_rate'])})"],
+            ["Avg. Response Time", _ms(summary["avg_duration_ms"])],
+        ]),
+        "",
+    ]) + "\n"
+
+    distribution = report["distribution"]
+    lines = ["## DECISION DISTRIBUTION", ""]
+    for heading, key in (
+        ("By Decision Type", "by_decision_type"),
+        ("By Outcome", "by_outcome"),
+        ("By Model", "by_model"),
+        ("By Risk Level", "by_risk_level"),
+    ):
+        lines += [f"### {heading}", *_distribution(distribution[key], total), ""]
+    yield "\n".join(lines) + "\n"
+
+    if "model_performance" in report:
+        yield "\n".join([
+            "## MODEL PERFORMANCE",
+            "",
+            *_table(
+                ["Model", "Decisions", "Flag Rate", "Avg Confidence", "P50", "P95", "P99"],
+                (
+                    [
+                        m["model_name"],
+                        f"{m['decisions']:,}",
+                        _pct(m["flagged_rate"]),
+                        "-" if m["avg_confidence"] is None else f"{m['avg_confidence'] * 100:.1f}%",
+                        _ms(m["latency"]["p50"]),
+                        _ms(m["latency"]["p95"]),
+                        _ms(m["latency"]["p99"]),
+                    ]
+                    for m in report["model_performance"]
+                ),
+            ),
+            "",
+        ]) + "\n"
+
+    flagged = report["flagged_decisions"]
+    lines = [
+        "## FLAGGED DECISIONS",
+        "",
+        f"{flagged['count']:,} decisions were flagged for review; the most recent are listed.",
+        "",
+        *_table(
+            ["Log ID", "Timestamp", "Type", "Outcome", "Model", "Risk", "Confidence"],
+            (
+                [
+                    r["id"],
+                    r["timestamp"][:19],
+                    r["decision_type"],
+                    r["decision_outcome"],
+                    r["model_name"],
+                    r["risk_level"],
+                    r["confidence_score"],
+                ]
+                for r in flagged["recent"]
+            ),
+        ),
+        "",
+    ]
+    yield "\n".join(lines) + "\n"
+
+    if "audit_trail" in report:
+        trail = report["audit_trail"]
+        latest = trail["latest_checkpoint"]
+        lines = [
+            "## AUDIT TRAIL VERIFICATION",
+            "",
+            *_table(["Attribute", "Value"], [
+                ["Chain Verified", "Yes" if trail["valid"] else "NO"],
+                ["Chain Length", f"{trail['chain_length']:,}"],
+                ["Merkle Root", trail["head"]["root"]],
+                ["Head Chain Hash", trail["head"]["chain_hash"]],
+                ["Latest Checkpoint", "-" if latest is None else f"{latest['tree_size']:,} logs"],
+                ["Checkpoint Root", "-" if latest is None else latest["root"]],
+                ["Verified From Seq", f"{trail['verified_from_seq']:,}"],
+                ["Logs Verified", f"{trail['logs_checked']:,}"],
+                ["Merkle Nodes Checked", f"{trail['nodes_checked']:,}"],
+                ["Checkpoints Checked", f"{trail['checkpoints_checked']:,}"],
+                ["Checkpoints in Period", f"{len(trail['checkpoints_in_period']):,}"],
+            ]),
+            "",
+        ]
+        if trail["failures"]:
+            lines += ["### Failures", *_table(
+                ["Chain Seq", "Reason"], ([f["chain_seq"], f["reason"]] for f in trail["failures"])
+            ), ""]
+        yield "\n".join(lines) + "\n"
+
+    yield "_This report was generated from the AI Audit Layer rollups and integrity ledger._\n"
+
+
+def render_json(report: Dict[str, Any]) -> Iterator[bytes]:
+    yield json.dumps(report, indent=2).encode()
+
+
+# Courier at 8pt: 7.2 columns per inch over a US Letter page with half-inch margins
+_PDF_FONT_SIZE = 8
+_PDF_LEADING = 10
+_PDF_LINES_PER_PAGE = 72
+_PDF_COLUMNS = 120
+
+
+def _pdf_escape(line: str) -> bytes:
+    text = line.encode("latin-1", "replace")
+    return text.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def render_pdf(lines: Iterable[str]) -> Iterator[bytes]:
+    """
+    Typeset text lines as a PDF, yielding each page as soon as it is full.
+
+    Objects are written in the order they are produced and the page tree,
+    catalog and cross-reference table come last, once the page count is known.
+    """
+    offsets: Dict[int, int] = {}
+    position = 0
+    pages: List[int] = []
+    next_object = 4
+
+    def emit(number: int, body: bytes) -> bytes:
+        nonlocal position
+        offsets[number] = position
+        data = b"%d 0 obj\n" % number + body + b"\nendobj\n"
+        position += len(data)
+        return data
+
+    def page(text: List[str]) -> bytes:
+        nonlocal next_object
+        content = b"BT /F1 %d Tf %d TL 36 756 Td\n" % (_PDF_FONT_SIZE, _PDF_LEADING)
+        content += b"".join(b"(" + _pdf_escape(line) + b") '\n" for line in text) + b"ET"
+        stream, page_object = next_object, next_object + 1
+        next_object += 2
+        pages.append(page_object)
+        return (
+            emit(stream, b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+            + emit(page_object, (
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % stream
+            ))
+        )
+
+    header = b"%PDF-1.4\n"
+    position = len(header)
+    yield header + emit(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>")
+
+    buffered: List[str] = []
+    for line in lines:
+        # Wrap long lines rather than letting them run off the page
+        while True:
+            buffered.append(line[:_PDF_COLUMNS])
+            line = line[_PDF_COLUMNS:]
+            if len(buffered) == _PDF_LINES_PER_PAGE:
+                yield page(buffered)
+                buffered = []
+            if not line:
+                break
+    if buffered or not pages:
+        yield page(buffered)
+
+    kids = b" ".join(b"%d 0 R" % number for number in pages)
+    tail = emit(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(pages)))
+    tail += emit(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    xref = b"xref\n0 %d\n0000000000 65535 f \n" % (next_object,)
+    xref += b"".join(b"%010d 00000 n \n" % offsets[number] for number in range(1, next_object))
+    tail += xref + b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (next_object, position)
+    yield tail
+
+
+def render(report: Dict[str, Any], format: str) -> Iterator[bytes]:
+    """Stream a report in one of REPORT_FORMATS."""
+    if format == "json":
+        return render_json(report)
+    if format == "pdf":
+        return render_pdf(line for section in render_markdown(report) for line in section.split("\n"))
+    return (section.encode() for section in render_markdown(report))
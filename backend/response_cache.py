@@ -0,0 +1,79 @@
+"""
+AI Audit Layer - Response Cache
+Bounded LRU of pre-encoded JSON for immutable audit records
+"""
+
+from typing import Optional, Dict, Hashable
+from collections import OrderedDict
+import threading
+
+
+# Bookkeeping per entry beyond its bytes: key, OrderedDict link, bytes header
+ENTRY_OVERHEAD = 160
+
+
+class ResponseCache:
+    """
+    Least recently used cache of encoded responses, bounded by bytes.
+
+    Audit records never change once written, so an entry never goes stale
+    and nothing is invalidated; entries only leave by eviction. Each costs
+    its length plus ENTRY_OVERHEAD against `max_bytes`, and a value larger
+    than a quarter of the budget is not cached, so one huge record cannot
+    flush everything else. Hits, misses and evictions are counted.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: Hashable, data: bytes) -> None:
+        size = len(data) + ENTRY_OVERHEAD
+        if size > self.max_bytes // 4:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous) + ENTRY_OVERHEAD
+            self._entries[key] = data
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted) + ENTRY_OVERHEAD
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
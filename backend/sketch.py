@@ -0,0 +1,114 @@
+"""
+AI Audit Layer - Quantile Sketches
+Mergeable DDSketch for streaming latency percentiles
+"""
+
+from typing import Optional, Dict
+import math
+
+
+class DDSketch:
+    """
+    Relative-error quantile sketch (Masson et al., VLDB 2019).
+
+    Values fall into logarithmic bins of ratio gamma, so every quantile is
+    returned within `relative_accuracy` of the true value. Sketches with the
+    same accuracy merge by adding bin counts, which is what lets percentiles
+    over any window be built from per-bucket sketches. Memory is capped at
+    `max_bins`; past that the lowest bins are collapsed together, trading
+    accuracy at the low end for the tail we care about.
+    """
+
+    __slots__ = ("relative_accuracy", "max_bins", "_gamma", "_log_gamma", "bins", "zero_count", "count", "min", "max")
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        """Add a non-negative value."""
+        if value < 0:
+            raise ValueError("DDSketch only accepts non-negative values")
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value == 0:
+            self.zero_count += 1
+            return
+        key = self.key(value)
+        self.bins[key] = self.bins.get(key, 0) + 1
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def key(self, value: float) -> int:
+        """Return the bin key of a positive value."""
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def value(self, key: int) -> float:
+        """Return the value reported for a bin key."""
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+    def add_bin(self, key: Optional[int], count: int) -> None:
+        """Add `count` values known only by their bin key (None for zero)."""
+        if count <= 0:
+            return
+        value = 0.0 if key is None else self.value(key)
+        self.count += count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if key is None:
+            self.zero_count += count
+            return
+        self.bins[key] = self.bins.get(key, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def merge(self, other: "DDSketch") -> None:
+        """Fold another sketch with the same relative accuracy into this one."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        if other.count == 0:
+            return
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins
+        target = keys[excess]
+        for key in keys[:excess]:
+            self.bins[target] += self.bins.pop(key)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the estimated q-quantile (0 <= q <= 1), or None when empty."""
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                value = self.value(key)
+                # Never report outside the observed range
+                return max(self.min, min(self.max, value))
+        return float(self.max)
@@ -0,0 +1,1161 @@
+"""
+AI Audit Layer - Storage Engines
+Pluggable persistence for audit records behind AuditLogStore
+"""
+
+from abc import ABC, abstractmethod
+from typing import Optional, List, Dict, Any, Tuple, Iterator, Callable
+from collections import OrderedDict
+from datetime import datetime, timezone
+import asyncio
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def encode_record(record: dict) -> bytes:
+    """Serialize a record the way every engine stores it."""
+    return json.dumps(record, default=_json_default, separators=(",", ":")).encode()
+
+
+# A picklable recipe for reading encoded records in another process:
+# ("memory", ids, payloads), ("segment", path, ids, [(offset, length), ...])
+# or ("cold", path, ids, [(block offset, block length, index), ...], codec).
+# Payloads and spans are None for ids the engine does not hold. A
+# ("dedup", source, blobs) wraps another source whose records reference
+# content-addressed blobs (see blobs.py).
+RecordSource = Tuple
+
+
+def source_ids(source: RecordSource) -> List[str]:
+    """Return the ids a RecordSource reads, in order."""
+    if source[0] == "dedup":
+        return source_ids(source[1])
+    return source[1] if source[0] == "memory" else source[2]
+
+
+# Compression codecs for cold segments: name -> (compress, decompress).
+# zlib is always available; zstd and lz4 when their packages are installed.
+CODECS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "zlib": (lambda data: zlib.compress(data, 6), zlib.decompress),
+}
+if lz4_frame is not None:
+    CODECS["lz4"] = (lz4_frame.compress, lz4_frame.decompress)
+if zstandard is not None:
+    CODECS["zstd"] = (
+        lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+    )
+
+DEFAULT_CODEC = "zstd" if "zstd" in CODECS else "lz4" if "lz4" in CODECS else "zlib"
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec not in CODECS:
+        raise RuntimeError(f"Cold segment is compressed with {codec}, which is not installed")
+    return CODECS[codec][1](data)
+
+
+# Cold block layout: record count, count + 1 payload offsets, then payloads
+_COUNT = struct.Struct("<I")
+
+
+def _pack_block(payloads: List[bytes]) -> bytes:
+    offsets = [0]
+    for payload in payloads:
+        offsets.append(offsets[-1] + len(payload))
+    return struct.pack(f"<I{len(offsets)}I", len(payloads), *offsets) + b"".join(payloads)
+
+
+def _block_payload(block: bytes, index: int) -> bytes:
+    """Return the index-th payload of a decompressed cold block."""
+    (count,) = _COUNT.unpack_from(block)
+    base = _COUNT.size + 4 * (count + 1)
+    start, end = struct.unpack_from("<II", block, _COUNT.size + 4 * index)
+    return block[base + start:base + end]
+
+
+def _block_payloads(block: bytes) -> List[bytes]:
+    (count,) = _COUNT.unpack_from(block)
+    offsets = struct.unpack_from(f"<{count + 1}I", block, _COUNT.size)
+    base = _COUNT.size + 4 * (count + 1)
+    return [block[base + offsets[i]:base + offsets[i + 1]] for i in range(count)]
+
+
+def read_source(source: RecordSource, decode: bool = True) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (id, record or None) for every id of a RecordSource, in order.
+
+    With decode=False records are yielded as their stored JSON bytes.
+    """
+    if source[0] == "dedup":
+        # Imported here because blobs builds on this module
+        from blobs import read_deduplicated
+        yield from read_deduplicated(source, decode)
+        return
+
+    load = json.loads if decode else bytes
+    if source[0] == "cold":
+        _, path, ids, spans, codec = source
+        with open(path, "rb") as f:
+            current = block = None
+            for log_id, (offset, length, index) in zip(ids, spans):
+                if current != offset:
+                    f.seek(offset)
+                    block = _decompress(codec, f.read(length))
+                    current = offset
+                yield log_id, load(_block_payload(block, index))
+        return
+
+    if source[0] == "memory":
+        _, ids, payloads = source
+        for log_id, payload in zip(ids, payloads):
+            yield log_id, None if payload is None else load(payload)
+        return
+
+    _, path, ids, spans = source
+    if path is None:
+        for log_id in ids:
+            yield log_id, None
+        return
+    with open(path, "rb") as f:
+        for log_id, span in zip(ids, spans):
+            if span is None:
+                yield log_id, None
+                continue
+            f.seek(span[0])
+            yield log_id, load(f.read(span[1])[_FRAME.size:])
+
+
+class StorageBackend(ABC):
+    """
+    Interface between the API and wherever audit records live.
+
+    append() makes records readable immediately and returns a commit token;
+    they are only guaranteed to survive a crash once wait_durable() for that
+    token has returned. Engines are free to make one sync cover many tokens.
+    """
+
+    def append(self, records: List[dict]) -> int:
+        """Write records in order and return their commit token."""
+        return self.append_encoded(records, [encode_record(record) for record in records])
+
+    @abstractmethod
+    def append_encoded(self, records: List[dict], payloads: List[bytes]) -> int:
+        """
+        Write records already encoded as `payloads` and return their commit
+        token. `records` are only read for what the engine indexes them by.
+        """
+
+    @abstractmethod
+    async def wait_durable(self, token: int) -> None:
+        """Return once every record up to `token` is durable."""
+
+    @abstractmethod
+    def get(self, log_id: str) -> Optional[dict]:
+        """Return the full record for an id, or None."""
+
+    @abstractmethod
+    def scan(self) -> Iterator[dict]:
+        """Yield every stored record in append order."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def __contains__(self, log_id: str) -> bool:
+        return self.get(log_id) is not None
+
+    def sources(self, log_ids: List[str]) -> List[RecordSource]:
+        """Describe where to read log_ids from so another process can do it."""
+        return [("memory", log_ids, [
+            None if record is None else encode_record(record)
+            for record in map(self.get, log_ids)
+        ])]
+
+    def close(self) -> None:
+        """Make everything durable and release resources."""
+
+
+class MemoryStorage(StorageBackend):
+    """
+    Process-local storage for demos and tests; nothing survives a restart.
+
+    Records are held as their encoded JSON, which is several times smaller
+    than the dict, and decoded only when read.
+    """
+
+    def __init__(self):
+        self._records: Dict[str, bytes] = {}
+        self._token = 0
+
+    def append_encoded(self, records: List[dict], payloads: List[bytes]) -> int:
+        for record, payload in zip(records, payloads):
+            self._records[record["id"]] = payload
+        self._token += 1
+        return self._token
+
+    async def wait_durable(self, token: int) -> None:
+        return None
+
+    def get(self, log_id: str) -> Optional[dict]:
+        data = self._records.get(log_id)
+        return None if data is None else json.loads(data)
+
+    def scan(self) -> Iterator[dict]:
+        for data in list(self._records.values()):
+            yield json.loads(data)
+
+    def sources(self, log_ids: List[str]) -> List[RecordSource]:
+        return [("memory", log_ids, [self._records.get(log_id) for log_id in log_ids])]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, log_id: str) -> bool:
+        return log_id in self._records
+
+
+# Frame header: payload length, CRC32 of the payload
+_FRAME = struct.Struct("<II")
+# Checkpoint entry after the length-prefixed id: offset, frame length
+_ENTRY = struct.Struct("<QI")
+_ID_LEN = struct.Struct("<H")
+
+Location = Tuple[int, int, int]  # (segment, offset, frame length)
+
+
+def _write_synced(path: str, data: bytes) -> None:
+    """Write a file and fsync it."""
+    with open(path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _sync_directory(directory: str) -> None:
+    """fsync a directory, making renames and deletions in it durable."""
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _read_checkpoint(checkpoint_path: str, segment_path: str) -> Optional[List[Tuple[str, int, int]]]:
+    """Load a segment checkpoint, or None if it is missing or does not match the segment."""
+    try:
+        with open(checkpoint_path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    entries = []
+    pos = 0
+    try:
+        while pos < len(data):
+            (id_len,) = _ID_LEN.unpack_from(data, pos)
+            pos += _ID_LEN.size
+            log_id = data[pos:pos + id_len].decode()
+            pos += id_len
+            offset, length = _ENTRY.unpack_from(data, pos)
+            pos += _ENTRY.size
+            entries.append((log_id, offset, length))
+    except (struct.error, UnicodeDecodeError):
+        return None
+    end = max((offset + length for _, offset, length in entries), default=0)
+    if end > os.path.getsize(segment_path):
+        return None  # segment data was lost behind the checkpoint's back
+    return entries
+
+
+def _scan_frames(path: str, truncate: bool) -> List[Tuple[str, int, int]]:
+    """Scan a segment's (id, offset, frame length), stopping at the first torn or corrupt frame."""
+    entries = []
+    with open(path, "rb") as f:
+        data = f.read()
+    pos = 0
+    while pos + _FRAME.size <= len(data):
+        length, crc = _FRAME.unpack_from(data, pos)
+        payload = data[pos + _FRAME.size:pos + _FRAME.size + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        entries.append((json.loads(payload)["id"], pos, _FRAME.size + length))
+        pos += _FRAME.size + length
+    if truncate and pos < len(data):
+        os.truncate(path, pos)
+    return entries
+
+
+def segment_locations(directory: str) -> Dict[str, Tuple[str, int, int]]:
+    """
+    Read a segment log's id -> (segment path, frame offset, frame length)
+    from its files, for a process that does not have it open. Segments
+    with a checkpoint load from it and the rest are scanned; nothing is
+    written.
+    """
+    locations: Dict[str, Tuple[str, int, int]] = {}
+    numbers = sorted(
+        name[:-len(".log")] for name in os.listdir(directory)
+        if name.startswith("segment-") and name.endswith(".log")
+    )
+    for name in numbers:
+        path = os.path.join(directory, name + ".log")
+        entries = _read_checkpoint(os.path.join(directory, name + ".idx"), path)
+        if entries is None:
+            entries = _scan_frames(path, truncate=False)
+        for log_id, offset, length in entries:
+            locations[log_id] = (path, offset, length)
+    return locations
+
+
+# Locations are held packed into one int, a third the size of the tuple
+def _pack(seq: int, offset: int, length: int) -> int:
+    return (seq << 80) | (offset << 32) | length
+
+
+def _unpack(packed: int) -> Location:
+    return packed >> 80, (packed >> 32) & 0xFFFFFFFFFFFF, packed & 0xFFFFFFFF
+
+
+class SegmentLogStorage(StorageBackend):
+    """
+    Embedded local-disk engine: an append-only log split into segments.
+
+    Records are framed as length + CRC32 + JSON and appended to the active
+    segment with a single write per batch. A flusher thread fsyncs whatever
+    has been written since its last sync, so concurrent appends share one
+    fsync (group commit) and no request pays for its own.
+
+    When a segment passes `segment_bytes` it is sealed and its id -> offset
+    index is written beside it as a checkpoint. On startup sealed segments
+    load from their checkpoints and only the unsealed tail is scanned, with
+    any torn final frame truncated. Runs of small sealed segments (left by
+    restarts) are compacted into one.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, first_segment: int = 1):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        # Lowest number a new segment may take, so numbers are never reused
+        self.first_segment = first_segment
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._locations: Dict[str, int] = {}
+        self._fds: Dict[int, int] = {}
+        self._sizes: Dict[int, int] = {}
+        self._sealed: List[int] = []
+        self._active: Optional[int] = None
+        self._active_ids: List[str] = []
+        self._unsynced: List[int] = []  # segments with writes not yet fsynced
+
+        self._written = 0
+        self._durable = 0
+        self._waiters: List[Tuple[int, asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._closing = False
+
+        self._recover()
+        self.compact()
+        self._flusher = threading.Thread(target=self._flush_loop, name="segment-log-flusher", daemon=True)
+        self._flusher.start()
+
+    # --------------------------------------------------------
+    # Files
+    # --------------------------------------------------------
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"segment-{seq:08d}.log")
+
+    def _checkpoint_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"segment-{seq:08d}.idx")
+
+    def _segment_numbers(self) -> List[int]:
+        return sorted(
+            int(name[len("segment-"):-len(".log")])
+            for name in os.listdir(self.directory)
+            if name.startswith("segment-") and name.endswith(".log")
+        )
+
+    def _open(self, seq: int) -> int:
+        fd = os.open(self._path(seq), os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._fds[seq] = fd
+        return fd
+
+    def _compaction_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"compact-{seq:08d}.json")
+
+    @staticmethod
+    def _encode_checkpoint(entries: List[Tuple[str, int, int]]) -> bytes:
+        parts = []
+        for log_id, offset, length in entries:
+            raw = log_id.encode()
+            parts.append(_ID_LEN.pack(len(raw)) + raw + _ENTRY.pack(offset, length))
+        return b"".join(parts)
+
+    def _write_checkpoint(self, seq: int, ids: List[str]) -> None:
+        entries = [(log_id, *_unpack(self._locations[log_id])[1:]) for log_id in ids]
+        tmp = self._checkpoint_path(seq) + ".tmp"
+        _write_synced(tmp, self._encode_checkpoint(entries))
+        os.replace(tmp, self._checkpoint_path(seq))
+
+    def _read_checkpoint(self, seq: int) -> Optional[List[Tuple[str, int, int]]]:
+        """Load a checkpoint, or None if it is missing or does not match the segment."""
+        return _read_checkpoint(self._checkpoint_path(seq), self._path(seq))
+
+    def _scan_frames(self, seq: int, truncate: bool) -> List[Tuple[str, int, int]]:
+        """Scan a segment's frames, stopping at the first torn or corrupt one."""
+        return _scan_frames(self._path(seq), truncate)
+
+    def _finish_compactions(self) -> None:
+        """
+        Complete every compaction whose merged files were committed, and
+        delete the partial output of any that were not.
+        """
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith("compact-") and name.endswith(".json")):
+                continue
+            with open(os.path.join(self.directory, name)) as f:
+                manifest = json.load(f)
+            self._apply_compaction(manifest["target"], manifest["sources"])
+        for name in os.listdir(self.directory):
+            if name.startswith(("segment-", "compact-")) and name.endswith((".compact", ".tmp")):
+                os.remove(os.path.join(self.directory, name))
+
+    def _apply_compaction(self, target: int, sources: List[int]) -> None:
+        """
+        Move a committed merge into place and delete the segments it replaced.
+        Safe to repeat: each step is skipped once it has been done.
+        """
+        for path in (self._path(target), self._checkpoint_path(target)):
+            if os.path.exists(path + ".compact"):
+                os.replace(path + ".compact", path)
+        for seq in sources:
+            if seq == target:
+                continue
+            for path in (self._path(seq), self._checkpoint_path(seq)):
+                if os.path.exists(path):
+                    os.remove(path)
+        _sync_directory(self.directory)
+        os.remove(self._compaction_path(target))
+        _sync_directory(self.directory)
+
+    def _recover(self) -> None:
+        self._finish_compactions()
+        segments = self._segment_numbers()
+        for seq in segments:
+            entries = self._read_checkpoint(seq)
+            sealed = entries is not None
+            if entries is None:
+                entries = self._scan_frames(seq, truncate=seq == segments[-1])
+            for log_id, offset, length in entries:
+                self._locations[log_id] = _pack(seq, offset, length)
+            self._open(seq)
+            self._sizes[seq] = os.path.getsize(self._path(seq))
+            if sealed or seq != segments[-1]:
+                if not sealed:
+                    self._write_checkpoint(seq, [log_id for log_id, _, _ in entries])
+                self._sealed.append(seq)
+            else:
+                self._active = seq
+                self._active_ids = [log_id for log_id, _, _ in entries]
+
+    def _rotate(self) -> None:
+        """Seal the active segment and start a new one. Caller holds the lock."""
+        if self._active is not None:
+            self._write_checkpoint(self._active, self._active_ids)
+            self._sealed.append(self._active)
+        seq = max(max(self._fds, default=0) + 1, self.first_segment)
+        self._open(seq)
+        self._sizes[seq] = 0
+        self._active = seq
+        self._active_ids = []
+
+    # --------------------------------------------------------
+    # Writes and group commit
+    # --------------------------------------------------------
+
+    def append_encoded(self, records: List[dict], payloads: List[bytes]) -> int:
+        return self.append_payloads([record["id"] for record in records], payloads)
+
+    def append_payloads(self, ids: List[str], payloads: List[bytes]) -> int:
+        """Append already encoded records; see append()."""
+        frames = []
+        lengths = []
+        for payload in payloads:
+            frames.append(_FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+            lengths.append(_FRAME.size + len(payload))
+        data = b"".join(frames)
+
+        with self._lock:
+            if self._closing:
+                raise RuntimeError("Storage is closed")
+            if self._active is None or (self._sizes[self._active] and self._sizes[self._active] + len(data) > self.segment_bytes):
+                self._rotate()
+            seq = self._active
+            offset = self._sizes[seq]
+            os.write(self._fds[seq], data)
+            self._sizes[seq] += len(data)
+            for log_id, length in zip(ids, lengths):
+                self._locations[log_id] = _pack(seq, offset, length)
+                self._active_ids.append(log_id)
+                offset += length
+            if seq not in self._unsynced:
+                self._unsynced.append(seq)
+            self._written += 1
+            self._cond.notify_all()
+            return self._written
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._cond:
+                while self._written == self._durable and not self._closing:
+                    self._cond.wait()
+                if self._written == self._durable and self._closing:
+                    return
+                target = self._written
+                fds = [self._fds[seq] for seq in self._unsynced]
+                self._unsynced = []
+
+            # One fsync covers every append made before it started
+            for fd in fds:
+                os.fsync(fd)
+
+            with self._cond:
+                self._durable = target
+                ready = [w for w in self._waiters if w[0] <= target]
+                self._waiters = [w for w in self._waiters if w[0] > target]
+                self._cond.notify_all()
+            for _, loop, future in ready:
+                loop.call_soon_threadsafe(_resolve, future)
+
+    async def wait_durable(self, token: int) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if token <= self._durable:
+                return
+            future = loop.create_future()
+            self._waiters.append((token, loop, future))
+        await future
+
+    def wait_durable_blocking(self, token: int) -> None:
+        with self._cond:
+            while self._durable < token:
+                self._cond.wait()
+
+    # --------------------------------------------------------
+    # Reads
+    # --------------------------------------------------------
+
+    def payload(self, log_id: str) -> Optional[bytes]:
+        """Return an id's encoded record, or None."""
+        with self._lock:
+            location = self._locations.get(log_id)
+            if location is None:
+                return None
+            seq, offset, length = _unpack(location)
+            return os.pread(self._fds[seq], length, offset)[_FRAME.size:]
+
+    def get(self, log_id: str) -> Optional[dict]:
+        payload = self.payload(log_id)
+        return None if payload is None else json.loads(payload)
+
+    def scan(self) -> Iterator[dict]:
+        for seq in self.segments():
+            for record, _ in self.scan_segment(seq):
+                yield record
+
+    def segments(self) -> List[int]:
+        """Return the numbers of every segment, oldest first."""
+        with self._lock:
+            return list(self._sealed) + ([self._active] if self._active is not None else [])
+
+    @property
+    def sealed(self) -> List[int]:
+        """Numbers of the segments that no longer take writes, oldest first."""
+        with self._lock:
+            return list(self._sealed)
+
+    @property
+    def active(self) -> Optional[int]:
+        return self._active
+
+    def scan_segment(self, seq: int) -> Iterator[Tuple[dict, bytes]]:
+        """Yield (record, encoded payload) for each current record of a segment, in append order."""
+        with self._lock:
+            size = self._sizes[seq]
+        with open(self._path(seq), "rb") as f:
+            data = f.read(size)
+        pos = 0
+        while pos + _FRAME.size <= len(data):
+            length, _ = _FRAME.unpack_from(data, pos)
+            payload = data[pos + _FRAME.size:pos + _FRAME.size + length]
+            record = json.loads(payload)
+            # Skip copies superseded by a later write of the same id
+            location = self._locations.get(record["id"])
+            if location is None or _unpack(location)[:2] == (seq, pos):
+                yield record, payload
+            pos += _FRAME.size + length
+
+    def segment_of(self, log_id: str) -> Optional[int]:
+        """Return the number of the segment holding an id's current copy."""
+        with self._lock:
+            location = self._locations.get(log_id)
+            return None if location is None else _unpack(location)[0]
+
+    def drop(self, seq: int) -> None:
+        """Delete a sealed segment whose records have been moved elsewhere."""
+        with self._cond:
+            if seq not in self._sealed:
+                raise ValueError(f"Segment {seq} is not sealed")
+            # Let the flusher finish any fsync that may still use its fd
+            written = self._written
+            while (seq in self._unsynced or self._durable < written) and not self._closing:
+                self._cond.wait()
+            for log_id, _, _ in self._read_checkpoint(seq) or []:
+                location = self._locations.get(log_id)
+                if location is not None and _unpack(location)[0] == seq:
+                    del self._locations[log_id]
+            os.close(self._fds.pop(seq))
+            self._sizes.pop(seq)
+            self._sealed.remove(seq)
+            os.remove(self._checkpoint_path(seq))
+            os.remove(self._path(seq))
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __contains__(self, log_id: str) -> bool:
+        return log_id in self._locations
+
+    def sources(self, log_ids: List[str]) -> List[RecordSource]:
+        """One source per run of ids in the same segment; workers read the files directly."""
+        sources: List[RecordSource] = []
+        with self._lock:
+            for log_id in log_ids:
+                location = self._locations.get(log_id)
+                seq, offset, length = _unpack(location) if location is not None else (None, 0, 0)
+                path = None if seq is None else self._path(seq)
+                if not sources or (path is not None and sources[-1][1] != path):
+                    sources.append(("segment", path, [], []))
+                sources[-1][2].append(log_id)
+                sources[-1][3].append(None if seq is None else (offset, length))
+        return sources
+
+    # --------------------------------------------------------
+    # Compaction and shutdown
+    # --------------------------------------------------------
+
+    def compact(self) -> int:
+        """
+        Merge runs of adjacent sealed segments smaller than half of
+        segment_bytes into one, dropping superseded copies of any id.
+        Returns the number of segments removed.
+
+        The merge takes the place of the run's first segment, keeping the
+        log in append order. Its data and checkpoint are written and synced
+        beside the run, then a manifest naming the run commits the merge;
+        only after that are files renamed into place and the run deleted.
+        A crash before the manifest leaves the run untouched, and one after
+        it is completed on the next open.
+        """
+        removed = 0
+        with self._lock:
+            small = [seq for seq in self._sealed if self._sizes[seq] < self.segment_bytes // 2]
+            runs: List[List[int]] = []
+            for seq in small:
+                if runs and self._sealed.index(seq) == self._sealed.index(runs[-1][-1]) + 1:
+                    runs[-1].append(seq)
+                else:
+                    runs.append([seq])
+
+            for run in runs:
+                if len(run) < 2:
+                    continue
+                target = run[0]
+                frames = []
+                entries = []
+                offset = 0
+                for seq in run:
+                    for log_id, location in list(self._locations.items()):
+                        loc_seq, loc_offset, length = _unpack(location)
+                        if loc_seq != seq:
+                            continue
+                        frames.append(os.pread(self._fds[seq], length, loc_offset))
+                        entries.append((log_id, offset, length))
+                        offset += length
+
+                _write_synced(self._path(target) + ".compact", b"".join(frames))
+                _write_synced(self._checkpoint_path(target) + ".compact", self._encode_checkpoint(entries))
+                manifest = self._compaction_path(target)
+                _write_synced(manifest + ".tmp", json.dumps({"target": target, "sources": run}).encode())
+                os.replace(manifest + ".tmp", manifest)
+                _sync_directory(self.directory)
+
+                for seq in run:
+                    os.close(self._fds.pop(seq))
+                    self._sizes.pop(seq)
+                    self._sealed.remove(seq)
+                self._apply_compaction(target, run)
+                for log_id, entry_offset, length in entries:
+                    self._locations[log_id] = _pack(target, entry_offset, length)
+
+                self._open(target)
+                self._sizes[target] = offset
+                self._sealed.append(target)
+                self._sealed.sort()
+                removed += len(run) - 1
+        return removed
+
+    def close(self) -> None:
+        """Flush pending writes, checkpoint the active segment and close files."""
+        with self._cond:
+            if self._closing:
+                return
+            self._closing = True
+            self._cond.notify_all()
+        self._flusher.join()
+        with self._lock:
+            if self._active is not None and self._active_ids:
+                self._write_checkpoint(self._active, self._active_ids)
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
+
+
+# ============================================================
+# Tiered storage
+# ============================================================
+
+# Uncompressed bytes of records compressed together into one cold block
+COLD_BLOCK_BYTES = 64 * 1024
+
+# Records newer than this stay in the hot tier
+HOT_SECONDS = 30 * 24 * 3600
+
+
+def _event_time(value: Any) -> float:
+    """Return a record timestamp, a datetime or its ISO string, as epoch seconds."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+# Cold locations are packed into one int: segment, block, index in block
+def _pack_cold(seq: int, block: int, index: int) -> int:
+    return (seq << 40) | (block << 16) | index
+
+
+def _unpack_cold(packed: int) -> Tuple[int, int, int]:
+    return packed >> 40, (packed >> 16) & 0xFFFFFF, packed & 0xFFFF
+
+
+class ColdSegment:
+    """
+    One compressed, immutable segment of old records, read through mmap.
+
+    The data file is a run of independently compressed blocks. Its index
+    holds the codec, each block's [offset, length, count, oldest, newest]
+    (a sparse time index: event times in epoch seconds) and the ids of each
+    block's records in order.
+    """
+
+    def __init__(self, path: str, index_path: str):
+        self.path = path
+        with open(index_path, "rb") as f:
+            index = json.loads(zlib.decompress(f.read()))
+        self.codec: str = index["codec"]
+        self.blocks: List[List[Any]] = index["blocks"]
+        self.ids: List[List[str]] = index["ids"]
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @staticmethod
+    def write(path: str, index_path: str, records: List[Tuple[str, float, bytes]], codec: str) -> None:
+        """Compress (id, event time, payload) records into a new cold segment."""
+        compress = CODECS[codec][0]
+        blocks: List[List[Any]] = []
+        ids: List[List[str]] = []
+        chunks: List[bytes] = []
+        offset = 0
+        first = 0
+        while first < len(records):
+            last = first
+            size = 0
+            while last < len(records) and (last == first or size + len(records[last][2]) <= COLD_BLOCK_BYTES):
+                size += len(records[last][2])
+                last += 1
+            batch = records[first:last]
+            chunk = compress(_pack_block([payload for _, _, payload in batch]))
+            times = [event_time for _, event_time, _ in batch]
+            blocks.append([offset, len(chunk), len(batch), min(times), max(times)])
+            ids.append([log_id for log_id, _, _ in batch])
+            chunks.append(chunk)
+            offset += len(chunk)
+            first = last
+
+        # Data first; a segment only exists once its index is in place
+        with open(path, "wb") as f:
+            f.write(b"".join(chunks))
+            f.flush()
+            os.fsync(f.fileno())
+        tmp = index_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(zlib.compress(json.dumps({"codec": codec, "blocks": blocks, "ids": ids}).encode()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, index_path)
+
+    def block(self, number: int) -> bytes:
+        """Decompress one block."""
+        offset, length = self.blocks[number][:2]
+        return _decompress(self.codec, self._map[offset:offset + length])
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._map)
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+
+class TieredStorage(StorageBackend):
+    """
+    Durable engine that keeps recent records in memory and old ones
+    compressed on disk.
+
+    Hot: every write goes through a SegmentLogStorage write-ahead log in
+    `directory` and its encoded JSON is also kept in memory, so recent
+    records are read without touching disk.
+
+    Cold: once all of a sealed log segment's records are older than
+    `hot_seconds` by event time, the segment is rewritten as a ColdSegment
+    of compressed blocks under `directory/cold` (zstd, else lz4, else
+    zlib, whichever is installed), the records leave memory and the log
+    segment is deleted. A cold read decompresses one block of at most
+    COLD_BLOCK_BYTES of records, mapped from the file, whatever the
+    segment's size.
+
+    Warm: recently decompressed blocks are kept in an LRU bounded by
+    `block_cache_bytes`, so reads near each other in time, as pages and
+    exports make them, decompress each block once.
+
+    A background thread demotes segments every `demote_interval` seconds;
+    pass None to only demote on explicit demote() calls.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        hot_seconds: float = HOT_SECONDS,
+        segment_bytes: int = 64 * 1024 * 1024,
+        codec: str = DEFAULT_CODEC,
+        block_cache_bytes: int = 32 * 1024 * 1024,
+        demote_interval: Optional[float] = 60.0,
+    ):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown or uninstalled codec: {codec}")
+        self.directory = directory
+        self.cold_directory = os.path.join(directory, "cold")
+        os.makedirs(self.cold_directory, exist_ok=True)
+        self.hot_seconds = hot_seconds
+        self.codec = codec
+        self.block_cache_bytes = block_cache_bytes
+
+        self._lock = threading.Lock()
+        # Only one demotion runs at a time
+        self._demoting = threading.Lock()
+        self._hot: Dict[str, bytes] = {}
+        # Newest event time of each log segment, epoch seconds
+        self._newest: Dict[int, float] = {}
+        self._cold: Dict[int, ColdSegment] = {}
+        self._cold_locations: Dict[str, int] = {}
+        self._warm: "OrderedDict[Tuple[int, int], bytes]" = OrderedDict()
+        self._warm_bytes = 0
+        self.demote_error: Optional[str] = None
+
+        self._load_cold()
+        self.log = SegmentLogStorage(directory, segment_bytes, first_segment=max(self._cold, default=0) + 1)
+        for seq in self.log.segments():
+            for record, payload in self.log.scan_segment(seq):
+                self._hot[record["id"]] = payload
+                self._cold_locations.pop(record["id"], None)
+                self._note_time(seq, record)
+
+        self._stop = threading.Event()
+        self._demoter: Optional[threading.Thread] = None
+        if demote_interval is not None:
+            self._demoter = threading.Thread(
+                target=self._demote_loop, args=(demote_interval,), name="tier-demoter", daemon=True
+            )
+            self._demoter.start()
+
+    # --------------------------------------------------------
+    # Files
+    # --------------------------------------------------------
+
+    def _cold_path(self, seq: int) -> str:
+        return os.path.join(self.cold_directory, f"segment-{seq:08d}.cold")
+
+    def _cold_index_path(self, seq: int) -> str:
+        return os.path.join(self.cold_directory, f"segment-{seq:08d}.cidx")
+
+    def _load_cold(self) -> None:
+        """Open every complete cold segment and clear what a crash mid-demotion left."""
+        for name in os.listdir(self.cold_directory):
+            if name.endswith(".tmp"):
+                os.remove(os.path.join(self.cold_directory, name))
+        numbers = sorted(
+            int(name[len("segment-"):-len(".cold")])
+            for name in os.listdir(self.cold_directory)
+            if name.startswith("segment-") and name.endswith(".cold")
+        )
+        for seq in numbers:
+            if not os.path.exists(self._cold_index_path(seq)):
+                # Written but never indexed: its log segment is still there
+                os.remove(self._cold_path(seq))
+                continue
+            segment = self._cold[seq] = ColdSegment(self._cold_path(seq), self._cold_index_path(seq))
+            for block, ids in enumerate(segment.ids):
+                for index, log_id in enumerate(ids):
+                    self._cold_locations[log_id] = _pack_cold(seq, block, index)
+
+            # Indexed but its log segment was not yet deleted
+            for suffix in (".log", ".idx"):
+                path = os.path.join(self.directory, f"segment-{seq:08d}{suffix}")
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _note_time(self, seq: int, record: dict) -> None:
+        event_time = _event_time(record["timestamp"])
+        if event_time > self._newest.get(seq, float("-inf")):
+            self._newest[seq] = event_time
+
+    # --------------------------------------------------------
+    # Writes
+    # --------------------------------------------------------
+
+    def append_encoded(self, records: List[dict], payloads: List[bytes]) -> int:
+        ids = [record["id"] for record in records]
+        with self._lock:
+            token = self.log.append_payloads(ids, payloads)
+            seq = self.log.active
+            for record, payload in zip(records, payloads):
+                self._hot[record["id"]] = payload
+                self._cold_locations.pop(record["id"], None)
+                self._note_time(seq, record)
+        return token
+
+    async def wait_durable(self, token: int) -> None:
+        await self.log.wait_durable(token)
+
+    def wait_durable_blocking(self, token: int) -> None:
+        self.log.wait_durable_blocking(token)
+
+    # --------------------------------------------------------
+    # Demotion
+    # --------------------------------------------------------
+
+    def demote(self, now: Optional[float] = None) -> int:
+        """
+        Move sealed log segments whose records are all older than
+        hot_seconds before `now` (epoch seconds, default the current time)
+        to the cold tier, oldest first. Returns the number of records moved.
+        """
+        cutoff = (time.time() if now is None else now) - self.hot_seconds
+        moved = 0
+        with self._demoting:
+            for seq in self.log.sealed:
+                newest = self._newest.get(seq)
+                if newest is not None and newest > cutoff:
+                    break
+                moved += self._demote_segment(seq)
+        return moved
+
+    def _demote_segment(self, seq: int) -> int:
+        records = [
+            (record["id"], _event_time(record["timestamp"]), payload)
+            for record, payload in self.log.scan_segment(seq)
+        ]
+        segment = None
+        if records:
+            ColdSegment.write(self._cold_path(seq), self._cold_index_path(seq), records, self.codec)
+            segment = ColdSegment(self._cold_path(seq), self._cold_index_path(seq))
+
+        moved = 0
+        with self._lock:
+            if segment is not None:
+                self._cold[seq] = segment
+                for block, ids in enumerate(segment.ids):
+                    for index, log_id in enumerate(ids):
+                        # An id written again since the scan keeps its newer hot copy
+                        if self.log.segment_of(log_id) == seq:
+                            self._cold_locations[log_id] = _pack_cold(seq, block, index)
+                            self._hot.pop(log_id, None)
+                            moved += 1
+            self._newest.pop(seq, None)
+        self.log.drop(seq)
+        return moved
+
+    def _demote_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.demote()
+                self.demote_error = None
+            except Exception as e:
+                # Records stay hot and the next pass retries
+                self.demote_error = str(e)
+
+    # --------------------------------------------------------
+    # Reads
+    # --------------------------------------------------------
+
+    def _block(self, seq: int, number: int) -> bytes:
+        """Return a decompressed cold block, through the warm cache."""
+        key = (seq, number)
+        with self._lock:
+            block = self._warm.get(key)
+            if block is not None:
+                self._warm.move_to_end(key)
+                return block
+            segment = self._cold[seq]
+        block = segment.block(number)
+        with self._lock:
+            if key not in self._warm:
+                self._warm[key] = block
+                self._warm_bytes += len(block)
+                while self._warm_bytes > self.block_cache_bytes and len(self._warm) > 1:
+                    _, evicted = self._warm.popitem(last=False)
+                    self._warm_bytes -= len(evicted)
+        return block
+
+    def _payload(self, log_id: str) -> Optional[bytes]:
+        with self._lock:
+            payload = self._hot.get(log_id)
+            if payload is not None:
+                return payload
+            location = self._cold_locations.get(log_id)
+        if location is None:
+            return None
+        seq, block, index = _unpack_cold(location)
+        return _block_payload(self._block(seq, block), index)
+
+    def get(self, log_id: str) -> Optional[dict]:
+        payload = self._payload(log_id)
+        return None if payload is None else json.loads(payload)
+
+    def scan(self) -> Iterator[dict]:
+        """Yield every record in append order: cold segments, then the log, by segment number."""
+        with self._lock:
+            cold = sorted(self._cold)
+        for seq in sorted(set(cold) | set(self.log.segments())):
+            if seq in cold:
+                yield from self._scan_cold(seq)
+                continue
+            try:
+                for record, _ in self.log.scan_segment(seq):
+                    yield record
+            except (KeyError, FileNotFoundError):
+                # Demoted while the scan was running
+                yield from self._scan_cold(seq)
+
+    def _scan_cold(self, seq: int) -> Iterator[dict]:
+        with self._lock:
+            segment = self._cold.get(seq)
+        if segment is None:
+            return
+        for number, ids in enumerate(segment.ids):
+            payloads = _block_payloads(self._block(seq, number))
+            for index, (log_id, payload) in enumerate(zip(ids, payloads)):
+                # Skip copies superseded by a later write of the same id
+                if self._cold_locations.get(log_id) == _pack_cold(seq, number, index):
+                    yield json.loads(payload)
+
+    def sources(self, log_ids: List[str]) -> List[RecordSource]:
+        """
+        One source per run of ids in the same tier: hot ones carry their
+        payloads, cold ones the blocks workers decompress for themselves.
+        """
+        sources: List[RecordSource] = []
+        with self._lock:
+            for log_id in log_ids:
+                payload = self._hot.get(log_id)
+                location = None if payload is not None else self._cold_locations.get(log_id)
+                if location is None:
+                    if not sources or sources[-1][0] != "memory":
+                        sources.append(("memory", [], []))
+                    sources[-1][1].append(log_id)
+                    sources[-1][2].append(payload)
+                    continue
+                seq, block, index = _unpack_cold(location)
+                segment = self._cold[seq]
+                if not sources or sources[-1][0] != "cold" or sources[-1][1] != segment.path:
+                    sources.append(("cold", segment.path, [], [], segment.codec))
+                offset, length = segment.blocks[block][:2]
+                sources[-1][2].append(log_id)
+                sources[-1][3].append((offset, length, index))
+        return sources
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._hot) + len(self._cold_locations)
+
+    def __contains__(self, log_id: str) -> bool:
+        return log_id in self._hot or log_id in self._cold_locations
+
+    def usage(self) -> Dict[str, Dict[str, Any]]:
+        """Records and bytes held by each tier; cold also its event time span."""
+        with self._lock:
+            blocks = [block for segment in self._cold.values() for block in segment.blocks]
+            return {
+                "hot": {"records": len(self._hot), "bytes": sum(map(len, self._hot.values()))},
+                "warm": {"blocks": len(self._warm), "bytes": self._warm_bytes},
+                "cold": {
+                    "segments": len(self._cold),
+                    "records": len(self._cold_locations),
+                    "bytes": sum(segment.nbytes for segment in self._cold.values()),
+                    "oldest": min((block[3] for block in blocks), default=None),
+                    "newest": max((block[4] for block in blocks), default=None),
+                },
+            }
+
+    def close(self) -> None:
+        """Stop demoting, close the log and unmap cold segments."""
+        self._stop.set()
+        if self._demoter is not None:
+            self._demoter.join()
+        self.log.close()
+        with self._lock:
+            for segment in self._cold.values():
+                segment.close()
+            self._cold.clear()
+            self._warm.clear()
+            self._warm_bytes = 0
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,426 @@
+"""
+AI Audit Layer - Audit Log Store
+Indexed access to audit records held by a storage engine
+"""
+
+from typing import Optional, List, Dict, Any, Set, Tuple, Iterator
+from datetime import datetime
+from itertools import chain, islice
+import base64
+import binascii
+import heapq
+
+import numpy as np
+
+from aggregates import MetricsAggregator, percentiles, sketch_from_counts
+from columns import ColumnStore, Prepared, epoch_ns
+from storage import StorageBackend, MemoryStorage, read_source
+from integrity import IntegrityLedger
+from partition import Partition, TimeKey
+from text_index import TextQuery
+
+
+def encode_cursor(key: TimeKey) -> str:
+    """Encode a time index key as an opaque pagination cursor."""
+    ts, log_id = key
+    return base64.urlsafe_b64encode(f"{ts}:{log_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> TimeKey:
+    """Decode a cursor produced by encode_cursor. Raises ValueError if malformed."""
+    try:
+        ts, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":", 1)
+        return int(ts), log_id
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def _add_bins(total: Optional[np.ndarray], counts: np.ndarray) -> np.ndarray:
+    """Sum two per-latency-bin count arrays of possibly different lengths."""
+    if total is None:
+        return counts
+    if len(total) < len(counts):
+        total, counts = counts, total
+    total = total.copy()
+    total[:len(counts)] += counts
+    return total
+
+
+class AuditLogStore:
+    """
+    Audit log store with a vectorised in-memory query engine over a storage engine.
+
+    Full records live in `storage`; only the summary columns the query API
+    returns are kept in memory. Opening a store over a durable engine
+    rebuilds the indexes and aggregates from the stored records.
+
+    The in-memory indexes are partitioned by organization: each
+    organization's records get their own Partition of columns, time index,
+    text index and metrics, in `partitions`. A filter on organization_id
+    routes a query to that one partition, so it never touches another
+    tenant's data. Queries across organizations run on every partition and
+    merge their results by time key.
+
+    `metrics` holds the dashboard aggregates over all organizations,
+    updated on every insert, and `ledger` the per-organization hash chains
+    and Merkle checkpoints, persisted to and checked against `ledger_path`
+    when one is given. Stored records the indexes cannot hold (written
+    before ingest rejected them) stay chained but unindexed; their ids are
+    kept in `unindexed`.
+    """
+
+    INDEXED_FIELDS = (
+        "organization_id",
+        "user_id",
+        "decision_type",
+        "decision_outcome",
+        "model_provider",
+        "risk_level",
+        "flagged",
+    )
+
+    def __init__(self, storage: Optional[StorageBackend] = None, ledger_path: Optional[str] = None):
+        self.storage = storage if storage is not None else MemoryStorage()
+        self.partitions: Dict[Optional[str], Partition] = {}
+        self._partitions: List[Partition] = []
+        # log id -> partition number << 32 | row within the partition
+        self._locations: Dict[str, int] = {}
+        self.metrics = MetricsAggregator()
+        self.ledger = IntegrityLedger()
+        self.unindexed: List[str] = []
+        for record in self.storage.scan():
+            self.ledger.add(record)
+            try:
+                prepared = self._prepare(record)
+            except (KeyError, TypeError, ValueError):
+                self.unindexed.append(record["id"])
+                continue
+            self._index(record, *prepared)
+        if ledger_path is not None:
+            self.ledger.restore(ledger_path)
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __contains__(self, log_id: str) -> bool:
+        return log_id in self._locations
+
+    def __getitem__(self, log_id: str) -> dict:
+        record = self.get(log_id)
+        if record is None:
+            raise KeyError(log_id)
+        return record
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._locations)
+
+    def get(self, log_id: str) -> Optional[dict]:
+        """Return the full record from storage."""
+        if log_id not in self._locations:
+            return None
+        return self.storage.get(log_id)
+
+    def values(self) -> Iterator[dict]:
+        return self.storage.scan()
+
+    def insert(self, record: dict) -> int:
+        """Store a record and index it. Returns the storage commit token."""
+        return self.insert_many([record])
+
+    def insert_many(self, records: List[dict]) -> int:
+        """
+        Check, chain, store with a single storage append and index records.
+
+        Every record's index values are computed first, so one the indexes
+        cannot hold raises ValueError before anything is chained or stored,
+        and chains are extended only after the append succeeds.
+        Records are queryable on return; await commit() with the returned
+        token before acknowledging them as durable.
+        """
+        prepared = [self._prepare(record) for record in records]
+        links = self.ledger.link(records)
+        token = self.storage.append(records)
+        # Chains only grow once their records are stored
+        self.ledger.extend(links, records[-1].get("indexed_at") if records else None)
+        for record, (ts, values) in zip(records, prepared):
+            self._index(record, ts, values)
+        return token
+
+    async def commit(self, token: int) -> None:
+        """Wait until everything up to a commit token is durable."""
+        await self.storage.wait_durable(token)
+
+    def close(self) -> None:
+        self.storage.close()
+        self.ledger.close()
+
+    @staticmethod
+    def _prepare(record: dict) -> Tuple[int, Prepared]:
+        """Return a record's epoch_ns timestamp and column values; raises ValueError if unindexable."""
+        return epoch_ns(record["timestamp"]), ColumnStore.prepare(record)
+
+    def _index(self, record: dict, ts: int, prepared: Prepared) -> None:
+        """Add a prepared record to its organization's partition and the overall metrics."""
+        org = record.get("organization_id")
+        partition = self.partitions.get(org)
+        if partition is None:
+            partition = self.partitions[org] = Partition(org, len(self._partitions), self._read)
+            self._partitions.append(partition)
+        row = partition.add(record, ts, prepared)
+        self._locations[record["id"]] = partition.number << 32 | row
+        self.metrics.add(record, ts)
+
+    def _locate(self, log_id: str) -> Tuple[Partition, int]:
+        """Return the partition and row holding a stored record."""
+        location = self._locations[log_id]
+        return self._partitions[location >> 32], location & 0xFFFFFFFF
+
+    def _route(self, filters: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Partition]]:
+        """Split an organization_id filter off into the partitions it selects."""
+        if "organization_id" not in filters:
+            return filters, list(self._partitions)
+        filters = dict(filters)
+        partition = self.partitions.get(filters.pop("organization_id"))
+        return filters, [] if partition is None else [partition]
+
+    def match_ids(self, filters: Dict[str, Any]) -> Optional[Set[str]]:
+        """
+        Return the ids matching every equality filter, None when unfiltered.
+        Raises KeyError for a field that cannot be filtered on.
+        """
+        if not filters:
+            return None
+        filters, partitions = self._route(filters)
+        ids: Set[str] = set()
+        for partition in partitions:
+            columns = partition.columns
+            mask = columns.mask(filters, slice(0, len(columns)))
+            if mask is None:
+                ids.update(columns.ids)
+            else:
+                ids.update(columns.ids[row] for row in np.flatnonzero(mask).tolist())
+        return ids
+
+    def find_request(self, organization_id: str, request_id: str) -> Optional[dict]:
+        """Return the summary row already stored for a client request_id, if any."""
+        partition = self.partitions.get(organization_id)
+        log_id = None if partition is None else partition.request_ids.get(request_id)
+        return None if log_id is None else self.row(log_id)
+
+    def row(self, log_id: str) -> dict:
+        """Return the summary row of a stored record."""
+        partition, row = self._locate(log_id)
+        return partition.columns.row(row)
+
+    def memory_usage(self, organization_id: str) -> Optional[Dict[str, int]]:
+        """Return the bytes held by an organization's partition, None if it has no records."""
+        partition = self.partitions.get(organization_id)
+        return None if partition is None else partition.memory_usage()
+
+    def verify_chain(self, organization_id: str, start: int, end: int) -> Dict[str, Any]:
+        """Verify an organization's chain_seq range [start, end) against its ledger."""
+        partition = self.partitions.get(organization_id)
+        logs = iter(())
+        if partition is not None:
+            columns = partition.columns
+            seqs = columns.integer["chain_seq"].view()
+            rows = np.flatnonzero((seqs >= start) & (seqs < end))
+            rows = rows[np.argsort(seqs[rows], kind="stable")]
+            ids = columns.ids
+            hashes = columns.content_hashes
+            logs = (
+                (seq, ids[row], bytes(hashes[row * 32:row * 32 + 32]).hex())
+                for row, seq in zip(rows.tolist(), seqs[rows].tolist())
+            )
+        return self.ledger.verify(organization_id, start, end, logs)
+
+    def time_key(self, log_id: str) -> TimeKey:
+        """Return the time index key of a stored record."""
+        partition, row = self._locate(log_id)
+        return partition.columns.timestamps[row], log_id
+
+    @staticmethod
+    def _ns_bounds(start: Optional[datetime], end: Optional[datetime]) -> Tuple[Optional[int], Optional[int]]:
+        return (
+            None if start is None else epoch_ns(start),
+            None if end is None else epoch_ns(end),
+        )
+
+    def query(
+        self,
+        filters: Dict[str, Any],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 50,
+        offset: int = 0,
+        before: Optional[TimeKey] = None,
+        count_total: bool = True,
+        text: Optional[TextQuery] = None,
+    ) -> Tuple[Optional[int], List[dict]]:
+        """
+        Return (total, page) of summary rows matching every filter, newest first.
+
+        Each partition the filters select returns its newest offset + limit
+        matches (see Partition.newest); with several, their time keys are
+        merged and the page taken from the merge. The page rows are then
+        gathered column by column, one partition at a time.
+
+        `before` restricts the page to keys strictly older than a cursor key,
+        which is a single binary search per partition however deep the
+        cursor is. The total is None with count_total=False, or when a
+        phrase search has too many candidates to count exactly.
+        """
+        filters, partitions = self._route(filters)
+        start_ns, end_ns = self._ns_bounds(start, end)
+        count = offset + limit
+        total: Optional[int] = 0
+        matches: List[Tuple[Partition, np.ndarray]] = []
+        for partition in partitions:
+            found, rows = partition.newest(filters, start_ns, end_ns, count, before, count_total, text)
+            total = None if total is None or found is None else total + found
+            if len(rows):
+                matches.append((partition, rows))
+
+        if len(matches) <= 1:
+            page = [] if not matches else matches[0][0].columns.rows(matches[0][1][offset:])
+            return total, page
+
+        def keyed(partition: Partition, rows: np.ndarray) -> List[Tuple[int, str, int, int]]:
+            ids = partition.columns.ids
+            times = partition.columns.timestamps.view()[rows].tolist()
+            return [(ts, ids[row], partition.number, row) for ts, row in zip(times, rows.tolist())]
+
+        selected = list(islice(heapq.merge(*(keyed(*match) for match in matches), reverse=True), offset, count))
+        # Gather each partition's page rows at once, then restore merged order
+        by_partition: Dict[int, List[int]] = {}
+        for _, _, number, row in selected:
+            by_partition.setdefault(number, []).append(row)
+        summaries: Dict[str, dict] = {}
+        for number, rows in by_partition.items():
+            for summary in self._partitions[number].columns.rows(np.array(rows)):
+                summaries[summary["id"]] = summary
+        return total, [summaries[log_id] for _, log_id, _, _ in selected]
+
+    def content_digests(
+        self,
+        filters: Dict[str, Any],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        batch_size: int = 1000,
+        window: int = 65536,
+    ) -> Tuple[Iterator[int], Iterator[Tuple[List[str], bytes]]]:
+        """
+        Return iterators over the number of records matching filters and
+        range, window by window, and over their (ids, indexed content hash
+        digests joined 32 bytes each) in batches, one partition after
+        another, oldest first in each.
+
+        Only records already stored are counted or walked; both go through
+        the time index in key-resumed windows (see Partition.scan_keys), so
+        memory stays flat however large the range. Each step holds its
+        partition's lock, so both may be advanced from another thread while
+        the event loop inserts.
+        """
+        filters, partitions = self._route(filters)
+        start_ns, end_ns = self._ns_bounds(start, end)
+        snapshot = [(partition, len(partition)) for partition in partitions]
+        counts = chain.from_iterable(
+            partition.counts(filters, start_ns, end_ns, rows, window) for partition, rows in snapshot
+        )
+        batches = chain.from_iterable(
+            partition.content_digests(filters, start_ns, end_ns, rows, batch_size, window)
+            for partition, rows in snapshot
+        )
+        return counts, batches
+
+    def scan_range(
+        self,
+        filters: Dict[str, Any],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        after: Optional[TimeKey] = None,
+        batch_size: int = 1000,
+        window: int = 65536,
+        decode: bool = True,
+    ) -> Iterator[List[Any]]:
+        """
+        Yield full records matching filters and range in batches, oldest first.
+        With decode=False each record is its stored JSON bytes.
+
+        Each selected partition walks its time index in key-resumed windows
+        (see Partition.scan_keys), so memory stays flat however many records
+        match and records inserted meanwhile never shift the walk. Walks over
+        several partitions are merged by key. Records missing from storage
+        are skipped.
+        """
+        filters, partitions = self._route(filters)
+        start_ns, end_ns = self._ns_bounds(start, end)
+        walks = [
+            partition.scan_keys(filters, start_ns, end_ns, after, batch_size, window)
+            for partition in partitions
+        ]
+        if len(walks) == 1:
+            batches = walks[0]
+        else:
+            merged = heapq.merge(*(chain.from_iterable(walk) for walk in walks))
+            batches = iter(lambda: list(islice(merged, batch_size)), [])
+
+        for keys in batches:
+            log_ids = [log_id for _, log_id in keys]
+            found = self._read(log_ids, decode)
+            yield [found[log_id] for log_id in log_ids if log_id in found]
+
+    def _read(self, log_ids: List[str], decode: bool = True) -> Dict[str, Any]:
+        """Read many records from storage in one pass per segment; missing ids are left out."""
+        found: Dict[str, Any] = {}
+        for source in self.storage.sources(log_ids):
+            for log_id, record in read_source(source, decode):
+                if record is not None:
+                    found[log_id] = record
+        return found
+
+    def aggregate(
+        self,
+        filters: Dict[str, Any],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        Compute dashboard figures over the records matching filters and range.
+
+        Each selected partition computes its counts and per-latency-bin
+        histograms with vectorised mask sums and bincounts (see
+        Partition.aggregate); they are summed here and turned into latency
+        percentiles once. `timestamps` holds the matching epoch_ns values.
+        """
+        filters, partitions = self._route(filters)
+        start_ns, end_ns = self._ns_bounds(start, end)
+        parts = [partition.aggregate(filters, start_ns, end_ns) for partition in partitions]
+
+        result: Dict[str, Any] = {
+            "count": sum(part["count"] for part in parts),
+            "flagged": sum(part["flagged"] for part in parts),
+            "duration_sum": sum(part["duration_sum"] for part in parts),
+            "timestamps": np.concatenate([np.empty(0, dtype=np.int64)] + [part["timestamps"] for part in parts]),
+            "by_outcome": {},
+        }
+        for part in parts:
+            for outcome, n in part["by_outcome"].items():
+                result["by_outcome"][outcome] = result["by_outcome"].get(outcome, 0) + n
+
+        for key, latency_key in (
+            ("by_model", "latency_by_model"),
+            ("by_decision_type", "latency_by_decision_type"),
+        ):
+            bins: Dict[str, np.ndarray] = {}
+            for part in parts:
+                for label, counts in part[key].items():
+                    bins[label] = _add_bins(bins.get(label), counts)
+            result[key] = {label: int(counts.sum()) for label, counts in bins.items()}
+            result[latency_key] = {label: percentiles(sketch_from_counts(counts)) for label, counts in bins.items()}
+
+        overall = np.zeros(1, dtype=np.int64)
+        for part in parts:
+            overall = _add_bins(overall, part["latency"])
+        result["latency"] = percentiles(sketch_from_counts(overall))
+        return result
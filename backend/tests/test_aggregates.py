@@ -0,0 +1,73 @@
+"""
+AI Audit Layer - Metrics Aggregates Tests
+"""
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aggregates import TimeRollups, MINUTE, HOUR, DAY, percentiles
+
+
+NOW = 1_700_000_000 - 1_700_000_000 % DAY + 12 * HOUR  # noon UTC
+
+
+def record(outcome="approved", duration_ms=100, flagged=False, model_name="gpt-4"):
+    return {
+        "decision_outcome": outcome,
+        "duration_ms": duration_ms,
+        "flagged": flagged,
+        "model_name": model_name,
+    }
+
+
+@pytest.fixture
+def rollups():
+    rollups = TimeRollups()
+    rollups.add(record(), NOW - 30, now=NOW)
+    rollups.add(record("denied", 300, True), NOW - 2 * HOUR, now=NOW)
+    rollups.add(record(), NOW - 3 * DAY, now=NOW)
+    rollups.add(record("denied"), NOW - 100 * DAY, now=NOW)
+    return rollups
+
+
+class TestTimeRollups:
+    """Test bucketed rollups and window covering"""
+
+    def test_window_counts(self, rollups):
+        today = NOW - NOW % DAY
+        assert rollups.window(today, today + DAY, now=NOW).count == 2
+        assert rollups.window(today - 6 * DAY, today + DAY, now=NOW).count == 3
+        assert rollups.window(today - 200 * DAY, today + DAY, now=NOW).count == 4
+
+    def test_unaligned_window_uses_fine_edges(self, rollups):
+        window = rollups.window(NOW - 2 * HOUR - 5 * MINUTE, NOW - 2 * HOUR + MINUTE, now=NOW)
+        assert window.count == 1
+        assert window.flagged == 1
+        assert window.by_outcome == {"denied": 1}
+        assert window.avg_duration_ms == 300
+        assert rollups.window(NOW - 20, NOW, now=NOW).count == 1
+
+    def test_aged_edges_round_out(self, rollups):
+        # Minute and hour buckets are gone 100 days back; the day bucket answers
+        old = NOW - 100 * DAY
+        assert rollups.window(old - MINUTE, old + MINUTE, now=NOW).count == 1
+
+    def test_compaction_drops_fine_buckets_only(self, rollups):
+        rollups.compact(now=NOW + 3 * DAY)
+        assert all(bucket.count == 0 for _, bucket in rollups.series(MINUTE, NOW - MINUTE, NOW))
+        today = NOW - NOW % DAY
+        assert rollups.window(today, today + DAY, now=NOW + 3 * DAY).count == 2
+
+    def test_series_is_dense(self, rollups):
+        points = rollups.series(HOUR, NOW - 3 * HOUR, NOW)
+        assert [bucket.count for _, bucket in points] == [0, 1, 1, 0]
+        assert points[0][0] % HOUR == 0
+
+    def test_window_latency_merges_bucket_sketches(self, rollups):
+        rollups.add(record(duration_ms=5000, model_name="claude-3-opus"), NOW - HOUR, now=NOW)
+        window = rollups.window(NOW - 3 * HOUR, NOW, now=NOW)
+        assert window.latency.overall.count == 3
+        assert percentiles(window.latency.by_model["claude-3-opus"])["p99"] == pytest.approx(5000, rel=0.01)
+        assert percentiles(window.latency.by_decision_type["unknown"])["p50"] == pytest.approx(300, rel=0.01)
@@ -5,11 +5,16 @@ AI Audit Layer - Backend Tests
 import pytest
 from fastapi.testclient import TestClient
 from datetime import datetime, timezone
+import csv
+import io
+import json
+import time
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from main import app, audit_logs_db
+from main import app, audit_logs_db, live_feed, response_cache, AuditLogDetail
+from integrity import verify_inclusion
 
 
 client = TestClient(app)
@@ -129,6 +134,135 @@ class TestCreateAuditLog:
         get_response = client.get(f"/api/v1/audit/logs/{log_id}", headers=AUTH_HEADER)
         assert get_response.json()["flagged"] == True
 
+    def test_invalid_event_returns_422(self):
+        log_data = {"request_id": "test_req_invalid", "duration_ms": "slow"}
+        response = client.post("/api/v1/audit/log", json=log_data, headers=AUTH_HEADER)
+        assert response.status_code == 422
+        errors = {tuple(e["loc"]): e["type"] for e in response.json()["detail"]}
+        assert errors[("body", "duration_ms")] == "int_parsing"
+        assert errors[("body", "prompt_content")] == "missing"
+
+    def test_out_of_range_counts_return_422(self):
+        log_data = {"request_id": "test_req_range", "duration_ms": -5, "prompt_tokens": 2 ** 63}
+        response = client.post("/api/v1/audit/log", json=log_data, headers=AUTH_HEADER)
+        assert response.status_code == 422
+        errors = {tuple(e["loc"]): e["type"] for e in response.json()["detail"]}
+        assert errors[("body", "duration_ms")] == "greater_than_equal"
+        assert errors[("body", "prompt_tokens")] == "less_than_equal"
+
+    def test_malformed_json_returns_422(self):
+        response = client.post(
+            "/api/v1/audit/log",
+            content=b"{not json",
+            headers={**AUTH_HEADER, "Content-Type": "application/json"},
+        )
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["type"] == "json_invalid"
+
+
+class TestBatchIngest:
+    """Test POST /api/v1/audit/logs:batch"""
+    
+    def make_event(self, i):
+        return {
+            "request_id": f"batch_req_{i}",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": 1000 + i,
+            "user_id": "batch_user",
+            "organization_id": "test_org",
+            "prompt_hash": f"batchhash{i}",
+            "prompt_content": f"Batch prompt {i}",
+            "prompt_tokens": 10,
+            "response_content": f"Batch response {i}",
+            "response_tokens": 10,
+            "model_provider": "openai",
+            "model_name": "gpt-4",
+            "decision_type": "batch_test",
+            "confidence_score": 0.9
+        }
+    
+    def test_batch_success(self):
+        events = [self.make_event(i) for i in range(25)]
+        response = client.post("/api/v1/audit/logs:batch", json={"events": events}, headers=AUTH_HEADER)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["accepted"] == 25
+        assert data["rejected"] == 0
+        assert [r["index"] for r in data["results"]] == list(range(25))
+        
+        log_id = data["results"][3]["audit_log_id"]
+        detail = client.get(f"/api/v1/audit/logs/{log_id}", headers=AUTH_HEADER).json()
+        assert detail["request_id"] == "batch_req_3"
+        assert detail["content_hash"] == data["results"][3]["content_hash"]
+    
+    def test_batch_reports_invalid_items(self):
+        events = [self.make_event(100), {"request_id": "broken"}, self.make_event(101)]
+        response = client.post("/api/v1/audit/logs:batch", json={"events": events}, headers=AUTH_HEADER)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["accepted"] == 2
+        assert data["rejected"] == 1
+        assert data["results"][1]["success"] == False
+        assert data["results"][1]["errors"]
+        assert data["results"][2]["success"] == True
+    
+    def test_batch_deduplicates_request_ids(self):
+        event = self.make_event(200)
+        first = client.post("/api/v1/audit/logs:batch", json={"events": [event]}, headers=AUTH_HEADER).json()
+        replay = client.post("/api/v1/audit/logs:batch", json={"events": [event, event]}, headers=AUTH_HEADER).json()
+        
+        assert first["results"][0]["duplicate"] == False
+        assert [r["duplicate"] for r in replay["results"]] == [True, True]
+        assert replay["results"][0]["audit_log_id"] == first["results"][0]["audit_log_id"]
+        
+        single = client.post("/api/v1/audit/log", json=event, headers=AUTH_HEADER).json()
+        assert single["duplicate"] == True
+        assert single["audit_log_id"] == first["results"][0]["audit_log_id"]
+        assert single["indexed_at"] == first["indexed_at"]
+    
+    def test_batch_requires_auth(self):
+        response = client.post("/api/v1/audit/logs:batch", json={"events": []})
+        assert response.status_code == 401
+
+
+class TestLiveFeed:
+    """Test that ingest publishes to GET /api/v1/live subscribers"""
+    
+    def test_ingest_publishes_matching_events(self):
+        subscriber = live_feed.subscribe({"user_id": "live_user"}, metrics=False)
+        try:
+            events = []
+            for i, user in enumerate(["live_user", "other_user"]):
+                events.append({
+                    "request_id": f"live_req_{i}",
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "duration_ms": 900,
+                    "user_id": user,
+                    "organization_id": "test_org",
+                    "prompt_hash": "livehash",
+                    "prompt_content": "Live prompt",
+                    "prompt_tokens": 10,
+                    "response_content": "Live response",
+                    "response_tokens": 5,
+                    "model_provider": "openai",
+                    "model_name": "gpt-4",
+                    "model_parameters": {}
+                })
+            response = client.post("/api/v1/audit/logs:batch", json={"events": events}, headers=AUTH_HEADER)
+            assert response.status_code == 200
+            
+            published = [json.loads(e.decode().split("data: ")[1]) for e in subscriber.pending]
+            assert [p["id"] for p in published] == [response.json()["results"][0]["audit_log_id"]]
+            assert published[0]["user_id"] == "live_user"
+        finally:
+            live_feed.unsubscribe(subscriber)
+    
+    def test_live_requires_auth(self):
+        response = client.get("/api/v1/live")
+        assert response.status_code == 401
+
 
 class TestQueryAuditLogs:
     """Test GET /api/v1/audit/logs"""
@@ -150,6 +284,79 @@ class TestQueryAuditLogs:
         )
         assert response.status_code == 200
     
+    def test_combined_filters(self):
+        base = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": 1000,
+            "user_id": "filter_user",
+            "organization_id": "test_org",
+            "prompt_hash": "filterhash",
+            "prompt_content": "Filter test",
+            "prompt_tokens": 10,
+            "response_content": "Filter response",
+            "response_tokens": 10,
+            "model_provider": "openai",
+            "model_name": "gpt-4",
+            "decision_type": "filter_test",
+            "confidence_score": 0.9,
+        }
+        client.post("/api/v1/audit/log", json={**base, "request_id": "filter_1", "risk_level": "low"}, headers=AUTH_HEADER)
+        client.post("/api/v1/audit/log", json={**base, "request_id": "filter_2", "risk_level": "high"}, headers=AUTH_HEADER)
+        client.post("/api/v1/audit/log", json={**base, "request_id": "filter_3", "model_provider": "anthropic"}, headers=AUTH_HEADER)
+        
+        response = client.get(
+            "/api/v1/audit/logs",
+            params={"user_id": "filter_user", "model_provider": "openai", "flagged": True},
+            headers=AUTH_HEADER
+        )
+        data = response.json()
+        assert data["total"] == 1
+        assert data["logs"][0]["risk_level"] == "high"
+        
+        response = client.get(
+            "/api/v1/audit/logs",
+            params={"user_id": "filter_user", "decision_type": "filter_test"},
+            headers=AUTH_HEADER
+        )
+        assert response.json()["total"] == 3
+    
+    def test_text_search(self):
+        response = client.get(
+            "/api/v1/audit/logs",
+            params={"q": 'dti "exceeds 45"'},
+            headers=AUTH_HEADER
+        )
+        assert response.status_code == 200
+        logs = response.json()["logs"]
+        assert logs and all(log["decision_outcome"] == "denied" for log in logs)
+        
+        response = client.get(
+            "/api/v1/audit/logs",
+            params={"q": "diabet*", "decision_type": "loan_underwriting"},
+            headers=AUTH_HEADER
+        )
+        assert response.json()["total"] == 0
+    
+    def test_empty_text_search_rejected(self):
+        response = client.get("/api/v1/audit/logs", params={"q": "%"}, headers=AUTH_HEADER)
+        assert response.status_code == 400
+    
+    def test_date_range_filter(self):
+        response = client.get(
+            "/api/v1/audit/logs",
+            params={"end_date": "2000-01-01T00:00:00Z"},
+            headers=AUTH_HEADER
+        )
+        assert response.status_code == 200
+        assert response.json()["total"] == 0
+        
+        response = client.get(
+            "/api/v1/audit/logs",
+            params={"start_date": "2000-01-01T00:00:00Z"},
+            headers=AUTH_HEADER
+        )
+        assert response.json()["total"] == len(audit_logs_db)
+    
     def test_pagination(self):
         response = client.get(
             "/api/v1/audit/logs",
@@ -162,6 +369,28 @@ class TestQueryAuditLogs:
         assert data["limit"] == 2
         assert data["offset"] == 0
 
+    def test_cursor_pagination(self):
+        first = client.get("/api/v1/audit/logs", params={"limit": 2}, headers=AUTH_HEADER).json()
+        assert first["next_cursor"] is not None
+        
+        seen = [log["id"] for log in first["logs"]]
+        cursor = first["next_cursor"]
+        while cursor:
+            page = client.get(
+                "/api/v1/audit/logs",
+                params={"limit": 2, "cursor": cursor},
+                headers=AUTH_HEADER
+            ).json()
+            assert page["total"] is None
+            seen.extend(log["id"] for log in page["logs"])
+            cursor = page["next_cursor"]
+        
+        assert len(seen) == len(set(seen)) == first["total"]
+    
+    def test_invalid_cursor_returns_400(self):
+        response = client.get("/api/v1/audit/logs", params={"cursor": "bogus"}, headers=AUTH_HEADER)
+        assert response.status_code == 400
+
 
 class TestGetAuditLog:
     """Test GET /api/v1/audit/logs/{id}"""
@@ -176,12 +405,56 @@ class TestGetAuditLog:
             response = client.get(f"/api/v1/audit/logs/{log_id}", headers=AUTH_HEADER)
             assert response.status_code == 200
             assert response.json()["id"] == log_id
+
+    def test_detail_has_exactly_the_detail_fields(self):
+        log_id = client.get("/api/v1/audit/logs", headers=AUTH_HEADER).json()["logs"][0]["id"]
+        response = client.get(f"/api/v1/audit/logs/{log_id}", headers=AUTH_HEADER)
+        assert response.headers["content-type"] == "application/json"
+        detail = response.json()
+        assert list(detail) == list(AuditLogDetail.model_fields)
+        assert AuditLogDetail.model_validate(detail).id == log_id
+        assert "organization_id" not in detail and "indexed_at" not in detail
     
     def test_get_nonexistent_log_returns_404(self):
         response = client.get("/api/v1/audit/logs/nonexistent_id", headers=AUTH_HEADER)
         assert response.status_code == 404
 
 
+class TestResponseCache:
+    """Test encoded detail and summary views served from the response cache"""
+    
+    def test_repeated_detail_views_hit_the_cache(self):
+        log_id = client.get("/api/v1/audit/logs", headers=AUTH_HEADER).json()["logs"][-1]["id"]
+        first = client.get(f"/api/v1/audit/logs/{log_id}", headers=AUTH_HEADER)
+        hits = response_cache.hits
+        second = client.get(f"/api/v1/audit/logs/{log_id}", headers=AUTH_HEADER)
+        assert response_cache.hits == hits + 1
+        assert second.content == first.content
+    
+    def test_summary_rows_are_cached(self):
+        first = client.get("/api/v1/audit/logs", params={"limit": 5}, headers=AUTH_HEADER).json()
+        hits = response_cache.hits
+        second = client.get("/api/v1/audit/logs", params={"limit": 5}, headers=AUTH_HEADER).json()
+        assert response_cache.hits == hits + len(second["logs"])
+        assert second == first
+        assert set(first["logs"][0]) == {
+            "id", "timestamp", "user_id", "decision_type", "decision_outcome",
+            "model_name", "risk_level", "flagged", "duration_ms"
+        }
+    
+    def test_missing_log_is_not_cached(self):
+        client.get("/api/v1/audit/logs/nonexistent_id", headers=AUTH_HEADER)
+        assert response_cache.get(("detail", "nonexistent_id")) is None
+    
+    def test_stats_endpoint(self):
+        response = client.get("/api/v1/cache/stats", headers=AUTH_HEADER)
+        assert response.status_code == 200
+        stats = response.json()
+        assert stats["entries"] == len(response_cache)
+        assert stats["bytes"] <= stats["max_bytes"]
+        assert stats["hits"] >= 0 and stats["misses"] >= 0
+
+
 class TestMetrics:
     """Test GET /api/v1/metrics"""
     
@@ -195,6 +468,316 @@ class TestMetrics:
         assert "by_outcome" in data
         assert "by_model" in data
 
+    
+    def test_metrics_update_incrementally(self):
+        before = client.get("/api/v1/metrics", headers=AUTH_HEADER).json()
+        log_data = {
+            "request_id": "metrics_req_001",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": 1200,
+            "user_id": "metrics_user",
+            "organization_id": "test_org",
+            "prompt_hash": "metricshash",
+            "prompt_content": "Metrics prompt",
+            "prompt_tokens": 10,
+            "response_content": "Metrics response",
+            "response_tokens": 10,
+            "model_provider": "openai",
+            "model_name": "gpt-metrics-test",
+            "risk_level": "critical"
+        }
+        client.post("/api/v1/audit/log", json=log_data, headers=AUTH_HEADER)
+        
+        after = client.get("/api/v1/metrics", headers=AUTH_HEADER).json()
+        assert after["by_model"]["gpt-metrics-test"] == 1
+        assert after["by_outcome"]["unknown"] == before["by_outcome"].get("unknown", 0) + 1
+        assert after["by_decision_type"]["unknown"] == before["by_decision_type"].get("unknown", 0) + 1
+        assert sum(after["by_model"].values()) == len(audit_logs_db)
+        
+        flagged = sum(1 for r in audit_logs_db.values() if r["flagged"])
+        assert after["flagged_rate"] == pytest.approx(flagged / len(audit_logs_db) * 100)
+
+    
+    def test_window_totals_count_todays_logs(self):
+        data = client.get("/api/v1/metrics", headers=AUTH_HEADER).json()
+        assert data["total_today"] == len(audit_logs_db)
+        assert data["total_today"] <= data["total_week"] <= data["total_month"]
+
+    def test_filtered_metrics(self):
+        unfiltered = client.get("/api/v1/metrics", headers=AUTH_HEADER).json()
+        ranged = client.get(
+            "/api/v1/metrics",
+            params={"start_date": "2000-01-01T00:00:00Z"},
+            headers=AUTH_HEADER
+        ).json()
+        for key in ("total_today", "by_outcome", "by_model", "by_decision_type"):
+            assert ranged[key] == unfiltered[key]
+        assert ranged["flagged_rate"] == pytest.approx(unfiltered["flagged_rate"])
+
+        data = client.get(
+            "/api/v1/metrics",
+            params={"risk_level": "high", "decision_type": "loan_underwriting"},
+            headers=AUTH_HEADER
+        ).json()
+        assert data["flagged_rate"] == 100
+        assert data["by_decision_type"] == {"loan_underwriting": sum(data["by_model"].values())}
+        assert data["latency"]["p50"] is not None
+
+    def test_timeseries(self):
+        response = client.get(
+            "/api/v1/metrics/timeseries",
+            params={"resolution": "minute"},
+            headers=AUTH_HEADER
+        )
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert len(data["points"]) == 60
+        assert sum(point["count"] for point in data["points"]) > 0
+    
+    def test_timeseries_rejects_bad_resolution(self):
+        response = client.get(
+            "/api/v1/metrics/timeseries",
+            params={"resolution": "week"},
+            headers=AUTH_HEADER
+        )
+        assert response.status_code == 400
+    
+    def test_timeseries_rejects_expired_resolution(self):
+        response = client.get(
+            "/api/v1/metrics/timeseries",
+            params={"resolution": "minute", "start": "2000-01-01T00:00:00Z", "end": "2000-01-01T01:00:00Z"},
+            headers=AUTH_HEADER
+        )
+        assert response.status_code == 400
+
+    
+    def test_latency_percentiles(self):
+        data = client.get("/api/v1/metrics", headers=AUTH_HEADER).json()
+        assert data["latency"]["p50"] <= data["latency"]["p95"] <= data["latency"]["p99"]
+        assert "gpt-4-turbo" in data["latency_by_model"]
+        
+        response = client.get("/api/v1/metrics/latency", headers=AUTH_HEADER)
+        assert response.status_code == 200
+        window = response.json()
+        assert window["count"] == len(audit_logs_db)
+        assert window["by_model"]["claude-3-opus"]["p99"] == pytest.approx(3200, rel=0.01)
+
+
+class TestOrganizations:
+    """Test organization-scoped queries, metrics and usage"""
+    
+    def test_logs_and_metrics_scoped_to_organization(self):
+        params = {"organization_id": "org_healthfirst"}
+        logs = client.get("/api/v1/audit/logs", params=params, headers=AUTH_HEADER).json()
+        assert logs["total"] == len(audit_logs_db.partitions["org_healthfirst"])
+        for log in logs["logs"]:
+            assert audit_logs_db.row(log["id"])["organization_id"] == "org_healthfirst"
+        
+        metrics = client.get("/api/v1/metrics", params=params, headers=AUTH_HEADER).json()
+        assert sum(metrics["by_outcome"].values()) == logs["total"]
+        overall = client.get("/api/v1/metrics", headers=AUTH_HEADER).json()
+        assert sum(overall["by_outcome"].values()) == len(audit_logs_db)
+    
+    def test_unknown_organization_is_empty(self):
+        params = {"organization_id": "org_unknown"}
+        logs = client.get("/api/v1/audit/logs", params=params, headers=AUTH_HEADER).json()
+        assert logs["total"] == 0
+        metrics = client.get("/api/v1/metrics", params=params, headers=AUTH_HEADER).json()
+        assert metrics["total_today"] == 0
+        assert metrics["by_outcome"] == {}
+
+    def test_latency_and_timeseries_scoped_to_organization(self):
+        params = {"organization_id": "org_healthfirst"}
+        count = len(audit_logs_db.partitions["org_healthfirst"])
+        latency = client.get("/api/v1/metrics/latency", params=params, headers=AUTH_HEADER).json()
+        assert latency["count"] == count
+        assert "gpt-4-turbo" not in latency["by_model"]
+        assert "claude-3-opus" in latency["by_model"]
+
+        series = client.get(
+            "/api/v1/metrics/timeseries",
+            params={**params, "resolution": "day"},
+            headers=AUTH_HEADER
+        ).json()
+        assert sum(point["count"] for point in series["points"]) == count
+        response = client.get(
+            "/api/v1/metrics/timeseries",
+            params={**params, "resolution": "minute"},
+            headers=AUTH_HEADER
+        )
+        assert response.status_code == 400
+
+        params = {"organization_id": "org_unknown"}
+        latency = client.get("/api/v1/metrics/latency", params=params, headers=AUTH_HEADER).json()
+        assert latency["count"] == 0
+        assert latency["by_model"] == {}
+
+    def test_usage(self):
+        response = client.get("/api/v1/organizations/org_acme_bank/usage", headers=AUTH_HEADER)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["records"] == len(audit_logs_db.partitions["org_acme_bank"])
+        assert data["memory"]["total"] > 0
+        
+        response = client.get("/api/v1/organizations/org_unknown/usage", headers=AUTH_HEADER)
+        assert response.status_code == 404
+
+
+class TestExport:
+    """Test streaming bulk export"""
+
+    def test_ndjson_export(self):
+        response = client.get("/api/v1/audit/export", params={"flagged": True}, headers=AUTH_HEADER)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert records and all(r["flagged"] for r in records)
+        assert "response_content" in records[0]
+        timestamps = [r["timestamp"] for r in records]
+        assert timestamps == sorted(timestamps)
+
+    def test_csv_export(self):
+        response = client.get("/api/v1/audit/export", params={"format": "csv"}, headers=AUTH_HEADER)
+        assert response.status_code == 200
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == len(audit_logs_db)
+        assert rows[0]["content_hash"]
+
+    def test_resume_after_id(self):
+        full = client.get("/api/v1/audit/export", headers=AUTH_HEADER).text.splitlines()
+        first = json.loads(full[0])
+        resumed = client.get(
+            "/api/v1/audit/export", params={"after_id": first["id"]}, headers=AUTH_HEADER
+        ).text.splitlines()
+        assert resumed == full[1:]
+
+    def test_parquet_export(self):
+        pq = pytest.importorskip("pyarrow.parquet")
+        response = client.get("/api/v1/audit/export", params={"format": "parquet"}, headers=AUTH_HEADER)
+        assert response.status_code == 200
+        table = pq.read_table(io.BytesIO(response.content))
+        assert table.num_rows == len(audit_logs_db)
+
+    def test_rejects_bad_format_and_cursor(self):
+        response = client.get("/api/v1/audit/export", params={"format": "xml"}, headers=AUTH_HEADER)
+        assert response.status_code == 400
+        response = client.get("/api/v1/audit/export", params={"after_id": "nope"}, headers=AUTH_HEADER)
+        assert response.status_code == 400
+
+
+class TestReports:
+    """Test compliance report endpoints"""
+
+    period = datetime.now(timezone.utc).strftime("%Y-%m")
+
+    def test_decision_audit_markdown(self):
+        response = client.get(
+            "/api/v1/reports/org_acme_bank/decision_audit",
+            params={"period": self.period},
+            headers=AUTH_HEADER
+        )
+        assert response.status_code == 200
+        assert response.text.startswith("# DECISION AUDIT REPORT")
+
+    def test_system_audit_runs_as_job(self):
+        params = {"period": self.period, "format": "pdf"}
+        response = client.get("/api/v1/reports/org_healthfirst/system_audit", params=params, headers=AUTH_HEADER)
+        if response.status_code == 202:
+            job_id = response.json()["id"]
+            for _ in range(100):
+                job = client.get(f"/api/v1/reports/jobs/{job_id}", headers=AUTH_HEADER).json()
+                if job["status"] not in ("pending", "running"):
+                    break
+                time.sleep(0.05)
+            assert job["status"] == "completed"
+            response = client.get("/api/v1/reports/org_healthfirst/system_audit", params=params, headers=AUTH_HEADER)
+        assert response.status_code == 200
+        assert response.content.startswith(b"%PDF")
+
+    def test_rejects_bad_requests(self):
+        response = client.get(
+            "/api/v1/reports/org_acme_bank/decision_audit", params={"period": "2024-Q9"}, headers=AUTH_HEADER
+        )
+        assert response.status_code == 400
+        response = client.get(
+            "/api/v1/reports/org_acme_bank/quarterly", params={"period": "2024"}, headers=AUTH_HEADER
+        )
+        assert response.status_code == 400
+        response = client.get(
+            "/api/v1/reports/no_such_org/decision_audit", params={"period": "2024"}, headers=AUTH_HEADER
+        )
+        assert response.status_code == 404
+
+
+class TestIntegrity:
+    """Test hash chain proofs and verification endpoints"""
+
+    def first_log(self):
+        return client.get("/api/v1/audit/logs", headers=AUTH_HEADER).json()["logs"][-1]
+
+    def test_inclusion_proof_verifies(self):
+        log = self.first_log()
+        response = client.get(f"/api/v1/audit/logs/{log['id']}/proof", headers=AUTH_HEADER)
+        assert response.status_code == 200
+        proof = response.json()
+        detail = client.get(f"/api/v1/audit/logs/{log['id']}", headers=AUTH_HEADER).json()
+        assert detail["chain_hash"] == proof["chain_hash"]
+        assert verify_inclusion(
+            bytes.fromhex(proof["leaf_hash"]),
+            proof["chain_seq"],
+            proof["tree_size"],
+            [bytes.fromhex(node) for node in proof["proof"]],
+            bytes.fromhex(proof["root"]),
+        )
+
+    def test_proof_rejects_bad_tree_size(self):
+        log = self.first_log()
+        response = client.get(
+            f"/api/v1/audit/logs/{log['id']}/proof",
+            params={"tree_size": 10 ** 9},
+            headers=AUTH_HEADER
+        )
+        assert response.status_code == 400
+
+    def test_checkpoints_and_verify(self):
+        response = client.get("/api/v1/integrity/org_acme_bank/checkpoints", headers=AUTH_HEADER)
+        assert response.status_code == 200
+        assert response.json()["head"]["tree_size"] >= 2
+
+        response = client.get("/api/v1/integrity/org_acme_bank/verify", headers=AUTH_HEADER)
+        assert response.status_code == 200
+        assert response.json()["valid"] is True
+
+    def test_unknown_organization(self):
+        response = client.get("/api/v1/integrity/no_such_org/verify", headers=AUTH_HEADER)
+        assert response.status_code == 404
+
+    def test_verification_job(self):
+        response = client.post(
+            "/api/v1/integrity/jobs",
+            json={"organization_id": "org_acme_bank"},
+            headers=AUTH_HEADER
+        )
+        assert response.status_code == 202
+        job = response.json()
+
+        # The progress stream ends once the job finishes
+        stream = client.get(f"/api/v1/integrity/jobs/{job['id']}/progress", headers=AUTH_HEADER)
+        assert stream.status_code == 200
+        assert stream.text.startswith("event: progress")
+
+        result = client.get(f"/api/v1/integrity/jobs/{job['id']}", headers=AUTH_HEADER).json()
+        assert result["status"] == "completed"
+        # Counted by the job in the background, not before submit returns
+        assert result["total"] >= 2
+        assert result["verified"] == result["total"]
+        assert result["mismatched"] == 0
+
+    def test_unknown_verification_job(self):
+        response = client.get("/api/v1/integrity/jobs/no_such_job", headers=AUTH_HEADER)
+        assert response.status_code == 404
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
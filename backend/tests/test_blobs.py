@@ -0,0 +1,147 @@
+"""
+AI Audit Layer - Content-Addressed Blob Tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import blobs
+from blobs import BlobStore, DedupStorage, blob_key, encode_deduplicated
+from storage import MemoryStorage, TieredStorage, encode_record, read_source
+from store import AuditLogStore
+from test_store import make_record
+
+
+PROMPT = "Analyze loan application for applicant: credit score 720, DTI 35%, employment verified. " * 3
+RESPONSE = "APPROVED – strong credit profile with manageable debt load and \"stable\" income. " * 3
+
+
+def make_text_record(log_id, prompt=PROMPT, response=RESPONSE, **overrides):
+    return make_record(
+        log_id,
+        prompt_content=prompt,
+        response_content=response,
+        metadata={"prompt_content": None, "note": "]]"},
+        **overrides,
+    )
+
+
+class TestEncoding:
+    def test_rehydrates_to_plain_encoding(self):
+        storage = DedupStorage(MemoryStorage())
+        record = make_text_record("1")
+        storage.append([record])
+        stored = storage.inner._records["1"]
+
+        assert PROMPT.encode() not in stored
+        assert storage.rehydrate(stored) == encode_record(record)
+        assert storage.get("1")["response_content"] == RESPONSE
+
+    def test_short_values_stay_inline(self):
+        record = make_text_record("1", prompt="short", response="also short")
+        payload, texts = encode_deduplicated(record)
+        assert payload == encode_record(record)
+        assert texts == []
+
+
+class TestDeduplication:
+    def test_identical_bodies_stored_once(self):
+        storage = DedupStorage(MemoryStorage())
+        storage.append([make_text_record(str(i)) for i in range(10)])
+        storage.append([make_text_record("10", response="DENIED " * 30)])
+
+        assert len(storage.blobs) == 3
+        assert storage.blobs.refcount(blob_key(PROMPT)) == 11
+        assert storage.blobs.refcount(blob_key(RESPONSE)) == 10
+        usage = storage.usage()
+        assert usage["references"] == 22
+        assert usage["deduplicated_bytes"] > 9 * len(PROMPT)
+
+    def test_rewrite_releases_previous_bodies(self):
+        storage = DedupStorage(MemoryStorage())
+        storage.append([make_text_record("1")])
+        storage.append([make_text_record("1", response="REVISED " * 30)])
+
+        assert blob_key(RESPONSE) not in storage.blobs
+        assert storage.blobs.encoded(blob_key(RESPONSE)) is None
+        assert storage.blobs.refcount(blob_key(PROMPT)) == 1
+        assert storage.get("1")["response_content"] == "REVISED " * 30
+
+    def test_sources_carry_complete_records(self):
+        storage = DedupStorage(MemoryStorage())
+        storage.append([make_text_record(str(i)) for i in range(3)])
+
+        found = [pair for source in storage.sources(["2", "missing", "0"]) for pair in read_source(source)]
+        assert [log_id for log_id, _ in found] == ["2", "missing", "0"]
+        assert found[0][1]["prompt_content"] == PROMPT
+        assert found[1][1] is None
+
+    def test_store_over_dedup_storage(self):
+        store = AuditLogStore(DedupStorage(MemoryStorage()))
+        store.insert_many([make_text_record(str(i), minute=i) for i in range(5)])
+        assert store["3"]["prompt_content"] == PROMPT
+        total, _ = store.query({})
+        assert total == 5
+
+
+class TestDurableBlobs:
+    def open(self, directory):
+        return DedupStorage(
+            TieredStorage(str(directory), demote_interval=None),
+            BlobStore(str(directory / "blobs")),
+        )
+
+    def test_reopen_rebuilds_reference_counts(self, tmp_path):
+        storage = self.open(tmp_path)
+        storage.append([make_text_record(str(i)) for i in range(4)])
+        storage.close()
+
+        store = AuditLogStore(self.open(tmp_path))
+        assert store["2"]["response_content"] == RESPONSE
+        assert store.storage.blobs.refcount(blob_key(PROMPT)) == 4
+        store.close()
+
+    def test_unreferenced_durable_blob_is_reused(self, tmp_path):
+        storage = self.open(tmp_path)
+        storage.append([make_text_record("1")])
+        storage.append([make_text_record("1", response="REVISED " * 30)])
+        storage.append([make_text_record("2")])
+
+        assert storage.blobs.refcount(blob_key(RESPONSE)) == 1
+        assert len(storage.blobs.log) == 3
+        storage.close()
+
+    def test_sources_rehydrate_where_they_are_read(self, tmp_path, monkeypatch):
+        storage = DedupStorage(
+            TieredStorage(str(tmp_path), segment_bytes=2048, demote_interval=None),
+            BlobStore(str(tmp_path / "blobs")),
+        )
+        for i in range(20):
+            storage.append([make_text_record(str(i), minute=i)])
+        storage.inner.demote(now=4_000_000_000)
+
+        sources = storage.sources([str(i) for i in range(20)] + ["missing"])
+        assert {source[0] for source in sources} == {"dedup"}
+        assert {source[1][0] for source in sources} == {"cold", "memory"}
+        assert {source[2] for source in sources} == {str(tmp_path / "blobs")}
+
+        # A worker process has no open store and reads the blob log's files
+        monkeypatch.setattr(blobs, "_open_stores", {})
+        found = dict(pair for source in sources for pair in read_source(source))
+        assert found.pop("missing") is None
+        assert all(record["prompt_content"] == PROMPT for record in found.values())
+        assert found["3"] == storage.get("3")
+        storage.close()
+
+    def test_record_missing_its_blob_is_skipped(self, tmp_path):
+        storage = self.open(tmp_path)
+        storage.append([make_text_record("1"), make_text_record("2", response="LOST " * 30)])
+        storage.close()
+        # A crash lost the second response body but not its record
+        blobs = BlobStore(str(tmp_path / "blobs"))
+        del blobs.log._locations[blob_key("LOST " * 30)]
+
+        storage = DedupStorage(TieredStorage(str(tmp_path), demote_interval=None), blobs)
+        assert [record["id"] for record in storage.scan()] == ["1"]
+        storage.close()
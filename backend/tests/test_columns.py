@@ -0,0 +1,84 @@
+"""
+AI Audit Layer - Columnar Record Tests
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from columns import CategoricalColumn, BitColumn, ColumnStore
+from store import epoch_ns
+from test_store import make_record, BASE_TIME
+
+
+class TestColumns:
+    """Test the encoded column types"""
+
+    def test_categorical_stores_each_value_once(self):
+        column = CategoricalColumn()
+        for value in ["gpt-4", "claude", "gpt-4", None, "gpt-4"]:
+            column.append(value)
+        assert column.values == ["gpt-4", "claude", None]
+        assert list(column.codes) == [0, 1, 0, 2, 0]
+        assert column[3] is None
+        assert column.code("claude") == 1
+        assert column.code("missing") is None
+
+    def test_bit_column_packs_eight_per_byte(self):
+        column = BitColumn()
+        values = [i % 3 == 0 for i in range(20)]
+        for value in values:
+            column.append(value)
+        assert len(column) == 20
+        assert len(column.bits) == 3
+        assert [column[i] for i in range(20)] == values
+
+    def test_bit_column_take(self):
+        column = BitColumn()
+        values = [i % 3 == 0 for i in range(20)]
+        for value in values:
+            column.append(value)
+        for start, stop in ((0, 20), (3, 17), (9, 10), (5, 5), (16, 40)):
+            assert column.take(slice(start, stop)).tolist() == values[start:stop]
+        rows = np.array([19, 0, 8, 9, 3])
+        assert column.take(rows).tolist() == [values[row] for row in rows]
+
+
+class TestColumnStore:
+    """Test rebuilding summary rows from columns"""
+
+    def test_row_round_trip(self):
+        columns = ColumnStore()
+        record = make_record(
+            "1",
+            content_hash="ab" * 32,
+            prompt_tokens=150,
+            response_tokens=None,
+            confidence_score=0.87,
+            flagged=True,
+            indexed_at="2024-01-01T00:00:05+00:00",
+        )
+        row = columns.append(record, epoch_ns(record["timestamp"]))
+        result = columns.row(row)
+        assert result["id"] == "1"
+        assert result["timestamp"] == BASE_TIME
+        assert result["prompt_tokens"] == 150
+        assert result["response_tokens"] is None
+        assert result["confidence_score"] == 0.87
+        assert result["flagged"] is True
+        assert result["content_hash"] == "ab" * 32
+        assert result["model_name"] == "gpt-4"
+        assert result["indexed_at"] == "2024-01-01T00:00:05+00:00"
+        assert "indexed_at" not in columns.categorical
+
+    def test_missing_values(self):
+        columns = ColumnStore()
+        record = make_record("1", decision_type=None)
+        row = columns.append(record, epoch_ns(record["timestamp"]))
+        result = columns.row(row)
+        assert result["decision_type"] is None
+        assert result["confidence_score"] is None
+        assert result["flagged"] is False
+        assert result["indexed_at"] is None
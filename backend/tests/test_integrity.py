@@ -0,0 +1,214 @@
+"""
+AI Audit Layer - Integrity Ledger Tests
+"""
+
+import pytest
+import hashlib
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from integrity import MerkleLog, leaf_hash, node_hash, verify_inclusion
+from storage import MemoryStorage, SegmentLogStorage
+from store import AuditLogStore
+from test_store import make_record
+
+
+def reference_root(leaves):
+    """RFC 6962 Merkle tree hash, computed directly."""
+    if not leaves:
+        return hashlib.sha256(b"").digest()
+    if len(leaves) == 1:
+        return leaves[0]
+    k = 1
+    while k * 2 < len(leaves):
+        k *= 2
+    return node_hash(reference_root(leaves[:k]), reference_root(leaves[k:]))
+
+
+def make_leaves(n):
+    return [hashlib.sha256(str(i).encode()).digest() for i in range(n)]
+
+
+class TestMerkleLog:
+    """Test the incremental Merkle tree"""
+
+    def test_roots_match_reference(self):
+        leaves = make_leaves(33)
+        tree = MerkleLog()
+        for leaf in leaves:
+            tree.append(leaf)
+        for size in range(34):
+            assert tree.root(size) == reference_root(leaves[:size])
+
+    def test_inclusion_proofs_verify(self):
+        leaves = make_leaves(21)
+        tree = MerkleLog()
+        for leaf in leaves:
+            tree.append(leaf)
+        for size in range(1, 22):
+            root = tree.root(size)
+            for index in range(size):
+                proof = tree.inclusion_proof(index, size)
+                assert len(proof) <= size.bit_length()
+                assert verify_inclusion(leaves[index], index, size, proof, root)
+
+    def test_wrong_leaf_or_index_fails(self):
+        leaves = make_leaves(10)
+        tree = MerkleLog()
+        for leaf in leaves:
+            tree.append(leaf)
+        proof = tree.inclusion_proof(3, 10)
+        assert not verify_inclusion(leaves[4], 3, 10, proof, tree.root())
+        assert not verify_inclusion(leaves[3], 5, 10, proof, tree.root())
+
+
+@pytest.fixture
+def store():
+    store = AuditLogStore()
+    store.ledger.checkpoint_interval = 4
+    for i in range(10):
+        store.insert(make_record(str(i), minute=i, organization_id="org_a" if i % 5 else "org_b"))
+    return store
+
+
+class TestIntegrityLedger:
+    """Test per-organization chains, checkpoints and range verification"""
+
+    def test_sequences_are_per_organization(self, store):
+        assert [store.row(str(i))["chain_seq"] for i in range(10)] == [0, 0, 1, 2, 3, 1, 4, 5, 6, 7]
+        assert len(store.ledger.get("org_a")) == 8
+        assert len(store.ledger.get("org_b")) == 2
+
+    def test_checkpoints_recorded_at_interval(self, store):
+        checkpoints = store.ledger.get("org_a").checkpoints
+        assert [c["tree_size"] for c in checkpoints] == [4, 8]
+        assert checkpoints[-1]["root"] == store.ledger.head("org_a")["root"]
+
+    def test_verify_clean_range(self, store):
+        result = store.verify_chain("org_a", 0, 8)
+        assert result["valid"]
+        assert result["checkpoints_checked"] == 2
+        assert store.verify_chain("org_a", 5, 7)["valid"]
+
+    def test_verify_detects_altered_log(self, store):
+        partition, row = store._locate("3")
+        partition.columns.content_hashes[row * 32] ^= 0xFF
+        result = store.verify_chain("org_a", 0, 8)
+        assert not result["valid"]
+        assert result["failures"][0] == {"chain_seq": 2, "reason": "log does not match its Merkle leaf"}
+        assert store.verify_chain("org_a", 3, 8)["valid"]
+
+    def test_verify_detects_tampered_tree(self, store):
+        tree = store.ledger.get("org_a").tree
+        tree.levels[1][0] ^= 0xFF
+        result = store.verify_chain("org_a", 0, 2)
+        assert not result["valid"]
+        assert any("Merkle node" in f["reason"] for f in result["failures"])
+
+    def test_rebuild_detects_deleted_log(self):
+        storage = MemoryStorage()
+        store = AuditLogStore(storage)
+        for i in range(5):
+            store.insert(make_record(str(i), minute=i))
+        del storage._records["2"]
+
+        rebuilt = AuditLogStore(storage)
+        assert rebuilt.ledger.breaks
+        assert rebuilt.ledger.breaks[0]["audit_log_id"] == "3"
+        assert not rebuilt.verify_chain("org_a", 0, 4)["valid"]
+
+    def test_rebuild_of_intact_store_is_clean(self):
+        storage = MemoryStorage()
+        store = AuditLogStore(storage)
+        for i in range(5):
+            store.insert(make_record(str(i), minute=i))
+        rebuilt = AuditLogStore(storage)
+        assert rebuilt.ledger.breaks == []
+        assert rebuilt.ledger.head("org_a") == store.ledger.head("org_a")
+
+    def test_leaf_binds_id_and_content(self):
+        assert leaf_hash("a", "00" * 32) != leaf_hash("b", "00" * 32)
+        assert leaf_hash("a", "00" * 32) != leaf_hash("a", "01" * 32)
+
+
+class TestPersistedCheckpoints:
+    """Test checkpoints persisted across restarts"""
+
+    def open(self, directory):
+        store = AuditLogStore(SegmentLogStorage(str(directory)), ledger_path=str(directory / "checkpoints.jsonl"))
+        store.ledger.checkpoint_interval = 4
+        return store
+
+    def fill(self, directory, count=10):
+        store = self.open(directory)
+        for i in range(count):
+            store.insert(make_record(str(i), minute=i))
+        store.close()
+
+    def test_clean_restart_verifies(self, tmp_path):
+        self.fill(tmp_path)
+        store = self.open(tmp_path)
+        assert store.ledger.breaks == []
+        # Interval checkpoints and the head written on close
+        assert [c["tree_size"] for c in store.ledger.get("org_a").checkpoints] == [4, 8, 10]
+        assert store.verify_chain("org_a", 0, 10)["valid"]
+        store.close()
+
+    def test_truncated_tail_is_detected(self, tmp_path):
+        self.fill(tmp_path)
+        storage = SegmentLogStorage(str(tmp_path))
+        # Drop the last two records, keeping the rest consistent
+        records = list(storage.scan())[:-2]
+        storage.close()
+        for name in os.listdir(tmp_path):
+            if name.startswith("segment-"):
+                os.remove(tmp_path / name)
+        storage = SegmentLogStorage(str(tmp_path))
+        storage.append(records)
+        storage.close()
+
+        store = self.open(tmp_path)
+        assert len(store.ledger.get("org_a")) == 8
+        result = store.verify_chain("org_a", 0, 8)
+        assert not result["valid"]
+        assert "missing from storage" in result["failures"][0]["reason"]
+        store.close()
+
+    def test_rewritten_records_are_detected(self, tmp_path):
+        self.fill(tmp_path)
+        storage = SegmentLogStorage(str(tmp_path))
+        records = list(storage.scan())
+        storage.close()
+        for name in os.listdir(tmp_path):
+            if name.startswith("segment-"):
+                os.remove(tmp_path / name)
+        # Alter a record and recompute every chain field after it
+        records[2]["content_hash"] = hashlib.sha256(b"forged").hexdigest()
+        forged = AuditLogStore()
+        forged.insert_many([dict(record, chain_seq=None, chain_hash=None) for record in records])
+        storage = SegmentLogStorage(str(tmp_path))
+        storage.append([forged.get(record["id"]) for record in records])
+        storage.close()
+
+        store = self.open(tmp_path)
+        assert [b["reason"] for b in store.ledger.breaks] == ["checkpoint root does not match the tree"] * 3
+        assert not store.verify_chain("org_a", 0, 10)["valid"]
+        store.close()
+
+    def test_failed_append_leaves_no_chain_link(self, tmp_path):
+        store = self.open(tmp_path)
+        store.insert(make_record("0"))
+
+        def fail(records):
+            raise OSError("disk full")
+
+        store.storage.append = fail
+        with pytest.raises(OSError):
+            store.insert(make_record("1", minute=1))
+        del store.storage.append
+        assert len(store.ledger.get("org_a")) == 1
+        store.insert(make_record("1", minute=1))
+        assert store.row("1")["chain_seq"] == 1
+        assert store.verify_chain("org_a", 0, 2)["valid"]
+        store.close()
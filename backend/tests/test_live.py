@@ -0,0 +1,126 @@
+"""
+AI Audit Layer - Live Feed Tests
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from live import LiveFeed
+from test_store import make_record
+
+
+def parse(events):
+    parsed = []
+    for event in events:
+        name, data = event.decode().strip().split("\n")
+        parsed.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return parsed
+
+
+class TestLiveFeed:
+    def test_filters_per_subscriber(self):
+        async def run():
+            feed = LiveFeed(lambda organization_id: "{}")
+            everything = feed.subscribe(metrics=False)
+            flagged = feed.subscribe({"flagged": True}, metrics=False)
+            feed.publish([make_record("1"), make_record("2", flagged=True)])
+            return await everything.next(0), await flagged.next(0)
+
+        everything, flagged = asyncio.run(run())
+        assert [data["id"] for _, data in parse(everything)] == ["1", "2"]
+        assert parse(flagged) == [("log", parse(everything)[1][1])]
+        assert "prompt_content" not in parse(everything)[0][1]
+
+    def test_matching_subscribers_share_encoded_event(self):
+        async def run():
+            feed = LiveFeed(lambda organization_id: "{}")
+            first = feed.subscribe(metrics=False)
+            second = feed.subscribe({"user_id": "user_1"}, metrics=False)
+            feed.publish([make_record("1", user_id="user_1")])
+            return first.pending[0], second.pending[0]
+
+        first, second = asyncio.run(run())
+        assert first is second
+
+    def test_slow_subscriber_gets_resync_instead_of_blocking(self):
+        async def run():
+            feed = LiveFeed(lambda organization_id: "{}", buffer=3)
+            slow = feed.subscribe(metrics=False)
+            feed.publish([make_record(str(i)) for i in range(5)])
+            first = await slow.next(0)
+            feed.publish([make_record(str(i)) for i in range(5, 11)])
+            return first, await slow.next(0)
+
+        first, second = asyncio.run(run())
+        first, second = parse(first), parse(second)
+        assert first[0] == ("resync", {"dropped": 3})
+        assert [data["id"] for _, data in first[1:]] == ["3", "4"]
+        # 5-9 are dropped by two more overflows; the count is cumulative
+        assert second[0] == ("resync", {"dropped": 8})
+        assert [data["id"] for _, data in second[1:]] == ["10"]
+
+    def test_metrics_coalesced_per_interval(self):
+        calls = []
+
+        def snapshot(organization_id):
+            calls.append(1)
+            return json.dumps({"total": len(calls)})
+
+        async def run():
+            feed = LiveFeed(snapshot, interval=0.01)
+            subscriber = feed.subscribe()
+            quiet = feed.subscribe({"user_id": "nobody"}, metrics=False)
+            for i in range(10):
+                feed.publish([make_record(str(i))])
+            await asyncio.sleep(0.05)
+            return await subscriber.next(0), await quiet.next(0)
+
+        events, quiet = asyncio.run(run())
+        events = parse(events)
+        assert len(calls) == 1
+        assert [name for name, _ in events].count("log") == 10
+        assert events[-1] == ("metrics", {"total": 1})
+        assert quiet == []
+
+    def test_metrics_scoped_to_subscriber_organization(self):
+        calls = []
+
+        def snapshot(organization_id):
+            calls.append(organization_id)
+            return json.dumps({"organization_id": organization_id})
+
+        async def run():
+            feed = LiveFeed(snapshot, interval=0.01)
+            overall = feed.subscribe()
+            org_a = feed.subscribe({"organization_id": "org_a"})
+            org_b = feed.subscribe({"organization_id": "org_b"})
+            feed.publish([make_record("1", organization_id="org_a")])
+            await asyncio.sleep(0.05)
+            return await overall.next(0), await org_a.next(0), await org_b.next(0)
+
+        overall, org_a, org_b = (parse(events) for events in asyncio.run(run()))
+        assert calls == [None, "org_a"]
+        assert overall[-1] == ("metrics", {"organization_id": None})
+        assert org_a[-1] == ("metrics", {"organization_id": "org_a"})
+        # Nothing changed for org_b, and it never sees org_a's figures
+        assert org_b == []
+
+    def test_next_times_out_empty(self):
+        async def run():
+            feed = LiveFeed(lambda organization_id: "{}")
+            return await feed.subscribe().next(0.01)
+
+        assert asyncio.run(run()) == []
+
+    def test_unsubscribed_stream_no_longer_receives(self):
+        async def run():
+            feed = LiveFeed(lambda organization_id: "{}")
+            subscriber = feed.subscribe(metrics=False)
+            feed.unsubscribe(subscriber)
+            feed.publish([make_record("1")])
+            return subscriber.pending
+
+        assert not asyncio.run(run())
@@ -0,0 +1,46 @@
+"""
+AI Audit Layer - Response Cache Tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from response_cache import ResponseCache, ENTRY_OVERHEAD
+
+
+class TestResponseCache:
+    def test_hits_and_misses_are_counted(self):
+        cache = ResponseCache(1 << 20)
+        assert cache.get("a") is None
+        cache.put("a", b"{}")
+        assert cache.get("a") == b"{}"
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+        assert stats["bytes"] == 2 + ENTRY_OVERHEAD
+
+    def test_evicts_least_recently_used_by_size(self):
+        entry = 100
+        cache = ResponseCache(4 * (entry + ENTRY_OVERHEAD))
+        for key in "abcd":
+            cache.put(key, b"x" * entry)
+        cache.get("a")
+        cache.put("e", b"x" * entry)
+
+        assert cache.get("b") is None
+        assert all(cache.get(key) is not None for key in "acde")
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["bytes"] <= cache.max_bytes
+
+    def test_oversized_values_are_not_cached(self):
+        cache = ResponseCache(4000)
+        cache.put("big", b"x" * 2000)
+        assert cache.get("big") is None
+        assert len(cache) == 0
+
+    def test_replacing_a_key_keeps_size_exact(self):
+        cache = ResponseCache(1 << 20)
+        cache.put("a", b"x" * 10)
+        cache.put("a", b"x" * 30)
+        assert len(cache) == 1
+        assert cache.stats()["bytes"] == 30 + ENTRY_OVERHEAD
@@ -0,0 +1,66 @@
+"""
+AI Audit Layer - Quantile Sketch Tests
+"""
+
+import pytest
+import random
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sketch import DDSketch
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+class TestDDSketch:
+    """Test relative-error quantiles and merging"""
+
+    def test_empty_sketch(self):
+        assert DDSketch().quantile(0.5) is None
+
+    def test_quantiles_within_relative_accuracy(self):
+        rng = random.Random(42)
+        values = [rng.lognormvariate(7, 1) for _ in range(10000)]
+        sketch = DDSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+        for q in (0.5, 0.95, 0.99):
+            assert sketch.quantile(q) == pytest.approx(exact_quantile(values, q), rel=0.01)
+
+    def test_zero_and_extremes(self):
+        sketch = DDSketch()
+        for value in (0, 0, 10, 1000):
+            sketch.add(value)
+        assert sketch.quantile(0) == 0
+        assert sketch.quantile(1) == 1000
+
+    def test_merge_matches_single_sketch(self):
+        rng = random.Random(7)
+        values = [rng.randint(100, 5000) for _ in range(2000)]
+        whole, left, right = DDSketch(), DDSketch(), DDSketch()
+        for i, value in enumerate(values):
+            whole.add(value)
+            (left if i % 2 else right).add(value)
+        left.merge(right)
+        assert left.count == whole.count
+        assert left.bins == whole.bins
+
+    def test_memory_is_bounded(self):
+        sketch = DDSketch(max_bins=64)
+        for exponent in range(200):
+            sketch.add(1.1 ** exponent)
+        assert len(sketch.bins) <= 64
+        # Collapsing only loses accuracy at the low end
+        assert sketch.quantile(1) == pytest.approx(1.1 ** 199, rel=0.01)
+
+    def test_rejects_negative_values(self):
+        with pytest.raises(ValueError):
+            DDSketch().add(-1)
+
+    def test_rejects_mismatched_merge(self):
+        with pytest.raises(ValueError):
+            DDSketch(0.01).merge(DDSketch(0.02))
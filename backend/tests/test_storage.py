@@ -0,0 +1,290 @@
+"""
+AI Audit Layer - Storage Engine Tests
+"""
+
+import pytest
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import SegmentLogStorage, TieredStorage, ColdSegment, CODECS, read_source
+from store import AuditLogStore
+from test_store import make_record
+
+
+def segment_files(directory, suffix):
+    return sorted(name for name in os.listdir(directory) if name.endswith(suffix))
+
+
+class TestSegmentLogStorage:
+    """Test the append-only segment log engine"""
+
+    def test_append_get_and_scan(self, tmp_path):
+        storage = SegmentLogStorage(str(tmp_path))
+        storage.append([make_record("1"), make_record("2", minute=1)])
+        assert len(storage) == 2
+        assert storage.get("2")["timestamp"] == "2024-01-01T00:01:00+00:00"
+        assert storage.get("missing") is None
+        assert [r["id"] for r in storage.scan()] == ["1", "2"]
+        storage.close()
+
+    def test_group_commit_makes_appends_durable(self, tmp_path):
+        storage = SegmentLogStorage(str(tmp_path))
+
+        async def write_all():
+            tokens = [storage.append([make_record(str(i))]) for i in range(20)]
+            await asyncio.gather(*(storage.wait_durable(t) for t in tokens))
+            return tokens
+
+        tokens = asyncio.run(write_all())
+        assert storage._durable >= tokens[-1]
+        storage.close()
+
+    def test_reopen_recovers_records(self, tmp_path):
+        storage = SegmentLogStorage(str(tmp_path))
+        storage.append([make_record(str(i)) for i in range(5)])
+        storage.close()
+
+        reopened = SegmentLogStorage(str(tmp_path))
+        assert len(reopened) == 5
+        assert reopened.get("3")["id"] == "3"
+        reopened.append([make_record("5")])
+        assert [r["id"] for r in reopened.scan()] == ["0", "1", "2", "3", "4", "5"]
+        reopened.close()
+
+    def test_torn_tail_is_truncated(self, tmp_path):
+        storage = SegmentLogStorage(str(tmp_path))
+        storage.append([make_record("1"), make_record("2")])
+        storage.wait_durable_blocking(1)
+        path = storage._path(storage._active)
+        storage._closing = True  # simulate a crash: no close-time checkpoint
+        with storage._cond:
+            storage._cond.notify_all()
+        storage._flusher.join()
+
+        with open(path, "ab") as f:
+            f.write(b"\x40\x00\x00\x00\x00")
+        reopened = SegmentLogStorage(str(tmp_path))
+        assert len(reopened) == 2
+        reopened.append([make_record("3")])
+        assert [r["id"] for r in reopened.scan()] == ["1", "2", "3"]
+        reopened.close()
+
+    def test_rotation_writes_checkpoints(self, tmp_path):
+        storage = SegmentLogStorage(str(tmp_path), segment_bytes=1024)
+        for i in range(10):
+            storage.append([make_record(str(i))])
+        sealed = list(storage._sealed)
+        assert len(sealed) > 1
+        assert len(segment_files(tmp_path, ".idx")) == len(sealed)
+        storage.close()
+
+        reopened = SegmentLogStorage(str(tmp_path), segment_bytes=1024)
+        assert [r["id"] for r in reopened.scan()] == [str(i) for i in range(10)]
+        reopened.close()
+
+    def test_compaction_merges_small_segments(self, tmp_path):
+        # Every restart seals a small segment
+        for i in range(4):
+            storage = SegmentLogStorage(str(tmp_path))
+            storage.append([make_record(str(i))])
+            storage.close()
+        assert len(segment_files(tmp_path, ".log")) >= 2
+
+        storage = SegmentLogStorage(str(tmp_path))
+        assert len(segment_files(tmp_path, ".log")) == 1
+        assert [r["id"] for r in storage.scan()] == ["0", "1", "2", "3"]
+        assert storage.get("2")["id"] == "2"
+        storage.close()
+
+    def small_segments(self, directory, count=4):
+        for i in range(count):
+            storage = SegmentLogStorage(str(directory))
+            storage.append([make_record(str(i))])
+            storage.close()
+
+    def test_committed_compaction_completes_after_crash(self, tmp_path, monkeypatch):
+        self.small_segments(tmp_path)
+
+        def crash(self, target, sources):
+            # Only the merged log is in place when the process dies
+            os.replace(self._path(target) + ".compact", self._path(target))
+            raise SystemExit
+
+        monkeypatch.setattr(SegmentLogStorage, "_apply_compaction", crash)
+        with pytest.raises(SystemExit):
+            SegmentLogStorage(str(tmp_path))
+        monkeypatch.undo()
+
+        storage = SegmentLogStorage(str(tmp_path))
+        assert segment_files(tmp_path, ".log") == ["segment-00000001.log"]
+        assert segment_files(tmp_path, ".json") == []
+        assert [r["id"] for r in storage.scan()] == ["0", "1", "2", "3"]
+        assert storage.get("3")["id"] == "3"
+        storage.close()
+
+    def test_uncommitted_compaction_is_discarded(self, tmp_path):
+        self.small_segments(tmp_path)
+        with open(os.path.join(tmp_path, "segment-00000001.log.compact"), "wb") as f:
+            f.write(b"partial")
+
+        storage = SegmentLogStorage(str(tmp_path))
+        assert segment_files(tmp_path, ".compact") == []
+        assert [r["id"] for r in storage.scan()] == ["0", "1", "2", "3"]
+        storage.close()
+
+
+# Far enough past BASE_TIME that every test record is cold
+LATER = 4_000_000_000
+
+
+def tiered(directory, **kwargs):
+    kwargs.setdefault("segment_bytes", 1024)
+    kwargs.setdefault("demote_interval", None)
+    return TieredStorage(str(directory), **kwargs)
+
+
+class TestTieredStorage:
+    """Test moving old records to compressed cold segments"""
+
+    def test_recent_records_stay_hot(self, tmp_path):
+        storage = tiered(tmp_path)
+        for i in range(10):
+            storage.append([make_record(str(i))])
+        # 2024 is not older than a hot window measured from 2024
+        assert storage.demote(now=1704067200) == 0
+        assert storage.usage()["hot"]["records"] == 10
+        storage.close()
+
+    def test_demotes_sealed_segments_and_reads_back(self, tmp_path):
+        storage = tiered(tmp_path)
+        for i in range(20):
+            storage.append([make_record(str(i), minute=i)])
+        moved = storage.demote(now=LATER)
+
+        usage = storage.usage()
+        assert moved == usage["cold"]["records"] > 0
+        assert usage["hot"]["records"] == 20 - moved
+        assert len(segment_files(tmp_path / "cold", ".cidx")) == len(storage._cold)
+        # Only the active log segment is left
+        assert len(segment_files(tmp_path, ".log")) == 1
+        assert len(storage) == 20
+        assert storage.get("0")["timestamp"] == "2024-01-01T00:00:00+00:00"
+        assert [r["id"] for r in storage.scan()] == [str(i) for i in range(20)]
+        storage.close()
+
+    def test_sources_read_across_tiers(self, tmp_path):
+        storage = tiered(tmp_path)
+        for i in range(20):
+            storage.append([make_record(str(i))])
+        storage.demote(now=LATER)
+        ids = ["19", "0", "1", "missing", "18"]
+
+        sources = storage.sources(ids)
+        assert {source[0] for source in sources} == {"memory", "cold"}
+        found = [pair for source in sources for pair in read_source(source)]
+        assert [log_id for log_id, _ in found] == ids
+        assert [record and record["id"] for _, record in found] == ["19", "0", "1", None, "18"]
+        storage.close()
+
+    def test_rewritten_id_keeps_newest_copy(self, tmp_path):
+        storage = tiered(tmp_path)
+        for i in range(20):
+            storage.append([make_record(str(i))])
+        storage.demote(now=LATER)
+        storage.append([make_record("0", user_id="user_z")])
+
+        assert storage.get("0")["user_id"] == "user_z"
+        assert [r["id"] for r in storage.scan()].count("0") == 1
+        assert len(storage) == 20
+        storage.close()
+
+    def test_reopen_recovers_both_tiers(self, tmp_path):
+        storage = tiered(tmp_path)
+        for i in range(20):
+            storage.append([make_record(str(i))])
+        storage.demote(now=LATER)
+        cold = len(storage._cold_locations)
+        storage.close()
+
+        reopened = tiered(tmp_path)
+        assert len(reopened._cold_locations) == cold
+        assert [r["id"] for r in reopened.scan()] == [str(i) for i in range(20)]
+        # New log segments never reuse a cold segment's number
+        reopened.append([make_record("20")])
+        assert reopened.log.active > max(reopened._cold)
+        reopened.close()
+
+    def test_crash_between_cold_write_and_log_delete(self, tmp_path):
+        storage = tiered(tmp_path)
+        for i in range(20):
+            storage.append([make_record(str(i))])
+        seq = storage.log.sealed[0]
+        records = [(r["id"], 0.0, p) for r, p in storage.log.scan_segment(seq)]
+        storage.close()
+        # The cold copy is complete but the log segment is still there
+        cold = tmp_path / "cold"
+        ColdSegment.write(
+            str(cold / f"segment-{seq:08d}.cold"), str(cold / f"segment-{seq:08d}.cidx"), records, "zlib"
+        )
+
+        reopened = tiered(tmp_path)
+        assert f"segment-{seq:08d}.log" not in segment_files(tmp_path, ".log")
+        assert [r["id"] for r in reopened.scan()] == [str(i) for i in range(20)]
+        reopened.close()
+
+    def test_warm_cache_is_bounded(self, tmp_path):
+        storage = tiered(tmp_path, block_cache_bytes=1)
+        for i in range(40):
+            storage.append([make_record(str(i))])
+        storage.demote(now=LATER)
+        for i in range(40):
+            storage.get(str(i))
+        assert storage.usage()["warm"]["blocks"] == 1
+        storage.close()
+
+    @pytest.mark.parametrize("codec", sorted(CODECS))
+    def test_codecs(self, tmp_path, codec):
+        storage = tiered(tmp_path, codec=codec)
+        for i in range(20):
+            storage.append([make_record(str(i))])
+        storage.demote(now=LATER)
+        assert storage.get("0")["id"] == "0"
+        storage.close()
+
+    def test_store_queries_span_tiers(self, tmp_path):
+        store = AuditLogStore(tiered(tmp_path))
+        for i in range(20):
+            store.insert(make_record(str(i), minute=i, flagged=i % 2 == 0))
+        store.storage.demote(now=LATER)
+        store.close()
+
+        store = AuditLogStore(tiered(tmp_path))
+        total, page = store.query({"flagged": True}, limit=3)
+        assert total == 10
+        assert [r["id"] for r in page] == ["18", "16", "14"]
+        assert store["0"]["flagged"] is True
+        store.close()
+
+
+class TestDurableStore:
+    """Test rebuilding the store's indexes from a durable engine"""
+
+    def test_indexes_rebuilt_on_open(self, tmp_path):
+        store = AuditLogStore(SegmentLogStorage(str(tmp_path)))
+        store.insert(make_record("1", minute=1))
+        store.insert_many([
+            make_record("2", minute=2, user_id="user_b", flagged=True),
+            make_record("3", minute=3, user_id="user_b"),
+        ])
+        store.close()
+
+        store = AuditLogStore(SegmentLogStorage(str(tmp_path)))
+        assert len(store) == 3
+        assert store.match_ids({"user_id": "user_b"}) == {"2", "3"}
+        assert [r["id"] for r in store.query({})[1]] == ["3", "2", "1"]
+        assert store.find_request("org_a", "req_2")["id"] == "2"
+        assert store.metrics.flagged == 1
+        assert store["1"]["duration_ms"] == 1000
+        store.close()
@@ -0,0 +1,323 @@
+"""
+AI Audit Layer - Audit Log Store Tests
+"""
+
+import pytest
+from datetime import datetime, timedelta, timezone
+import hashlib
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from store import AuditLogStore, epoch_ns, encode_cursor, decode_cursor
+
+
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_record(log_id, minute=0, **overrides):
+    record = {
+        "id": log_id,
+        "request_id": f"req_{log_id}",
+        "organization_id": "org_a",
+        "timestamp": BASE_TIME + timedelta(minutes=minute),
+        "user_id": "user_a",
+        "decision_type": "loan_underwriting",
+        "decision_outcome": "approved",
+        "model_provider": "openai",
+        "model_name": "gpt-4",
+        "risk_level": "low",
+        "duration_ms": 1000,
+        "flagged": False,
+        "content_hash": hashlib.sha256(log_id.encode()).hexdigest(),
+    }
+    record.update(overrides)
+    return record
+
+
+@pytest.fixture
+def store():
+    store = AuditLogStore()
+    store.insert(make_record("1", minute=1))
+    store.insert(make_record("2", minute=2, user_id="user_b", decision_outcome="denied", risk_level="high", flagged=True))
+    store.insert(make_record("3", minute=3, user_id="user_b", model_provider="anthropic"))
+    store.insert(make_record("4", minute=4, decision_type=None, decision_outcome=None))
+    return store
+
+
+class TestInsertValidation:
+    """Test records the indexes cannot hold are rejected before storage"""
+
+    def test_rejected_batch_changes_nothing(self, store):
+        with pytest.raises(ValueError):
+            store.insert_many([make_record("5", minute=5), make_record("6", minute=6, duration_ms=-1)])
+        assert len(store) == 4 and len(store.storage) == 4
+        assert "5" not in store.storage
+        assert len(store.ledger.get("org_a")) == 4
+
+        store.insert(make_record("5", minute=5))
+        assert store.query({}, limit=1)[1][0]["id"] == "5"
+        assert store.row("5")["chain_seq"] == 4
+
+    def test_out_of_range_integer_rejected(self, store):
+        with pytest.raises(ValueError):
+            store.insert(make_record("5", prompt_tokens=2 ** 63))
+        assert len(store.storage) == 4
+
+    def test_unindexable_stored_record_is_skipped(self, store):
+        store.storage.append([make_record("bad", minute=5, duration_ms=-1)])
+        reopened = AuditLogStore(store.storage)
+        assert reopened.unindexed == ["bad"]
+        assert len(reopened) == 4
+
+
+class TestSecondaryIndexes:
+    """Test equality filters answered from the indexes"""
+
+    def test_unfiltered_returns_none(self, store):
+        assert store.match_ids({}) is None
+        assert store.query({})[0] == 4
+
+    def test_single_filter(self, store):
+        assert store.match_ids({"user_id": "user_b"}) == {"2", "3"}
+
+    def test_intersection(self, store):
+        assert store.match_ids({"user_id": "user_b", "model_provider": "openai"}) == {"2"}
+        assert store.match_ids({"user_id": "user_a", "flagged": True}) == set()
+
+    def test_unknown_value_returns_empty(self, store):
+        assert store.match_ids({"user_id": "nobody", "risk_level": "low"}) == set()
+
+    def test_none_values_are_indexed(self, store):
+        assert store.match_ids({"decision_type": None}) == {"4"}
+
+    def test_result_does_not_alias_index(self, store):
+        ids = store.match_ids({"user_id": "user_b"})
+        ids.clear()
+        assert store.match_ids({"user_id": "user_b"}) == {"2", "3"}
+
+    def test_unindexed_field_raises(self, store):
+        with pytest.raises(KeyError):
+            store.match_ids({"prompt_content": "x"})
+
+
+def page_ids(result):
+    total, records = result
+    return total, [r["id"] for r in records]
+
+
+class TestTimeIndex:
+    """Test timestamp range filters and newest-first paging"""
+
+    def test_epoch_ns_accepts_strings_and_naive_datetimes(self):
+        expected = epoch_ns(BASE_TIME)
+        assert epoch_ns("2024-01-01T00:00:00Z") == expected
+        assert epoch_ns(datetime(2024, 1, 1)) == expected
+        assert epoch_ns(BASE_TIME + timedelta(microseconds=1)) == expected + 1000
+
+    def test_newest_first(self, store):
+        assert page_ids(store.query({})) == (4, ["4", "3", "2", "1"])
+
+    def test_offset_and_limit(self, store):
+        assert page_ids(store.query({}, limit=2, offset=1)) == (4, ["3", "2"])
+        assert page_ids(store.query({}, limit=2, offset=3)) == (4, ["1"])
+        assert page_ids(store.query({}, limit=2, offset=10)) == (4, [])
+
+    def test_range_is_inclusive(self, store):
+        start = BASE_TIME + timedelta(minutes=2)
+        end = BASE_TIME + timedelta(minutes=3)
+        assert page_ids(store.query({}, start=start, end=end)) == (2, ["3", "2"])
+
+    def test_empty_range(self, store):
+        start = BASE_TIME + timedelta(minutes=10)
+        assert page_ids(store.query({"user_id": "user_a"}, start=start)) == (0, [])
+
+    def test_filters_with_range(self, store):
+        end = BASE_TIME + timedelta(minutes=2)
+        assert page_ids(store.query({"user_id": "user_b"}, end=end)) == (1, ["2"])
+        assert page_ids(store.query({"user_id": "user_a"}, limit=1, offset=1)) == (2, ["1"])
+
+    def test_range_scan_path(self, store):
+        # A narrow range smaller than the candidate set walks the time index
+        start = end = BASE_TIME + timedelta(minutes=4)
+        assert page_ids(store.query({"user_id": "user_a"}, start=start, end=end)) == (1, ["4"])
+
+    def test_out_of_order_insert(self, store):
+        store.insert(make_record("0", minute=0))
+        store.insert(make_record("2b", minute=2))
+        assert page_ids(store.query({})) == (6, ["4", "3", "2b", "2", "1", "0"])
+
+
+class TestCursorPagination:
+    """Test keyset pagination with time index cursors"""
+
+    def test_cursor_round_trip(self):
+        key = (epoch_ns(BASE_TIME), "log:with:colons")
+        assert decode_cursor(encode_cursor(key)) == key
+
+    def test_malformed_cursor_raises(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not a cursor")
+
+    def test_walk_all_pages(self, store):
+        seen = []
+        before = None
+        while True:
+            total, page = store.query({}, limit=3, before=before, count_total=before is None)
+            if before is not None:
+                assert total is None
+            seen.extend(r["id"] for r in page)
+            if len(page) < 3:
+                break
+            before = store.time_key(page[-1]["id"])
+        assert seen == ["4", "3", "2", "1"]
+
+    def test_cursor_with_filters(self, store):
+        before = store.time_key("4")
+        assert page_ids(store.query({"user_id": "user_a"}, before=before)) == (1, ["1"])
+        # Narrow range forces the time index walk
+        start = BASE_TIME + timedelta(minutes=3)
+        assert page_ids(store.query({"user_id": "user_b"}, start=start, before=before)) == (1, ["3"])
+
+    def test_cursor_stable_under_inserts(self, store):
+        _, page = store.query({}, limit=2)
+        before = store.time_key(page[-1]["id"])
+        store.insert(make_record("5", minute=5))
+        assert page_ids(store.query({}, limit=2, before=before)) == (2, ["2", "1"])
+
+
+class TestScanRange:
+    """Test the batched oldest-first walk used by exports"""
+
+    def scan_ids(self, store, filters=None, **kwargs):
+        return [[r["id"] for r in batch] for batch in store.scan_range(filters or {}, **kwargs)]
+
+    def test_batches_oldest_first(self, store):
+        assert self.scan_ids(store, batch_size=3) == [["1", "2", "3"], ["4"]]
+
+    def test_filters_across_windows(self, store):
+        assert self.scan_ids(store, {"user_id": "user_b"}, batch_size=1, window=2) == [["2"], ["3"]]
+
+    def test_resume_after_key(self, store):
+        after = store.time_key("2")
+        assert self.scan_ids(store, after=after) == [["3", "4"]]
+
+    def test_out_of_order_inserts(self, store):
+        store.insert(make_record("0", minute=0))
+        assert self.scan_ids(store, batch_size=2) == [["0", "1"], ["2", "3"], ["4"]]
+
+
+class TestContentDigests:
+    """Test the windowed digest walk used by verification jobs"""
+
+    def test_walks_in_windows(self, store):
+        store.insert(make_record("0", minute=0, user_id="user_b"))
+        counts, batches = store.content_digests({"user_id": "user_b"}, batch_size=1, window=2)
+        batches = list(batches)
+        assert sum(counts) == 3
+        assert [ids for ids, _ in batches] == [["0"], ["2"], ["3"]]
+        assert batches[1][1] == bytes.fromhex(store.row("2")["content_hash"])
+
+    def test_only_records_stored_before_the_call(self, store):
+        counts, batches = store.content_digests({}, start=BASE_TIME, batch_size=2, window=2)
+        assert next(counts) == 2
+        assert next(batches)[0] == ["1", "2"]
+        # Walks resume from their last key, so inserts between steps never shift them
+        store.insert(make_record("5", minute=5))
+        store.insert(make_record("0", minute=0))
+        assert sum(counts) == 2
+        assert [log_id for ids, _ in batches for log_id in ids] == ["3", "4"]
+
+
+class TestAggregate:
+    """Test vectorised aggregation over the columns"""
+
+    def test_histograms_and_counts(self, store):
+        summary = store.aggregate({"user_id": "user_b"})
+        assert summary["count"] == 2
+        assert summary["flagged"] == 1
+        assert summary["by_outcome"] == {"denied": 1, "approved": 1}
+        assert summary["by_model"] == {"gpt-4": 2}
+        assert summary["latency"]["p50"] == pytest.approx(1000, rel=0.01)
+
+    def test_range_and_unknown_values(self, store):
+        start = BASE_TIME + timedelta(minutes=3)
+        summary = store.aggregate({}, start=start)
+        assert summary["count"] == 2
+        assert summary["by_decision_type"] == {"loan_underwriting": 1, "unknown": 1}
+        assert list(summary["timestamps"]) == [epoch_ns(start), epoch_ns(start) + 60 * 10 ** 9]
+
+    def test_empty_values_group_as_unknown(self):
+        store = AuditLogStore()
+        store.insert(make_record("1", decision_outcome="", decision_type=""))
+        store.insert(make_record("2", minute=1, decision_outcome=None, decision_type=None))
+        store.insert(make_record("3", minute=2))
+        summary = store.aggregate({"user_id": "user_a"})
+        # Same breakdown as the incremental metrics an unfiltered request reads
+        assert summary["by_outcome"] == store.metrics.by_outcome == {"unknown": 2, "approved": 1}
+        assert summary["by_decision_type"] == store.metrics.by_decision_type
+        assert summary["by_decision_type"] == {"unknown": 2, "loan_underwriting": 1}
+
+    def test_out_of_order_rows(self, store):
+        store.insert(make_record("0", minute=0, duration_ms=10))
+        summary = store.aggregate({"user_id": "user_a"}, end=BASE_TIME)
+        assert summary["count"] == 1
+        assert summary["latency"]["p99"] == pytest.approx(10, rel=0.01)
+
+
+@pytest.fixture
+def tenants():
+    store = AuditLogStore()
+    for i in range(10):
+        org = "org_b" if i % 3 == 0 else "org_a"
+        store.insert(make_record(str(i), minute=i, organization_id=org, flagged=i % 2 == 0))
+    return store
+
+
+class TestPartitions:
+    """Test per-organization partitions and queries merged across them"""
+
+    def test_records_partitioned_by_organization(self, tenants):
+        assert set(tenants.partitions) == {"org_a", "org_b"}
+        assert len(tenants.partitions["org_b"]) == 4
+        assert tenants.partitions["org_b"].metrics.total == 4
+        assert tenants.metrics.total == 10
+
+    def test_organization_query_stays_in_partition(self, tenants):
+        assert page_ids(tenants.query({"organization_id": "org_b"})) == (4, ["9", "6", "3", "0"])
+        assert page_ids(tenants.query({"organization_id": "org_b", "flagged": True})) == (2, ["6", "0"])
+        assert tenants.query({"organization_id": "org_c"}) == (0, [])
+
+    def test_query_merges_partitions_by_time(self, tenants):
+        assert page_ids(tenants.query({}, limit=4)) == (10, ["9", "8", "7", "6"])
+        assert page_ids(tenants.query({"flagged": True}, limit=3, offset=1)) == (5, ["6", "4", "2"])
+
+    def test_cursor_across_partitions(self, tenants):
+        before = tenants.time_key("7")
+        assert page_ids(tenants.query({}, limit=3, before=before, count_total=False)) == (None, ["6", "5", "4"])
+
+    def test_scan_merges_partitions(self, tenants):
+        batches = [[r["id"] for r in batch] for batch in tenants.scan_range({}, batch_size=4)]
+        assert batches == [["0", "1", "2", "3"], ["4", "5", "6", "7"], ["8", "9"]]
+
+    def test_aggregate_across_partitions(self, tenants):
+        tenants.insert(make_record("10", minute=10, organization_id="org_b", duration_ms=10, model_name="claude", flagged=True))
+        summary = tenants.aggregate({"flagged": True})
+        assert summary["count"] == 6
+        assert summary["by_model"] == {"gpt-4": 5, "claude": 1}
+        assert summary["latency_by_model"]["claude"]["p50"] == pytest.approx(10, rel=0.01)
+        assert tenants.aggregate({"organization_id": "org_c"})["count"] == 0
+
+    def test_request_ids_per_organization(self, tenants):
+        assert tenants.find_request("org_b", "req_3")["id"] == "3"
+        assert tenants.find_request("org_a", "req_3") is None
+
+    def test_memory_usage_per_organization(self, tenants):
+        usage = tenants.memory_usage("org_a")
+        assert usage["total"] == sum(v for k, v in usage.items() if k != "total")
+        assert usage["columns"] > 0
+        for i in range(10, 1000):
+            tenants.insert(make_record(str(i), minute=i, organization_id="org_a"))
+        assert tenants.memory_usage("org_a")["total"] > usage["total"]
+        assert tenants.memory_usage("org_b") == tenants.partitions["org_b"].memory_usage()
+        assert tenants.memory_usage("org_c") is None
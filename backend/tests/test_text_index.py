@@ -0,0 +1,106 @@
+"""
+AI Audit Layer - Full-Text Index Tests
+"""
+
+import pytest
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from text_index import TextIndex, parse_query, tokenize
+from store import AuditLogStore
+import partition as partition_module
+from test_store import make_record
+
+
+TEXTS = {
+    "1": ("Credit score 720, DTI 35%", "APPROVED", "DTI below 40%"),
+    "2": ("Credit score 680, DTI 48%", "DENIED - DTI above 45% threshold", "DTI 48% exceeds maximum 45%"),
+    "3": ("Patient symptoms: fatigue", "Possible Type 2 Diabetes", None),
+    "4": ("Threshold above policy; DTI at 45%", "APPROVED with conditions", None),
+}
+
+
+def text_record(log_id, minute):
+    prompt, response, reasoning = TEXTS[log_id]
+    return make_record(
+        log_id, minute=minute, prompt_content=prompt, response_content=response, reasoning=reasoning
+    )
+
+
+@pytest.fixture
+def store():
+    store = AuditLogStore()
+    for minute, log_id in enumerate(TEXTS):
+        store.insert(text_record(log_id, minute))
+    return store
+
+
+def search(store, q, **kwargs):
+    total, page = store.query({}, text=parse_query(q), **kwargs)
+    return total, [r["id"] for r in page]
+
+
+class TestQueryParsing:
+    """Test tokenization and query syntax"""
+
+    def test_tokenize(self):
+        assert tokenize("DTI above 45%, debt-to-income") == ["dti", "above", "45", "debt", "to", "income"]
+        assert tokenize(None) == []
+
+    def test_parts(self):
+        query = parse_query('dti "above 45%" thresh* debt-to-income')
+        assert query.terms == ["dti", "above", "45", "debt", "to", "income"]
+        assert query.prefixes == ["thresh"]
+        assert query.phrases == [["above", "45"], ["debt", "to", "income"]]
+
+    @pytest.mark.parametrize("q", ["", "%%%", "t*", '""'])
+    def test_rejects_empty_queries(self, q):
+        with pytest.raises(ValueError):
+            parse_query(q)
+
+
+class TestTextIndex:
+    """Test posting lists and candidate intersection"""
+
+    def test_postings_hold_each_row_once(self):
+        index = TextIndex()
+        index.add(0, {"prompt_content": "dti dti", "reasoning": "DTI"})
+        index.add(1, {"response_content": "dti"})
+        assert list(index.postings["dti"]) == [0, 1]
+        assert index.vocabulary == ["dti"]
+
+    def test_vocabulary_sorted_after_new_tokens(self):
+        index = TextIndex()
+        index.add(0, {"prompt_content": "loan dti"})
+        assert index.vocabulary == ["dti", "loan"]
+        index.add(1, {"prompt_content": "debt ledger"})
+        assert index.mask(parse_query("le*"), 2).tolist() == [False, True]
+        assert index.vocabulary == ["debt", "dti", "ledger", "loan"]
+
+    def test_terms_intersect(self, store):
+        assert search(store, "dti 45") == (2, ["4", "2"])
+        assert search(store, "DTI") == (3, ["4", "2", "1"])
+        assert search(store, "unknownword dti") == (0, [])
+
+    def test_prefix(self, store):
+        assert search(store, "thresh*") == (2, ["4", "2"])
+        assert search(store, "diab* type") == (1, ["3"])
+
+    def test_phrase_checks_order(self, store):
+        # Both contain "above" and "45", only 2 has them adjacent
+        assert search(store, '"above 45"') == (1, ["2"])
+        assert search(store, '"45 above"') == (0, [])
+
+    def test_combined_with_filters_and_cursor(self, store):
+        total, page = store.query({"decision_outcome": "approved"}, text=parse_query("dti"))
+        assert (total, [r["id"] for r in page]) == (3, ["4", "2", "1"])
+        assert search(store, "dti", before=store.time_key("2")) == (1, ["1"])
+
+    def test_phrase_total_unknown_past_limit(self, store, monkeypatch):
+        monkeypatch.setattr(partition_module, "PHRASE_COUNT_LIMIT", 0)
+        assert search(store, '"credit score"', limit=1) == (None, ["2"])
+
+    def test_rebuilt_from_storage(self, store):
+        rebuilt = AuditLogStore(store.storage)
+        assert search(rebuilt, '"above 45"') == (1, ["2"])
@@ -0,0 +1,148 @@
+"""
+AI Audit Layer - Bulk Verification Tests
+"""
+
+import pytest
+import json
+import threading
+import time
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from blobs import BlobStore, DedupStorage
+from integrity import content_hash
+from storage import MemoryStorage, SegmentLogStorage, TieredStorage, source_ids
+from store import AuditLogStore
+from verification import VerificationJobs, verify_chunk
+from test_store import make_record
+
+
+def make_logged_record(log_id, response=None, **kwargs):
+    record = make_record(log_id, **kwargs)
+    record.update(prompt_hash="p" + log_id, response_content=response or "r" + log_id, model_name="gpt-4")
+    record["content_hash"] = content_hash(
+        record["timestamp"], record["prompt_hash"], record["response_content"], record["model_name"]
+    )
+    return record
+
+
+def expected_hashes(store, ids):
+    return b"".join(bytes.fromhex(store.row(log_id)["content_hash"]) for log_id in ids)
+
+
+@pytest.fixture(params=["memory", "segment", "dedup"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        storage = MemoryStorage()
+    elif request.param == "segment":
+        storage = SegmentLogStorage(str(tmp_path), segment_bytes=2048)
+    else:
+        storage = DedupStorage(
+            TieredStorage(str(tmp_path), segment_bytes=2048, demote_interval=None),
+            BlobStore(str(tmp_path / "blobs")),
+        )
+    response = "Approved after review of the full application. " * 4 if request.param == "dedup" else None
+    store = AuditLogStore(storage)
+    for i in range(20):
+        store.insert(make_logged_record(str(i), response=response, minute=i))
+    if request.param == "dedup":
+        # Older records move to the cold tier, still referencing their blobs
+        storage.inner.demote(now=4_000_000_000)
+    yield store
+    store.close()
+
+
+class TestVerifyChunk:
+    """Test rehashing records straight from a storage source"""
+
+    def test_clean_records(self, store):
+        ids = [str(i) for i in range(20)]
+        checked = 0
+        offset = 0
+        for source in store.storage.sources(ids):
+            n = len(source_ids(source))
+            count, mismatches = verify_chunk(source, expected_hashes(store, ids)[offset * 32:(offset + n) * 32])
+            checked += count
+            offset += n
+            assert mismatches == []
+        assert checked == 20
+
+    def test_altered_content(self):
+        storage = MemoryStorage()
+        store = AuditLogStore(storage)
+        for i in range(3):
+            store.insert(make_logged_record(str(i), minute=i))
+        record = json.loads(storage._records["1"])
+        record["response_content"] = "tampered"
+        storage._records["1"] = json.dumps(record).encode()
+
+        (source,) = storage.sources(["0", "1", "2"])
+        checked, mismatches = verify_chunk(source, expected_hashes(store, ["0", "1", "2"]))
+        assert checked == 3
+        assert [m["audit_log_id"] for m in mismatches] == ["1"]
+        assert mismatches[0]["reason"] == "content does not match its content_hash"
+
+    def test_missing_record(self):
+        storage = MemoryStorage()
+        store = AuditLogStore(storage)
+        store.insert(make_logged_record("0"))
+        expected = expected_hashes(store, ["0"])
+        del storage._records["0"]
+
+        (source,) = storage.sources(["0"])
+        _, mismatches = verify_chunk(source, expected)
+        assert mismatches[0]["reason"] == "record is missing from storage"
+
+
+class TestVerificationJobs:
+    """Test chunked jobs over the process pool"""
+
+    def test_job_covers_range(self, store):
+        jobs = VerificationJobs(workers=2, chunk_size=3)
+        try:
+            job = jobs.submit(store, store.row("5")["timestamp"], store.row("14")["timestamp"])
+            deadline = time.time() + 30
+            while not job.done and time.time() < deadline:
+                time.sleep(0.05)
+            assert job.status == "completed"
+            assert job.total == job.verified == 10
+            assert job.chunks_done == job.chunks_total == 4
+            assert job.mismatches == []
+        finally:
+            jobs.close()
+
+    def test_out_of_order_inserts_during_job(self):
+        store = AuditLogStore(MemoryStorage())
+        for i in range(2000):
+            store.insert(make_logged_record(str(i), minute=i))
+        jobs = VerificationJobs(workers=1, chunk_size=50, window=8)
+        done = threading.Event()
+
+        def insert_earlier():
+            # Each insert lands ahead of the whole range, shifting the time index
+            i = 0
+            while not done.is_set():
+                store.insert(make_logged_record(f"early{i}", minute=-1 - i))
+                i += 1
+
+        inserter = threading.Thread(target=insert_earlier)
+        # Switch threads often so inserts land inside the job's steps
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            inserter.start()
+            job = jobs.submit(store, store.row("0")["timestamp"], store.row("1999")["timestamp"])
+            deadline = time.time() + 60
+            while not job.done and time.time() < deadline:
+                time.sleep(0.05)
+            done.set()
+            inserter.join()
+            assert job.status == "completed"
+            assert job.total == job.verified == 2000
+            assert job.mismatches == []
+        finally:
+            sys.setswitchinterval(interval)
+            done.set()
+            jobs.close()
+            store.close()
@@ -0,0 +1,200 @@
+"""
+AI Audit Layer - Full-Text Index
+Incremental inverted index over prompt, response and reasoning text
+"""
+
+from typing import Optional, List, Dict, Set
+from array import array
+import bisect
+import re
+import sys
+
+import numpy as np
+
+
+TEXT_FIELDS = ("prompt_content", "response_content", "reasoning")
+
+# Shortest prefix a `term*` query may expand
+MIN_PREFIX = 2
+
+_TOKEN = re.compile(r"\w+")
+_QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase word tokens; punctuation and symbols separate them."""
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+class TextQuery:
+    """
+    A parsed search: every term, prefix and phrase must match.
+
+    `terms` are whole tokens, `prefixes` token prefixes and `phrases` token
+    sequences that must appear in that order within one field.
+    """
+
+    __slots__ = ("terms", "prefixes", "phrases")
+
+    def __init__(self, terms: List[str], prefixes: List[str], phrases: List[List[str]]):
+        self.terms = terms
+        self.prefixes = prefixes
+        self.phrases = phrases
+
+
+def parse_query(q: str) -> TextQuery:
+    """
+    Parse a search string: whitespace-separated terms, "quoted phrases" and
+    `prefix*` terms, all combined with AND. A bare word that splits into
+    several tokens, like debt-to-income, is taken as a phrase. Raises
+    ValueError for a query with nothing to search for.
+    """
+    terms: List[str] = []
+    prefixes: List[str] = []
+    phrases: List[List[str]] = []
+    for quoted, bare in _QUERY_PART.findall(q):
+        if bare.endswith("*"):
+            tokens = tokenize(bare[:-1])
+            if not tokens or len(tokens[-1]) < MIN_PREFIX:
+                raise ValueError(f"Prefix searches need at least {MIN_PREFIX} characters")
+            terms.extend(tokens[:-1])
+            prefixes.append(tokens[-1])
+            continue
+        tokens = tokenize(quoted or bare)
+        if len(tokens) == 1:
+            terms.append(tokens[0])
+        elif tokens:
+            phrases.append(tokens)
+            terms.extend(tokens)
+    if not terms and not prefixes:
+        raise ValueError("Search query has no words")
+    return TextQuery(terms, prefixes, phrases)
+
+
+def _contains(tokens: List[str], phrase: List[str]) -> bool:
+    n = len(phrase)
+    first = phrase[0]
+    return any(
+        tokens[i:i + n] == phrase
+        for i in range(len(tokens) - n + 1)
+        if tokens[i] == first
+    )
+
+
+class TextIndex:
+    """
+    Inverted index from token to the rows whose text contains it.
+
+    Each record's prompt, response and reasoning are tokenized once as it
+    is indexed, and its row is appended to the posting list of every
+    distinct token. Rows arrive in increasing order, so posting lists stay
+    sorted and AND queries are intersections, smallest list first.
+    Postings are packed 32-bit arrays, four bytes per (record, token).
+
+    Positions are not kept: a phrase is answered by intersecting its
+    tokens' postings, and the candidates are checked against the stored
+    text with `matches`. The sorted vocabulary makes a prefix the union of
+    one contiguous run of posting lists; it is sorted on the first prefix
+    query after new tokens arrive, so indexing never pays for keeping it
+    in order.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, array] = {}
+        self._vocabulary: Optional[List[str]] = None
+
+    @property
+    def vocabulary(self) -> List[str]:
+        """Every indexed token in sorted order."""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        return self._vocabulary
+
+    def add(self, row: int, record: dict) -> None:
+        tokens: Set[str] = set()
+        for name in TEXT_FIELDS:
+            tokens.update(tokenize(record.get(name)))
+        for token in tokens:
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = array("I")
+                self._vocabulary = None
+            posting.append(row)
+
+    def _rows(self, token: str) -> np.ndarray:
+        """
+        Return a token's posting list as a zero-copy view.
+
+        The view pins the array's buffer, so it must be dropped before the
+        index is next appended to; queries only hold it for their duration.
+        """
+        posting = self.postings.get(token)
+        if posting is None:
+            return np.empty(0, dtype=np.uint32)
+        return np.frombuffer(posting, dtype=np.uint32)
+
+    def _mark_prefix(self, prefix: str, hits: np.ndarray) -> None:
+        """Set hits for every row holding a token that starts with prefix."""
+        vocabulary = self.vocabulary
+        lo = bisect.bisect_left(vocabulary, prefix)
+        hi = bisect.bisect_left(vocabulary, prefix + "\U0010ffff")
+        for token in vocabulary[lo:hi]:
+            hits[self._rows(token)] = True
+
+    def _intersect(self, tokens: Set[str], size: int) -> np.ndarray:
+        """
+        Return the sorted rows holding every token, smallest list first.
+
+        A much longer list is probed by binary search; one of similar length
+        is marked in a mask over all rows instead, which is linear in it.
+        """
+        lists = sorted((self._rows(token) for token in tokens), key=len)
+        rows = lists[0]
+        for other in lists[1:]:
+            if not len(rows):
+                break
+            if len(rows) * 16 < len(other):
+                found = np.searchsorted(other, rows)
+                found[found == len(other)] = 0
+                rows = rows[other[found] == rows]
+            else:
+                marked = np.zeros(size, dtype=bool)
+                marked[other] = True
+                rows = rows[marked[rows]]
+        return rows
+
+    def mask(self, query: TextQuery, size: int) -> np.ndarray:
+        """
+        Return a boolean mask over rows [0, size) holding every term and prefix.
+
+        Exact for terms and prefixes; rows matching a phrase's tokens still
+        need `matches`. Prefixes are marked straight into masks, so a prefix
+        expanding to many tokens costs their postings and never a sort.
+        """
+        hits = np.zeros(size, dtype=bool)
+        if query.terms:
+            hits[self._intersect(set(query.terms), size)] = True
+        for i, prefix in enumerate(query.prefixes):
+            if i == 0 and not query.terms:
+                self._mark_prefix(prefix, hits)
+                continue
+            marked = np.zeros(size, dtype=bool)
+            self._mark_prefix(prefix, marked)
+            np.logical_and(hits, marked, out=hits)
+        return hits
+
+    @staticmethod
+    def matches(query: TextQuery, record: dict) -> bool:
+        """Check a candidate record's phrases against its text."""
+        fields = [tokenize(record.get(name)) for name in TEXT_FIELDS]
+        return all(any(_contains(tokens, phrase) for tokens in fields) for phrase in query.phrases)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the posting lists, their tokens and the vocabulary."""
+        return sys.getsizeof(self.postings) + sys.getsizeof(self._vocabulary) + sum(
+            sys.getsizeof(token) + sys.getsizeof(posting) for token, posting in self.postings.items()
+        )
+
+    def __len__(self) -> int:
+        return len(self.postings)
@@ -0,0 +1,228 @@
+"""
+AI Audit Layer - Bulk Verification Jobs
+Recompute content hashes over a date range across a process pool
+"""
+
+from typing import Optional, List, Dict, Any, Tuple, Iterator
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from uuid import uuid4
+import multiprocessing
+import os
+import threading
+
+from integrity import content_hash
+from storage import RecordSource, read_source, source_ids
+
+
+CHUNK_SIZE = 10000
+MAX_REPORTED_MISMATCHES = 1000
+
+# Time index positions masked per step of a job's walk
+WINDOW = 65536
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+def verify_chunk(source: RecordSource, expected: bytes) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Recompute the content hash of every record in a source.
+
+    `expected` holds the 32-byte hashes the store indexed for those ids, in
+    order. Returns (records checked, mismatches). Runs in a worker process.
+    """
+    mismatches = []
+    checked = 0
+    for i, (log_id, record) in enumerate(read_source(source)):
+        checked += 1
+        indexed = expected[i * 32:(i + 1) * 32].hex()
+        if record is None:
+            mismatches.append({"audit_log_id": log_id, "reason": "record is missing from storage"})
+            continue
+        computed = content_hash(
+            record["timestamp"],
+            record["prompt_hash"],
+            record["response_content"],
+            record["model_name"],
+        )
+        if computed != record.get("content_hash"):
+            reason = "content does not match its content_hash"
+        elif computed != indexed:
+            reason = "stored content_hash differs from the indexed hash"
+        else:
+            continue
+        mismatches.append({
+            "audit_log_id": log_id,
+            "reason": reason,
+            "stored_hash": record.get("content_hash"),
+            "computed_hash": computed,
+        })
+    return checked, mismatches
+
+
+class VerificationJob:
+    """Progress and findings of one bulk verification run."""
+
+    def __init__(self, start: datetime, end: datetime, organization_id: Optional[str]):
+        self.id = str(uuid4())
+        self.start = start
+        self.end = end
+        self.organization_id = organization_id
+        self.status = "pending"
+        self.total = 0
+        self.verified = 0
+        self.mismatched = 0
+        self.chunks_total = 0
+        self.chunks_done = 0
+        self.mismatches: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "start_date": self.start,
+            "end_date": self.end,
+            "organization_id": self.organization_id,
+            "total": self.total,
+            "verified": self.verified,
+            "mismatched": self.mismatched,
+            "chunks_total": self.chunks_total,
+            "chunks_done": self.chunks_done,
+            "mismatches": list(self.mismatches),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class VerificationJobs:
+    """
+    Runs bulk content hash verification in the background.
+
+    A job's thread counts the records already stored in its range, then
+    walks their ids and indexed hashes through the time index in windows
+    (see AuditLogStore.content_digests), cutting chunks as it goes and
+    fanning them out to a shared process pool; submitting never blocks the
+    API. Each step of the walk holds its partition's lock, so inserts made
+    on the event loop meanwhile cannot shift it (see Partition). Workers read records straight from the storage engine's files
+    (see StorageBackend.sources), so the API process only schedules and
+    tallies. At most two chunks per worker are in flight, keeping memory
+    flat however large the range.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE, window: int = WINDOW):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.window = window
+        self._jobs: Dict[str, VerificationJob] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Fork so workers never re-run the API module; they only need
+                # the functions of this module and storage
+                context = None
+                if "fork" in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context("fork")
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._pool
+
+    def get(self, job_id: str) -> Optional[VerificationJob]:
+        return self._jobs.get(job_id)
+
+    def submit(
+        self,
+        store,
+        start: datetime,
+        end: datetime,
+        organization_id: Optional[str] = None,
+    ) -> VerificationJob:
+        """Start verifying every log stamped in [start, end], optionally for one organization."""
+        job = VerificationJob(start, end, organization_id)
+        self._jobs[job.id] = job
+        threading.Thread(
+            target=self._run, args=(job, store), name=f"verify-{job.id}", daemon=True
+        ).start()
+        return job
+
+    def _chunks(self, batches: Iterator[Tuple[List[str], bytes]]) -> Iterator[Tuple[List[str], bytes]]:
+        """Regroup (ids, digests) batches of any size into chunks of chunk_size."""
+        ids: List[str] = []
+        digests = bytearray()
+        for batch_ids, batch_digests in batches:
+            ids += batch_ids
+            digests += batch_digests
+            while len(ids) >= self.chunk_size:
+                yield ids[:self.chunk_size], bytes(digests[:self.chunk_size * 32])
+                del ids[:self.chunk_size]
+                del digests[:self.chunk_size * 32]
+        if ids:
+            yield ids, bytes(digests)
+
+    def _run(self, job: VerificationJob, store) -> None:
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        try:
+            filters = {"organization_id": job.organization_id} if job.organization_id else {}
+            # Records stored from here on are not part of the job
+            counts, batches = store.content_digests(filters, job.start, job.end, self.chunk_size, self.window)
+            for count in counts:
+                job.total += count
+            job.chunks_total = -(-job.total // self.chunk_size)
+            storage = store.storage
+            pool = self._get_pool()
+            pending: Dict[Any, int] = {}
+            # Worker calls still running per chunk; a chunk spanning
+            # segments is one call per segment
+            remaining: Dict[int, int] = {}
+            queued = enumerate(self._chunks(batches))
+            while True:
+                while len(pending) < 2 * self.workers:
+                    item = next(queued, None)
+                    if item is None:
+                        break
+                    index, (chunk_ids, expected) = item
+                    offset = 0
+                    for source in storage.sources(chunk_ids):
+                        n = len(source_ids(source))
+                        future = pool.submit(verify_chunk, source, expected[offset * 32:(offset + n) * 32])
+                        pending[future] = index
+                        remaining[index] = remaining.get(index, 0) + 1
+                        offset += n
+                if not pending:
+                    break
+                finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index = pending.pop(future)
+                    checked, mismatches = future.result()
+                    job.verified += checked
+                    job.mismatched += len(mismatches)
+                    room = MAX_REPORTED_MISMATCHES - len(job.mismatches)
+                    job.mismatches.extend(mismatches[:max(room, 0)])
+                    remaining[index] -= 1
+                    if remaining[index] == 0:
+                        del remaining[index]
+                        job.chunks_done += 1
+            job.status = "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
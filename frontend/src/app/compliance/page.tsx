@@ -12,36 +12,37 @@ import {
 } from "lucide-react";
 
 import { useToast } from "@/components/Toast";
-import { downloadMockFile, generateMockPDFContent } from "@/lib/download";
+import { downloadBlob, downloadMockFile } from "@/lib/download";
+import { downloadReport, ReportType } from "@/lib/api";
 
 export default function Compliance() {
     const { showToast } = useToast();
 
-    const handleGenerateReport = (reportName: string) => {
+    const handleGenerateReport = async (reportName: string) => {
         showToast(`Generating ${reportName}...`, 'info');
 
-        // Simulate processing time
-        setTimeout(() => {
-            const dateStr = new Date().toISOString().split('T')[0];
-            const filename = `${reportName.replace(/\s+/g, '_').toLowerCase()}_${dateStr}`;
-
-            let content = "";
-            let type: 'pdf' | 'json' | 'yaml' = 'pdf';
+        const dateStr = new Date().toISOString().split('T')[0];
+        const filename = `${reportName.replace(/\s+/g, '_').toLowerCase()}_${dateStr}`;
 
-            if (reportName.includes("JSON")) {
-                content = JSON.stringify({ audit_log: "sample data", status: "compliant" }, null, 2);
-                type = 'json';
-            } else if (reportName.includes("YAML")) {
-                content = "ruleset:\n  - id: soc2\n    status: compliant";
-                type = 'yaml';
-            } else {
-                content = generateMockPDFContent();
-                type = 'pdf';
-            }
-
-            downloadMockFile(`${filename}.${type}`, content, type);
+        if (reportName.includes("Ruleset")) {
+            downloadMockFile(`${filename}.yaml`, "ruleset:\n  - id: soc2\n    status: compliant", 'yaml');
+            showToast(`${reportName} downloaded successfully`, 'success');
+            return;
+        }
+
+        // Reports cover the current calendar month
+        const period = dateStr.slice(0, 7);
+        const [reportType, format]: [ReportType, 'json' | 'pdf'] =
+            reportName.includes("JSON") ? ['decision_audit', 'json'] :
+            reportName.includes("Monthly") ? ['system_audit', 'pdf'] :
+            ['decision_audit', 'pdf'];
+        try {
+            downloadBlob(`${filename}.${format}`, await downloadReport(reportType, period, format));
             showToast(`${reportName} downloaded successfully`, 'success');
-        }, 1500);
+        } catch (err) {
+            console.error("Failed to generate report", err);
+            showToast(`Failed to generate ${reportName}`, 'error');
+        }
     };
 
     const handleScan = () => {
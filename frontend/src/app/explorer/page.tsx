@@ -11,34 +11,44 @@ import {
     Filter,
     ArrowUpDown
 } from "lucide-react";
-import { fetchLogs, fetchLogDetail, AuditLog, AuditLogDetail } from "@/lib/api";
+import { fetchLogs, fetchLogDetail, exportLogs, AuditLog, AuditLogDetail } from "@/lib/api";
 
-import { downloadMockFile } from "@/lib/download";
+import { downloadBlob } from "@/lib/download";
 import { useToast } from "@/components/Toast";
 
 export default function Explorer() {
     const { showToast } = useToast();
     const [logs, setLogs] = useState<AuditLog[]>([]);
     const [loading, setLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [selectedLog, setSelectedLog] = useState<AuditLogDetail | null>(null);
     const [isModalOpen, setIsModalOpen] = useState(false);
     const [search, setSearch] = useState("");
+    const [query, setQuery] = useState("");
     const [filterOutcome, setFilterOutcome] = useState("all");
 
-    const handleExport = () => {
-        showToast("Exporting 50 audit logs to CSV...", 'info');
-        setTimeout(() => {
-            const csvContent = "timestamp,decision_type,model,outcome,risk\n2024-02-01T10:00:00Z,loan_approval,gpt-4,approved,low\n2024-02-01T10:05:00Z,content_moderation,claude-3,flagged,high";
-            downloadMockFile('audit_logs.csv', csvContent, 'csv');
+    const handleExport = async () => {
+        showToast("Exporting audit logs to CSV...", 'info');
+        try {
+            const params = filterOutcome === "all" ? {} : { decision_outcome: filterOutcome };
+            downloadBlob('audit_logs.csv', await exportLogs('csv', params));
             showToast("Export complete: audit_logs.csv", 'success');
-        }, 1200);
+        } catch (err) {
+            console.error("Failed to export logs", err);
+            showToast("Failed to export audit logs", 'error');
+        }
     };
 
-    const loadData = async () => {
+    // Full-text search runs on the server; q is only sent when set
+    const searchParams = (q: string) => (q ? { q } : {});
+
+    const loadData = async (q: string = query) => {
         setLoading(true);
         try {
-            const data = await fetchLogs({ limit: 50 });
+            const data = await fetchLogs({ limit: 50, ...searchParams(q) });
             setLogs(data.logs);
+            setNextCursor(data.next_cursor);
         } catch (err) {
             console.error("Failed to load logs", err);
             showToast("Failed to load audit logs", 'error');
@@ -47,6 +57,21 @@ export default function Explorer() {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const data = await fetchLogs({ limit: 50, cursor: nextCursor, ...searchParams(query) });
+            setLogs(prev => [...prev, ...data.logs]);
+            setNextCursor(data.next_cursor);
+        } catch (err) {
+            console.error("Failed to load more logs", err);
+            showToast("Failed to load more audit logs", 'error');
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         loadData();
     }, []);
@@ -61,15 +86,15 @@ export default function Explorer() {
         }
     };
 
-    const filteredLogs = logs.filter(log => {
-        const matchesSearch =
-            log.decision_type?.toLowerCase().includes(search.toLowerCase()) ||
-            log.model_name?.toLowerCase().includes(search.toLowerCase());
-
-        const matchesOutcome = filterOutcome === "all" || log.decision_outcome === filterOutcome;
+    const submitSearch = () => {
+        const q = search.trim();
+        setQuery(q);
+        loadData(q);
+    };
 
-        return matchesSearch && matchesOutcome;
-    });
+    const filteredLogs = logs.filter(log =>
+        filterOutcome === "all" || log.decision_outcome === filterOutcome
+    );
 
     if (loading) {
         return (
@@ -107,10 +132,11 @@ export default function Explorer() {
                     <Search className="absolute left-3 top-1/2 -translate-y-1/2 text-slate-500" size={18} />
                     <input
                         type="text"
-                        placeholder="Search by decision type, model, or org..."
+                        placeholder='Search prompts, responses and reasoning: DTI "above 45%" thresh*
                         className="w-full bg-slate-950 border border-slate-800 rounded-lg py-2 pl-10 pr-4 text-sm text-slate-200 focus:outline-none focus:ring-2 focus:ring-blue-500/50 transition-all text-white"
                         value={search}
                         onChange={(e) => setSearch(e.target.value)}
+                        onKeyDown={(e) => e.key === "Enter" && submitSearch()}
                     />
                 </div>
                 <div className="flex items-center gap-4">
@@ -198,6 +224,17 @@ export default function Explorer() {
                         <p className="text-slate-500">No audit logs found matching your criteria.</p>
                     </div>
                 )}
+                {nextCursor && (
+                    <div className="p-4 border-t border-slate-800 text-center">
+                        <button
+                            onClick={loadMore}
+                            disabled={loadingMore}
+                            className="px-4 py-2 bg-slate-800 hover:bg-slate-700 disabled:opacity-50 text-white rounded-lg transition-colors text-sm font-medium border border-slate-700"
+                        >
+                            {loadingMore ? "Loading..." : "Load more"}
+                        </button>
+                    </div>
+                )}
             </div>
 
             <DetailModal
@@ -15,7 +15,7 @@ import {
   BarChart3,
   RefreshCw
 } from "lucide-react";
-import { fetchLogs, fetchMetrics, fetchLogDetail, AuditLog, Metrics, AuditLogDetail } from "@/lib/api";
+import { fetchLogs, fetchMetrics, fetchLogDetail, subscribeLive, AuditLog, Metrics, AuditLogDetail } from "@/lib/api";
 import {
   BarChart,
   Bar,
@@ -56,8 +56,12 @@ export default function Home() {
 
   useEffect(() => {
     loadData();
-    const interval = setInterval(loadData, 10000); // Auto-refresh every 10s
-    return () => clearInterval(interval);
+    // New events and metric updates are pushed by the server
+    return subscribeLive({
+      onLog: (log) => setLogs((current) => [log, ...current.filter((l) => l.id !== log.id)].slice(0, 10)),
+      onMetrics: setMetrics,
+      onResync: loadData
+    });
   }, []);
 
   const handleLogClick = async (id: string) => {
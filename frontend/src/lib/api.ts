@@ -4,6 +4,7 @@
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'https://ai-audit-layer-production.up.railway.app';
 const API_KEY = 'al_sk_demo'; // In a real app, this would come from auth
+const ORGANIZATION_ID = 'org_acme_bank'; // Likewise tied to the signed-in account
 
 export interface AuditLog {
     id: string;
@@ -28,9 +29,24 @@ export interface AuditLogDetail extends AuditLog {
     factors?: Record<string, any>;
     compliance_tags: string[];
     metadata: Record<string, any>;
+    time_to_first_token_ms?: number;
     content_hash: string;
 }
 
+export interface LogsPage {
+    total: number | null;
+    limit: number;
+    offset: number;
+    next_cursor: string | null;
+    logs: AuditLog[];
+}
+
+export interface LatencyPercentiles {
+    p50: number | null;
+    p95: number | null;
+    p99: number | null;
+}
+
 export interface Metrics {
     total_today: number;
     total_week: number;
@@ -39,12 +55,31 @@ export interface Metrics {
     denial_rate: number;
     flagged_rate: number;
     avg_duration_ms: number;
+    latency: LatencyPercentiles;
     by_outcome: Record<string, number>;
     by_model: Record<string, number>;
     by_decision_type: Record<string, number>;
+    latency_by_model: Record<string, LatencyPercentiles>;
+    latency_by_decision_type: Record<string, LatencyPercentiles>;
+}
+
+export interface TimeSeriesPoint {
+    timestamp: string;
+    count: number;
+    flagged: number;
+    avg_duration_ms: number;
+    latency: LatencyPercentiles;
+    by_outcome: Record<string, number>;
 }
 
-export const fetchLogs = async (params?: Record<string, any>) => {
+export interface TimeSeries {
+    resolution: 'minute' | 'hour' | 'day';
+    start: string;
+    end: string;
+    points: TimeSeriesPoint[];
+}
+
+export const fetchLogs = async (params?: Record<string, any>): Promise<LogsPage> => {
     const query = params ? '?' + new URLSearchParams(params).toString() : '';
     const resp = await fetch(`${API_URL}/api/v1/audit/logs${query}`, {
         headers: { 'Authorization': `Bearer ${API_KEY}` }
@@ -68,3 +103,111 @@ export const fetchMetrics = async () => {
     if (!resp.ok) throw new Error('Failed to fetch metrics');
     return resp.json();
 };
+
+export const fetchTimeSeries = async (params?: Record<string, any>): Promise<TimeSeries> => {
+    const query = params ? '?' + new URLSearchParams(params).toString() : '';
+    const resp = await fetch(`${API_URL}/api/v1/metrics/timeseries${query}`, {
+        headers: { 'Authorization': `Bearer ${API_KEY}` }
+    });
+    if (!resp.ok) throw new Error('Failed to fetch time series');
+    return resp.json();
+};
+
+export const exportLogs = async (format: 'ndjson' | 'csv' | 'parquet', params?: Record<string, any>): Promise<Blob> => {
+    const query = '?' + new URLSearchParams({ ...params, format }).toString();
+    const resp = await fetch(`${API_URL}/api/v1/audit/export${query}`, {
+        headers: { 'Authorization': `Bearer ${API_KEY}` }
+    });
+    if (!resp.ok) throw new Error('Failed to export logs');
+    return resp.blob();
+};
+
+export type ReportType = 'decision_audit' | 'system_audit';
+
+export const downloadReport = async (
+    reportType: ReportType,
+    period: string,
+    format: 'markdown' | 'json' | 'pdf'
+): Promise<Blob> => {
+    const query = '?' + new URLSearchParams({ period, format }).toString();
+    const url = `${API_URL}/api/v1/reports/${ORGANIZATION_ID}/${reportType}${query}`;
+    const headers = { 'Authorization': `Bearer ${API_KEY}` };
+    let resp = await fetch(url, { headers });
+    // Uncached system audits are built by a background job; wait for it
+    if (resp.status === 202) {
+        const job = await resp.json();
+        let status = job.status;
+        while (status === 'pending' || status === 'running') {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const poll = await fetch(`${API_URL}/api/v1/reports/jobs/${job.id}`, { headers });
+            if (!poll.ok) throw new Error('Failed to check report job');
+            status = (await poll.json()).status;
+        }
+        if (status !== 'completed') throw new Error('Report generation failed');
+        resp = await fetch(url, { headers });
+    }
+    if (!resp.ok) throw new Error('Failed to download report');
+    return resp.blob();
+};
+
+export interface LiveHandlers {
+    onLog?: (log: AuditLog) => void;
+    onMetrics?: (metrics: Metrics) => void;
+    // Events were dropped because the client fell behind; refetch
+    onResync?: () => void;
+}
+
+/**
+ * Subscribe to /api/v1/live server-sent events. EventSource cannot send the
+ * Authorization header, so the stream is read through fetch. Reconnects
+ * after a dropped connection, resyncing first. Returns an unsubscribe function.
+ */
+export const subscribeLive = (handlers: LiveHandlers, params?: Record<string, any>): (() => void) => {
+    const controller = new AbortController();
+    const query = '?' + new URLSearchParams({ ...params, metrics: String(!!handlers.onMetrics) }).toString();
+
+    const dispatch = (block: string) => {
+        let event = 'message';
+        let data = '';
+        for (const line of block.split('\n')) {
+            if (line.startsWith('event: ')) event = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        if (!data) return;
+        if (event === 'log') handlers.onLog?.(JSON.parse(data));
+        else if (event === 'metrics') handlers.onMetrics?.(JSON.parse(data));
+        else if (event === 'resync') handlers.onResync?.();
+    };
+
+    const connect = async (attempt: number): Promise<void> => {
+        try {
+            const resp = await fetch(`${API_URL}/api/v1/live${query}`, {
+                headers: { 'Authorization': `Bearer ${API_KEY}` },
+                signal: controller.signal
+            });
+            if (!resp.ok || !resp.body) throw new Error('Failed to open live feed');
+            if (attempt > 0) handlers.onResync?.();
+            attempt = 0;
+            const reader = resp.body.pipeThrough(new TextDecoderStream()).getReader();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += value;
+                const blocks = buffer.split('\n\n');
+                buffer = blocks.pop() ?? '';
+                blocks.forEach(dispatch);
+            }
+        } catch (err) {
+            if (controller.signal.aborted) return;
+            console.error('Live feed disconnected', err);
+        }
+        if (controller.signal.aborted) return;
+        const delay = Math.min(1000 * 2 ** attempt, 30000);
+        await new Promise(resolve => setTimeout(resolve, delay));
+        return connect(attempt + 1);
+    };
+
+    connect(0);
+    return () => controller.abort();
+};
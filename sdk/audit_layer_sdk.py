@@ -4,11 +4,16 @@ Drop-in replacement for OpenAI client with automatic audit logging
 """
 
 import os
+import json
 import time
 import uuid
+import atexit
 import hashlib
 import asyncio
-from typing import Optional, Any, Dict, List
+import itertools
+import threading
+from collections import deque
+from typing import Optional, Any, Dict, List, Tuple
 from dataclasses import dataclass, field, asdict
 from datetime import datetime, timezone
 
@@ -18,9 +23,20 @@ except ImportError:
     httpx = None
 
 try:
-    from openai import OpenAI
+    import h2  # enables HTTP/2 in httpx
+except ImportError:
+    h2 = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # no flock on Windows
+
+try:
+    from openai import OpenAI, AsyncOpenAI
 except ImportError:
     OpenAI = None
+    AsyncOpenAI = None
 
 
 @dataclass
@@ -32,6 +48,26 @@ class AuditConfig:
     async_logging: bool = True
     timeout_seconds: int = 5
     retry_count: int = 3
+    
+    # Background dispatcher (used when async_logging is True)
+    batch_size: int = 100
+    flush_interval_seconds: float = 1.0
+    max_queue_size: int = 10000
+    overflow_policy: str = "drop_oldest"  # "block", "drop_oldest" or "spill"
+    
+    # Connection pool shared by every request from one logger
+    max_connections: int = 10
+    max_keepalive_connections: int = 5
+    keepalive_expiry_seconds: float = 30.0
+    http2: bool = True  # used when the h2 package is installed
+    
+    # Durable spool for undelivered events, replayed once the API recovers
+    spool_dir: str = field(default_factory=lambda: os.getenv(
+        "AUDIT_LAYER_SPOOL_DIR", os.path.join(os.path.expanduser("~"), ".audit_layer", "spool")
+    ))
+    spool_segment_bytes: int = 4 * 1024 * 1024
+    spool_max_bytes: int = 256 * 1024 * 1024
+    replay_interval_seconds: float = 5.0
 
 
 @dataclass
@@ -65,14 +101,539 @@ class AuditEvent:
     risk_level: str = "low"
     
     metadata: Dict[str, Any] = field(default_factory=dict)
+    
+    # Streamed responses only: latency until the first content chunk
+    time_to_first_token_ms: Optional[int] = None
+
+
+class EventSpool:
+    """
+    Durable, append-only on-disk spool for events that could not be sent.
+    
+    Events are appended as JSON lines to numbered segment files, rotating
+    to a new segment past segment_bytes. When the spool grows beyond
+    max_bytes the oldest segments are deleted (and counted in
+    dropped_count), so an outage costs bounded disk and no memory. Readers
+    consume the oldest segment from a persisted byte offset, so replay
+    resumes where it stopped after a restart. Events the API refuses
+    outright are moved to dead-letter.jsonl for inspection; that file is
+    outside the size cap and is never replayed.
+    
+    A spool holds an exclusive flock on its directory, so two processes or
+    two loggers sharing one spool_dir never write the same segment or
+    replay each other's. While another spool holds the directory, this one
+    uses the first free pid-<pid>-<n> subdirectory of it instead; the next
+    spool to hold the directory itself takes over the segments of any such
+    subdirectory no longer locked. Without fcntl (Windows) nothing is
+    locked and each directory must have a single spool.
+    """
+    
+    def __init__(self, directory: str, segment_bytes: int, max_bytes: int):
+        self.root = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.dropped_count = 0
+        self._lock = threading.Lock()
+        self._active = None  # open file of the newest segment
+        self._active_seq: Optional[int] = None
+        self._active_size = 0
+        self._open()
+    
+    def _open(self) -> None:
+        """Claim a directory and pick up the segments already in it."""
+        self.directory, self._lock_file = self._claim(self.root)
+        segments = self._segments(self.directory)
+        self._next_seq = segments[-1] + 1 if segments else 0
+        if self._lock_file is not None and self.directory == self.root:
+            self._adopt()
+        self._total_bytes = sum(
+            os.path.getsize(self._path(seq)) for seq in self._segments(self.directory)
+        )
+    
+    @staticmethod
+    def _try_lock(directory: str) -> Optional[Any]:
+        """Return the open lock file of directory once flocked, or None if another spool holds it."""
+        lock_file = open(os.path.join(directory, ".lock"), "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return None
+        return lock_file
+    
+    @classmethod
+    def _claim(cls, directory: str) -> Tuple[str, Any]:
+        """Return the first of directory and its fallbacks that could be locked, and its lock file."""
+        fallbacks = (os.path.join(directory, f"pid-{os.getpid()}-{n}") for n in itertools.count())
+        for path in itertools.chain([directory], fallbacks):
+            os.makedirs(path, exist_ok=True)
+            if fcntl is None:
+                return path, None
+            lock_file = cls._try_lock(path)
+            if lock_file is not None:
+                return path, lock_file
+    
+    def _adopt(self) -> None:
+        """Move the segments of fallback subdirectories no spool holds any more into this one."""
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if not name.startswith("pid-") or not os.path.isdir(path):
+                continue
+            lock_file = self._try_lock(path)
+            if lock_file is None:
+                continue  # still in use
+            try:
+                for seq in self._segments(path):
+                    offset_path = os.path.join(path, f"{seq:012d}.offset")
+                    if os.path.exists(offset_path):
+                        os.replace(offset_path, self._offset_path(self._next_seq))
+                    os.replace(os.path.join(path, f"{seq:012d}.jsonl"), self._path(self._next_seq))
+                    self._next_seq += 1
+                dead_letter = os.path.join(path, "dead-letter.jsonl")
+                if os.path.exists(dead_letter):
+                    with open(dead_letter, "rb") as src, open(self.dead_letter_path, "ab") as dst:
+                        dst.write(src.read())
+                    os.remove(dead_letter)
+                os.remove(os.path.join(path, ".lock"))
+                os.rmdir(path)
+            except OSError:
+                pass  # claimed again meanwhile; its new owner keeps the rest
+            finally:
+                lock_file.close()
+    
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:012d}.jsonl")
+    
+    @property
+    def dead_letter_path(self) -> str:
+        return os.path.join(self.directory, "dead-letter.jsonl")
+    
+    def _offset_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:012d}.offset")
+    
+    @staticmethod
+    def _segments(directory: str) -> List[int]:
+        return sorted(
+            int(name[:-len(".jsonl")])
+            for name in os.listdir(directory)
+            if name.endswith(".jsonl") and name[:-len(".jsonl")].isdigit()
+        )
+    
+    def _rotate(self) -> None:
+        if self._active is not None:
+            self._active.close()
+        self._active_seq = self._next_seq
+        self._next_seq += 1
+        self._active = open(self._path(self._active_seq), "ab")
+        self._active_size = 0
+    
+    def _remove(self, seq: int) -> None:
+        path = self._path(seq)
+        self._total_bytes -= os.path.getsize(path)
+        os.remove(path)
+        if os.path.exists(self._offset_path(seq)):
+            os.remove(self._offset_path(seq))
+    
+    def append(self, events: List[Dict[str, Any]]) -> None:
+        """Append events and fsync them to disk."""
+        data = "".join(json.dumps(event, separators=(",", ":")) + "\n" for event in events).encode()
+        with self._lock:
+            if self._lock_file is None and fcntl is not None:
+                self._open()  # appended to after close()
+            if self._active is None or (self._active_size and self._active_size + len(data) > self.segment_bytes):
+                self._rotate()
+            self._active.write(data)
+            self._active.flush()
+            os.fsync(self._active.fileno())
+            self._active_size += len(data)
+            self._total_bytes += len(data)
+            
+            # Enforce the size cap by evicting the oldest closed segments
+            for seq in self._segments(self.directory):
+                if self._total_bytes <= self.max_bytes or seq == self._active_seq:
+                    break
+                with open(self._path(seq), "rb") as f:
+                    self.dropped_count += sum(1 for _ in f)
+                self._remove(seq)
+    
+    def dead_letter(self, events: List[Dict[str, Any]], status: int) -> None:
+        """Append events the API rejected with status to the dead-letter file."""
+        rejected_at = datetime.now(timezone.utc).isoformat()
+        data = "".join(
+            json.dumps({"rejected_at": rejected_at, "status": status, "event": event}, separators=(",", ":")) + "\n"
+            for event in events
+        ).encode()
+        with self._lock:
+            with open(self.dead_letter_path, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def pending(self) -> bool:
+        with self._lock:
+            return self._total_bytes > 0
+    
+    def read(self, max_events: int) -> Tuple[Optional[int], int, List[Dict[str, Any]]]:
+        """
+        Return (segment, end_offset, events) from the oldest unacknowledged
+        data, or (None, 0, []) when the spool is empty.
+        """
+        with self._lock:
+            for seq in self._segments(self.directory):
+                if seq == self._active_seq:
+                    if not self._active_size:
+                        return None, 0, []
+                    # Seal the active segment so it can be consumed
+                    self._rotate()
+                
+                offset = 0
+                if os.path.exists(self._offset_path(seq)):
+                    with open(self._offset_path(seq)) as f:
+                        offset = int(f.read() or 0)
+                if offset < os.path.getsize(self._path(seq)):
+                    break
+                # Left empty by a close() or fully consumed before a crash
+                self._remove(seq)
+            else:
+                return None, 0, []
+        
+        events = []
+        with open(self._path(seq), "rb") as f:
+            f.seek(offset)
+            while len(events) < max_events:
+                line = f.readline()
+                if not line:
+                    break
+                offset += len(line)
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # Torn write from a crash mid-append
+                    continue
+        return seq, offset, events
+    
+    def ack(self, seq: int, offset: int) -> None:
+        """Mark a segment consumed up to offset, deleting it once fully consumed."""
+        with self._lock:
+            if not os.path.exists(self._path(seq)):
+                return  # evicted by the size cap while being replayed
+            if offset >= os.path.getsize(self._path(seq)):
+                self._remove(seq)
+                return
+            tmp = self._offset_path(seq) + ".tmp"
+            with open(tmp, "w") as f:
+                f.write(str(offset))
+            os.replace(tmp, self._offset_path(seq))
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._active is not None:
+                self._active.close()
+                self._active = None
+                self._active_seq = None
+            if self._lock_file is not None:
+                # Closing the file releases the flock
+                self._lock_file.close()
+                self._lock_file = None
+
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "spill")
+
+# Client error statuses worth retrying; other 4xx responses never succeed
+RETRYABLE_STATUS = (408, 425, 429)
 
 
 class AuditLogger:
-    """Handles sending audit events to the API."""
+    """
+    Handles sending audit events to the API.
+    
+    With async_logging enabled, log() only appends the event to a bounded
+    in-memory queue. A background worker thread sends queued events to the
+    batch endpoint whenever batch_size events are waiting or the oldest has
+    waited flush_interval_seconds, and drains the queue on interpreter exit.
+    When the queue is full, overflow_policy decides what happens: "block"
+    waits for room, "drop_oldest" discards the oldest queued event and
+    "spill" writes the new event to the on-disk spool.
+    
+    Events that cannot be delivered after retries also go to the EventSpool
+    in spool_dir. A replayer thread polls /health and, once the API answers,
+    drains the spool through the batch endpoint. The server treats
+    request_id as an idempotency key, so replaying an event that did arrive
+    before a crash does not duplicate it. A batch the API refuses with a
+    status that retrying cannot fix (bad credentials, a malformed request)
+    is written to the spool's dead-letter file instead, so it cannot hold
+    up the events behind it; one too large for the server is split first.
+    
+    All requests go through one long-lived sync client and one async client
+    per event loop, so connections (and TLS sessions) are reused. Use the
+    logger as a context manager, or call close()/aclose(), to release them.
+    """
     
     def __init__(self, config: AuditConfig):
+        if config.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of: {', '.join(OVERFLOW_POLICIES)}")
         self.config = config
-        self._failed_events: List[AuditEvent] = []
+        self.dropped_count = 0
+        self.replayed_count = 0
+        self.dead_lettered_count = 0
+        self._spool = EventSpool(config.spool_dir, config.spool_segment_bytes, config.spool_max_bytes)
+        self._replayer: Optional[threading.Thread] = None
+        self._replay_lock = threading.Lock()
+        self._stop_replay = threading.Event()
+        
+        self._queue: deque = deque()  # (enqueued_at, event)
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._flush_requested = False
+        self._closed = False
+        self._worker: Optional[threading.Thread] = None
+        
+        self._client: Optional["httpx.Client"] = None
+        self._client_lock = threading.Lock()
+        # Async connections are bound to the loop that opened them
+        self._async_clients: Dict[asyncio.AbstractEventLoop, "httpx.AsyncClient"] = {}
+        
+        # Resume replaying events left over from a previous process
+        if self._spool.pending():
+            self._start_replayer()
+    
+    def log(self, event: AuditEvent) -> bool:
+        """
+        Record an audit event, in the background when async_logging is set.
+        Returns False if the event was dropped or spilled instead of queued.
+        """
+        if not self.config.async_logging:
+            return self.log_sync(event)
+        
+        with self._cond:
+            spill = self._closed
+            if not spill:
+                if self._worker is None:
+                    self._start_worker()
+                
+                if len(self._queue) >= self.config.max_queue_size:
+                    policy = self.config.overflow_policy
+                    if policy == "block":
+                        while len(self._queue) >= self.config.max_queue_size and not self._closed:
+                            self._cond.wait()
+                        spill = self._closed
+                    elif policy == "drop_oldest":
+                        self._queue.popleft()
+                        self.dropped_count += 1
+                    else:
+                        spill = True
+            
+            if not spill:
+                self._queue.append((time.monotonic(), event))
+                if len(self._queue) == 1 or len(self._queue) >= self.config.batch_size:
+                    self._cond.notify_all()
+                return True
+        
+        self._spill([event])
+        return False
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Send everything queued now and wait for it. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._queue or self._in_flight:
+                if self._worker is None or not self._worker.is_alive():
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self._flush_requested = False
+        return True
+    
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Drain the queue, stop the background threads and close the sync client."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        self._stop_replay.set()
+        if self._replayer is not None:
+            self._replayer.join(timeout)
+        self._spool.close()
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+    
+    def _start_worker(self) -> None:
+        self._worker = threading.Thread(
+            target=self._run,
+            name="audit-layer-dispatcher",
+            daemon=True
+        )
+        self._worker.start()
+        atexit.register(self.close)
+    
+    def _run(self) -> None:
+        """Worker loop: collect a batch by size or age, then send it."""
+        batch_size = self.config.batch_size
+        while True:
+            with self._cond:
+                while not (self._closed or self._flush_requested):
+                    if len(self._queue) >= batch_size:
+                        break
+                    if self._queue:
+                        age = time.monotonic() - self._queue[0][0]
+                        remaining = self.config.flush_interval_seconds - age
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                
+                if not self._queue:
+                    if self._closed:
+                        return
+                    # Flush requested on an empty queue
+                    self._flush_requested = False
+                    self._cond.notify_all()
+                    continue
+                
+                count = min(batch_size, len(self._queue))
+                batch = [self._queue.popleft()[1] for _ in range(count)]
+                self._in_flight += count
+                # Wake producers blocked on a full queue
+                self._cond.notify_all()
+            
+            try:
+                self.log_batch_sync(batch)
+            finally:
+                with self._cond:
+                    self._in_flight -= count
+                    self._cond.notify_all()
+    
+    # ------------------------------------------------------------
+    # Spool and replay
+    # ------------------------------------------------------------
+    
+    def _spill(self, events: List[AuditEvent]) -> None:
+        """Persist undelivered events and make sure the replayer is running."""
+        try:
+            self._spool.append([asdict(event) for event in events])
+        except OSError as e:
+            self.dropped_count += len(events)
+            print(f"[AuditLayer] Could not spool {len(events)} events: {e}")
+            return
+        self._start_replayer()
+    
+    def _start_replayer(self) -> None:
+        with self._replay_lock:
+            if self._replayer is not None and self._replayer.is_alive():
+                return
+            if self._stop_replay.is_set():
+                return
+            self._replayer = threading.Thread(
+                target=self._replay,
+                name="audit-layer-replayer",
+                daemon=True
+            )
+            self._replayer.start()
+    
+    def _healthy(self) -> bool:
+        try:
+            return self._get_client().get("/health").status_code == 200
+        except Exception:
+            return False
+    
+    def _replay(self) -> None:
+        """Replayer loop: wait for a healthy API, then drain the spool in batches."""
+        while not self._stop_replay.wait(self.config.replay_interval_seconds):
+            if not self._healthy():
+                continue
+            while not self._stop_replay.is_set():
+                seq, offset, records = self._spool.read(self.config.batch_size)
+                if seq is None:
+                    with self._replay_lock:
+                        # A spill that raced with this exit saw the thread
+                        # alive and did not start another; take its events
+                        if not self._spool.pending():
+                            self._replayer = None
+                            return
+                    continue
+                
+                # Drop repeats of the same request within the batch
+                unique = {}
+                for record in records:
+                    unique.setdefault(record.get("request_id"), record)
+                
+                results = self._post_batch(list(unique.values())) if unique else []
+                if results is None:
+                    break  # API went away again; retry after the next interval
+                self._spool.ack(seq, offset)
+                self.replayed_count += sum(results)
+    
+    # ------------------------------------------------------------
+    # HTTP transport
+    # ------------------------------------------------------------
+    
+    def _client_options(self) -> Dict[str, Any]:
+        """Shared options for the pooled sync and async clients."""
+        return {
+            "base_url": self.config.api_url,
+            "timeout": self.config.timeout_seconds,
+            "headers": {
+                "Authorization": f"Bearer {self.config.api_key}",
+                "Content-Type": "application/json"
+            },
+            "limits": httpx.Limits(
+                max_connections=self.config.max_connections,
+                max_keepalive_connections=self.config.max_keepalive_connections,
+                keepalive_expiry=self.config.keepalive_expiry_seconds
+            ),
+            "http2": self.config.http2 and h2 is not None,
+        }
+    
+    def _get_client(self) -> "httpx.Client":
+        """Return the long-lived sync client, creating it on first use."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(**self._client_options())
+        return self._client
+    
+    def _get_async_client(self) -> "httpx.AsyncClient":
+        """Return the long-lived async client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                # Clients of loops that have since closed can no longer be
+                # used or awaited; let them go with their loops
+                for stale in [other for other in self._async_clients if other.is_closed()]:
+                    del self._async_clients[stale]
+                client = self._async_clients[loop] = httpx.AsyncClient(**self._client_options())
+        return client
+    
+    async def aclose(self) -> None:
+        """Close the async client of the running loop. Call from each loop that used one."""
+        with self._client_lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+    
+    def __enter__(self) -> "AuditLogger":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    async def __aenter__(self) -> "AuditLogger":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+        self.close()
     
     def log_sync(self, event: AuditEvent) -> bool:
         """Send audit event synchronously. Returns True on success."""
@@ -82,24 +643,16 @@ class AuditLogger:
         
         for attempt in range(self.config.retry_count):
             try:
-                with httpx.Client(timeout=self.config.timeout_seconds) as client:
-                    response = client.post(
-                        f"{self.config.api_url}/api/v1/audit/log",
-                        json=asdict(event),
-                        headers={
-                            "Authorization": f"Bearer {self.config.api_key}",
-                            "Content-Type": "application/json"
-                        }
-                    )
-                    if response.status_code == 200:
-                        return True
-                    else:
-                        print(f"[AuditLayer] Failed to log: {response.status_code}")
+                response = self._get_client().post("/api/v1/audit/log", json=asdict(event))
+                if response.status_code == 200:
+                    return True
+                else:
+                    print(f"[AuditLayer] Failed to log: {response.status_code}")
             except Exception as e:
                 delay = (2 ** attempt) * 0.1
                 time.sleep(delay)
         
-        self._failed_events.append(event)
+        self._spill([event])
         return False
     
     async def log_async(self, event: AuditEvent) -> bool:
@@ -108,19 +661,145 @@ class AuditLogger:
             return False
         
         try:
-            async with httpx.AsyncClient(timeout=self.config.timeout_seconds) as client:
-                response = await client.post(
-                    f"{self.config.api_url}/api/v1/audit/log",
-                    json=asdict(event),
-                    headers={
-                        "Authorization": f"Bearer {self.config.api_key}",
-                        "Content-Type": "application/json"
-                    }
-                )
-                return response.status_code == 200
+            client = self._get_async_client()
+            response = await client.post("/api/v1/audit/log", json=asdict(event))
+            if response.status_code == 200:
+                return True
         except Exception:
-            self._failed_events.append(event)
-            return False
+            pass
+        self._spill([event])
+        return False
+    
+    def log_batch_sync(self, events: List[AuditEvent]) -> List[bool]:
+        """
+        Send many audit events in one request to the batch endpoint.
+        Returns one success flag per event, in order.
+        """
+        if not events:
+            return []
+        if httpx is None:
+            print("[AuditLayer] httpx not installed, skipping audit log")
+            return [False] * len(events)
+        
+        results = self._post_batch([asdict(event) for event in events])
+        if results is None:
+            self._spill(events)
+            return [False] * len(events)
+        return results
+    
+    def _post_batch(self, events: List[Dict[str, Any]]) -> Optional[List[bool]]:
+        """
+        POST serialized events to the batch endpoint with retries. Returns
+        None if they could not be delivered for now; events refused with a
+        status retrying cannot fix are dead-lettered and reported as failed.
+        """
+        for attempt in range(self.config.retry_count):
+            try:
+                response = self._get_client().post("/api/v1/audit/logs:batch", json={"events": events})
+            except Exception:
+                delay = (2 ** attempt) * 0.1
+                time.sleep(delay)
+                continue
+            status = response.status_code
+            if status == 200:
+                return self._batch_results(events, response.json())
+            print(f"[AuditLayer] Failed to log batch: {status}")
+            if status == 413 and len(events) > 1:
+                # More events than the server takes in one request
+                half = len(events) // 2
+                first = self._post_batch(events[:half])
+                second = self._post_batch(events[half:])
+                if first is None or second is None:
+                    return None
+                return first + second
+            if status < 500 and status not in RETRYABLE_STATUS:
+                self._dead_letter(events, status)
+                return [False] * len(events)
+        return None
+    
+    def _dead_letter(self, events: List[Dict[str, Any]], status: int) -> None:
+        try:
+            self._spool.dead_letter(events, status)
+        except OSError as e:
+            self.dropped_count += len(events)
+            print(f"[AuditLayer] Could not dead-letter {len(events)} events: {e}")
+            return
+        self.dead_lettered_count += len(events)
+        print(f"[AuditLayer] Moved {len(events)} rejected events to {self._spool.dead_letter_path}")
+    
+    async def log_batch_async(self, events: List[AuditEvent]) -> List[bool]:
+        """Send many audit events in one request, asynchronously."""
+        if not events:
+            return []
+        if httpx is None:
+            return [False] * len(events)
+        
+        try:
+            client = self._get_async_client()
+            response = await client.post(
+                "/api/v1/audit/logs:batch",
+                json={"events": [asdict(event) for event in events]}
+            )
+            if response.status_code == 200:
+                return self._batch_results(events, response.json())
+        except Exception:
+            pass
+        self._spill(events)
+        return [False] * len(events)
+    
+    def _batch_results(self, events: List[Any], body: Dict[str, Any]) -> List[bool]:
+        """Map batch endpoint results to per-event success flags."""
+        results = [False] * len(events)
+        for item in body.get("results", []):
+            results[item["index"]] = item["success"]
+            if not item["success"]:
+                print(f"[AuditLayer] Event rejected: {item.get('errors')}")
+        return results
+
+
+def _build_event(
+    client: Any,
+    request_id: str,
+    model: str,
+    prompt_text: str,
+    prompt_hash: str,
+    response_content: Optional[str],
+    usage: Any,
+    duration_ms: int,
+    model_kwargs: Dict[str, Any],
+    decision_type: Optional[str],
+    decision_outcome: Optional[str],
+    compliance_tags: Optional[List[str]],
+    metadata: Optional[Dict[str, Any]],
+    time_to_first_token_ms: Optional[int] = None,
+) -> AuditEvent:
+    """Build the audit event for one completion made through a wrapper client."""
+    return AuditEvent(
+        request_id=request_id,
+        timestamp=datetime.now(timezone.utc).isoformat(),
+        duration_ms=duration_ms,
+        
+        user_id=client.user_id,
+        session_id=client.session_id,
+        organization_id=client.config.org_id,
+        
+        prompt_hash=prompt_hash,
+        prompt_content=prompt_text,
+        prompt_tokens=usage.prompt_tokens if usage else 0,
+        
+        response_content=response_content or "",
+        response_tokens=usage.completion_tokens if usage else 0,
+        
+        model_provider="openai",
+        model_name=model,
+        model_parameters={k: v for k, v in model_kwargs.items() if k in ["temperature", "max_tokens", "top_p"]},
+        
+        decision_type=decision_type,
+        decision_outcome=decision_outcome,
+        compliance_tags=compliance_tags or [],
+        metadata=metadata or {},
+        time_to_first_token_ms=time_to_first_token_ms
+    )
 
 
 class AuditOpenAI:
@@ -195,38 +874,214 @@ class AuditOpenAI:
             response_content = response.choices[0].message.content if response.choices else ""
             usage = response.usage
             
-            # Build audit event
-            event = AuditEvent(
+            event = _build_event(
+                self._parent,
                 request_id=request_id,
-                timestamp=datetime.now(timezone.utc).isoformat(),
-                duration_ms=duration_ms,
-                
-                user_id=self._parent.user_id,
-                session_id=self._parent.session_id,
-                organization_id=self._parent.config.org_id,
-                
+                model=model,
+                prompt_text=prompt_text,
                 prompt_hash=prompt_hash,
-                prompt_content=prompt_text,
-                prompt_tokens=usage.prompt_tokens if usage else 0,
-                
-                response_content=response_content or "",
-                response_tokens=usage.completion_tokens if usage else 0,
-                
-                model_provider="openai",
-                model_name=model,
-                model_parameters={k: v for k, v in kwargs.items() if k in ["temperature", "max_tokens", "top_p"]},
-                
+                response_content=response_content,
+                usage=usage,
+                duration_ms=duration_ms,
+                model_kwargs=kwargs,
                 decision_type=decision_type,
                 decision_outcome=decision_outcome,
-                compliance_tags=compliance_tags or [],
-                metadata=metadata or {}
+                compliance_tags=compliance_tags,
+                metadata=metadata
             )
             
-            # Log (non-blocking in background)
-            self._parent._logger.log_sync(event)
+            # Queue for the background dispatcher; only blocks if async_logging is off
+            self._parent._logger.log(event)
             
             return response
 
 
+class _AuditedAsyncStream:
+    """
+    Pass-through async iterator over a streamed chat completion.
+    
+    Chunks are handed to the caller as they arrive; the response text,
+    usage and time to first token are collected on the side and the audit
+    event is sent once the stream is exhausted, closed or fails.
+    """
+    
+    def __init__(self, stream: Any, start_time: float, on_complete: Any):
+        self._stream = stream
+        self._start_time = start_time
+        self._on_complete = on_complete
+        self._parts: List[str] = []
+        self._usage = None
+        self._first_token_ms: Optional[int] = None
+        self._done = False
+    
+    def __aiter__(self) -> "_AuditedAsyncStream":
+        return self
+    
+    async def __anext__(self) -> Any:
+        try:
+            chunk = await self._stream.__anext__()
+        except StopAsyncIteration:
+            self._finish()
+            raise
+        except Exception as e:
+            self._finish(error=repr(e))
+            raise
+        
+        if chunk.choices:
+            content = chunk.choices[0].delta.content
+            if content:
+                if self._first_token_ms is None:
+                    self._first_token_ms = int((time.perf_counter() - self._start_time) * 1000)
+                self._parts.append(content)
+        if getattr(chunk, "usage", None) is not None:
+            self._usage = chunk.usage
+        return chunk
+    
+    async def close(self) -> None:
+        """Close the underlying stream, logging whatever was received."""
+        try:
+            await self._stream.close()
+        finally:
+            self._finish()
+    
+    async def __aenter__(self) -> "_AuditedAsyncStream":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+    
+    def _finish(self, error: Optional[str] = None) -> None:
+        if self._done:
+            return
+        self._done = True
+        duration_ms = int((time.perf_counter() - self._start_time) * 1000)
+        self._on_complete("".join(self._parts), self._usage, duration_ms, self._first_token_ms, error)
+
+
+class AuditAsyncOpenAI:
+    """
+    Async drop-in replacement for the OpenAI client with automatic audit
+    logging, including streamed completions.
+    
+    Usage:
+        from audit_layer_sdk import AuditAsyncOpenAI
+        
+        client = AuditAsyncOpenAI(user_id="user_123")
+        
+        stream = await client.chat.completions.create(
+            model="gpt-4-turbo",
+            messages=[{"role": "user", "content": "Hello"}],
+            stream=True,
+            decision_type="customer_support"
+        )
+        async for chunk in stream:
+            ...
+    
+    Audit events are sent with AuditLogger.log_async in a background task
+    once the response (or stream) completes, so they never delay the call
+    or its first chunk.
+    """
+    
+    def __init__(
+        self,
+        user_id: str,
+        session_id: Optional[str] = None,
+        config: Optional[AuditConfig] = None,
+        openai_api_key: Optional[str] = None,
+    ):
+        self.user_id = user_id
+        self.session_id = session_id or str(uuid.uuid4())
+        self.config = config or AuditConfig()
+        
+        if AsyncOpenAI is None:
+            raise ImportError("openai package not installed. Run: pip install openai")
+        
+        self._openai = AsyncOpenAI(api_key=openai_api_key)
+        self._logger = AuditLogger(self.config)
+        self._pending: set = set()
+        self.chat = self._ChatCompletions(self)
+    
+    def _submit(self, event: AuditEvent) -> None:
+        """Send an event in the background, holding the task until it finishes."""
+        task = asyncio.get_running_loop().create_task(self._logger.log_async(event))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+    
+    async def aclose(self) -> None:
+        """Wait for in-flight audit events, then release the logger's connections."""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        await self._logger.aclose()
+        self._logger.close()
+    
+    async def __aenter__(self) -> "AuditAsyncOpenAI":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+    
+    class _ChatCompletions:
+        """Wrapper for chat.completions namespace."""
+        
+        def __init__(self, parent: "AuditAsyncOpenAI"):
+            self._parent = parent
+            self.completions = self
+        
+        async def create(
+            self,
+            model: str,
+            messages: List[Dict[str, str]],
+            decision_type: Optional[str] = None,
+            decision_outcome: Optional[str] = None,
+            compliance_tags: Optional[List[str]] = None,
+            metadata: Optional[Dict[str, Any]] = None,
+            **kwargs
+        ) -> Any:
+            """Create a chat completion (streamed or not) with automatic audit logging."""
+            request_id = str(uuid.uuid4())
+            start_time = time.perf_counter()
+            
+            prompt_text = "\n".join(m.get("content", "") for m in messages)
+            prompt_hash = hashlib.sha256(prompt_text.encode()).hexdigest()
+            
+            def submit(response_content, usage, duration_ms, first_token_ms=None, error=None):
+                event_metadata = dict(metadata or {})
+                if error is not None:
+                    event_metadata["stream_error"] = error
+                self._parent._submit(_build_event(
+                    self._parent,
+                    request_id=request_id,
+                    model=model,
+                    prompt_text=prompt_text,
+                    prompt_hash=prompt_hash,
+                    response_content=response_content,
+                    usage=usage,
+                    duration_ms=duration_ms,
+                    model_kwargs=kwargs,
+                    decision_type=decision_type,
+                    decision_outcome=decision_outcome,
+                    compliance_tags=compliance_tags,
+                    metadata=event_metadata,
+                    time_to_first_token_ms=first_token_ms
+                ))
+            
+            response = await self._parent._openai.chat.completions.create(
+                model=model,
+                messages=messages,
+                **kwargs
+            )
+            
+            if kwargs.get("stream"):
+                return _AuditedAsyncStream(response, start_time, submit)
+            
+            duration_ms = int((time.perf_counter() - start_time) * 1000)
+            response_content = response.choices[0].message.content if response.choices else ""
+            submit(response_content, response.usage, duration_ms)
+            return response
+
+
 # Export main classes
-__all__ = ["AuditOpenAI", "AuditConfig", "AuditEvent", "AuditLogger"]
+__all__ = ["AuditOpenAI", "AuditAsyncOpenAI", "AuditConfig", "AuditEvent", "AuditLogger"]
@@ -0,0 +1,410 @@
+"""
+AI Audit Layer - SDK Tests
+"""
+
+import pytest
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audit_layer_sdk import AuditConfig, AuditEvent, AuditLogger, EventSpool
+
+
+def make_event(request_id, **overrides):
+    fields = dict(
+        request_id=request_id,
+        timestamp="2024-01-01T00:00:00+00:00",
+        duration_ms=100,
+        user_id="user_1",
+        session_id=None,
+        organization_id="org_1",
+        prompt_hash="0" * 64,
+        prompt_content="prompt",
+        prompt_tokens=1,
+        response_content="response",
+        response_tokens=1,
+        model_provider="openai",
+        model_name="gpt-4",
+        model_parameters={},
+    )
+    fields.update(overrides)
+    return AuditEvent(**fields)
+
+
+def batch_ok(request):
+    events = json.loads(request.content)["events"]
+    return httpx.Response(200, json={
+        "results": [{"index": i, "success": True} for i in range(len(events))]
+    })
+
+
+def make_logger(tmp_path, handler, **config):
+    """Logger whose pooled clients send every request to handler."""
+    config.setdefault("spool_dir", str(tmp_path / "spool"))
+    logger = AuditLogger(AuditConfig(**config))
+    options = logger._client_options
+    logger._client_options = lambda: {**options(), "transport": httpx.MockTransport(handler)}
+    return logger
+
+
+class TestAsyncClients:
+    def test_one_client_per_loop(self, tmp_path):
+        logger = make_logger(tmp_path, batch_ok)
+
+        async def run():
+            client = logger._get_async_client()
+            assert logger._get_async_client() is client
+            assert await logger.log_batch_async([make_event("1")]) == [True]
+            return client
+
+        first = asyncio.run(run())
+        second = asyncio.run(run())
+        assert second is not first
+        # The client of the closed first loop is let go, not kept around
+        assert list(logger._async_clients.values()) == [second]
+        logger.close()
+
+    def test_aclose_closes_running_loop_client(self, tmp_path):
+        logger = make_logger(tmp_path, batch_ok)
+
+        async def run():
+            client = logger._get_async_client()
+            await logger.aclose()
+            return client
+
+        client = asyncio.run(run())
+        assert client.is_closed
+        assert logger._async_clients == {}
+        logger.close()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+class Server:
+    """
+    Stub API: healthy or down, recording the request_ids of each batch.
+    Batches wait for `gate` to be set, so a test can hold the sender.
+    """
+
+    def __init__(self, status=200, max_batch=None):
+        self.status = status
+        self.max_batch = max_batch
+        self.batches = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, request):
+        if self.status is None:
+            raise httpx.ConnectError("down", request=request)
+        if request.url.path == "/health":
+            return httpx.Response(200)
+        self.gate.wait(5)
+        events = json.loads(request.content)["events"]
+        if self.max_batch is not None and len(events) > self.max_batch:
+            return httpx.Response(413)
+        if self.status != 200:
+            return httpx.Response(self.status)
+        self.batches.append([event["request_id"] for event in events])
+        return batch_ok(request)
+
+    @property
+    def delivered(self):
+        return [request_id for batch in self.batches for request_id in batch]
+
+
+class TestEventSpool:
+    def test_read_and_ack_resume_after_reopen(self, tmp_path):
+        spool = EventSpool(str(tmp_path), 1 << 20, 1 << 30)
+        spool.append([{"request_id": str(i)} for i in range(5)])
+        seq, offset, events = spool.read(2)
+        assert [e["request_id"] for e in events] == ["0", "1"]
+        spool.ack(seq, offset)
+        spool.close()
+
+        spool = EventSpool(str(tmp_path), 1 << 20, 1 << 30)
+        seq, offset, events = spool.read(10)
+        assert [e["request_id"] for e in events] == ["2", "3", "4"]
+        spool.ack(seq, offset)
+        assert not spool.pending()
+        spool.close()
+
+    def test_skips_torn_line(self, tmp_path):
+        spool = EventSpool(str(tmp_path), 1 << 20, 1 << 30)
+        spool.append([{"request_id": "1"}])
+        spool.close()
+        with open(tmp_path / f"{0:012d}.jsonl", "ab") as f:
+            f.write(b'{"request_id": "2", "tor')
+        spool = EventSpool(str(tmp_path), 1 << 20, 1 << 30)
+        seq, offset, events = spool.read(10)
+        assert events == [{"request_id": "1"}]
+        spool.ack(seq, offset)
+        assert not spool.pending()
+        spool.close()
+
+    def test_size_cap_evicts_oldest_segments(self, tmp_path):
+        spool = EventSpool(str(tmp_path), segment_bytes=64, max_bytes=200)
+        for i in range(20):
+            spool.append([{"request_id": f"{i:04d}"}])
+        assert spool.dropped_count > 0
+        kept = []
+        while True:
+            seq, offset, events = spool.read(100)
+            if seq is None:
+                break
+            kept += [e["request_id"] for e in events]
+            spool.ack(seq, offset)
+        assert len(kept) + spool.dropped_count == 20
+        assert kept == [f"{i:04d}" for i in range(20 - len(kept), 20)]
+        spool.close()
+
+    def test_two_spools_on_one_directory(self, tmp_path):
+        first = EventSpool(str(tmp_path), 1 << 20, 1 << 30)
+        second = EventSpool(str(tmp_path), 1 << 20, 1 << 30)
+        assert first.directory == str(tmp_path)
+        assert second.directory == str(tmp_path / f"pid-{os.getpid()}-0")
+        first.append([{"request_id": "1"}])
+        second.append([{"request_id": "2"}, {"request_id": "3"}])
+
+        seq, offset, events = first.read(10)
+        assert [e["request_id"] for e in events] == ["1"]
+        first.ack(seq, offset)
+        assert not first.pending()
+        assert second.pending()
+        first.close()
+        second.close()
+
+        # The next spool to hold the directory takes over the fallback's events
+        spool = EventSpool(str(tmp_path), 1 << 20, 1 << 30)
+        assert spool.directory == str(tmp_path)
+        assert not os.path.exists(second.directory)
+        seq, offset, events = spool.read(10)
+        assert [e["request_id"] for e in events] == ["2", "3"]
+        spool.ack(seq, offset)
+        assert not spool.pending()
+        spool.close()
+
+    def test_append_after_close_locks_again(self, tmp_path):
+        spool = EventSpool(str(tmp_path), 1 << 20, 1 << 30)
+        spool.close()
+        spool.append([{"request_id": "1"}])
+        other = EventSpool(str(tmp_path), 1 << 20, 1 << 30)
+        assert other.directory != spool.directory
+        other.close()
+        spool.close()
+
+
+class TestReplay:
+    def test_undelivered_batch_is_spooled_and_replayed(self, tmp_path):
+        server = Server(status=None)
+        logger = make_logger(tmp_path, server, retry_count=1, replay_interval_seconds=0.01)
+        assert logger.log_batch_sync([make_event("1"), make_event("2")]) == [False, False]
+        assert logger._spool.pending()
+
+        server.status = 200
+        wait_for(lambda: logger.replayed_count == 2)
+        assert server.delivered == ["1", "2"]
+        assert not logger._spool.pending()
+        logger.close()
+
+    def test_pending_events_replayed_on_startup(self, tmp_path):
+        spool = EventSpool(str(tmp_path / "spool"), 1 << 20, 1 << 30)
+        spool.append([{"request_id": "1"}, {"request_id": "1"}, {"request_id": "2"}])
+        spool.close()
+
+        server = Server()
+        logger = make_logger(tmp_path, server, replay_interval_seconds=0.01)
+        logger._start_replayer()
+        wait_for(lambda: not logger._spool.pending())
+        # Repeats of a request_id within a batch are sent once
+        assert server.delivered == ["1", "2"]
+        logger.close()
+
+    def test_spill_while_replayer_exits_is_not_stranded(self, tmp_path):
+        server = Server()
+        logger = make_logger(tmp_path, server, replay_interval_seconds=0.01)
+        spool_read = logger._spool.read
+        raced = []
+
+        def read(max_events):
+            result = spool_read(max_events)
+            if result[0] is None and not raced:
+                # A spill lands after the replayer found the spool empty, and
+                # sees the thread still alive so starts no other
+                raced.append(True)
+                logger._spool.append([{"request_id": "late"}])
+                logger._start_replayer()
+            return result
+
+        logger._spool.read = read
+        logger._spill([make_event("1")])
+        wait_for(lambda: server.delivered == ["1", "late"])
+        wait_for(lambda: not logger._spool.pending())
+        logger.close()
+
+    def test_rejected_batch_is_dead_lettered(self, tmp_path):
+        server = Server(status=None)
+        logger = make_logger(tmp_path, server, retry_count=1, replay_interval_seconds=0.01)
+        logger.log_batch_sync([make_event("1")])
+
+        # Bad credentials never succeed; the spool must not stall on them
+        server.status = 401
+        wait_for(lambda: not logger._spool.pending())
+        assert logger.dead_lettered_count == 1
+        assert logger.replayed_count == 0
+        with open(logger._spool.dead_letter_path) as f:
+            lines = [json.loads(line) for line in f]
+        assert [(line["status"], line["event"]["request_id"]) for line in lines] == [(401, "1")]
+
+        server.status = 200
+        logger._spill([make_event("2")])
+        wait_for(lambda: server.delivered == ["2"])
+        logger.close()
+
+    def test_oversized_batch_is_split(self, tmp_path):
+        server = Server(max_batch=2)
+        logger = make_logger(tmp_path, server)
+        assert logger.log_batch_sync([make_event(str(i)) for i in range(5)]) == [True] * 5
+        assert server.delivered == ["0", "1", "2", "3", "4"]
+        assert all(len(batch) <= 2 for batch in server.batches)
+        assert logger.dead_lettered_count == 0
+        logger.close()
+
+    def test_server_error_is_retried_not_dead_lettered(self, tmp_path):
+        server = Server(status=503)
+        logger = make_logger(tmp_path, server, retry_count=2, replay_interval_seconds=60)
+        assert logger.log_batch_sync([make_event("1")]) == [False]
+        assert logger._spool.pending()
+        assert logger.dead_lettered_count == 0
+        logger.close()
+
+
+class TestBackgroundQueue:
+    def held_logger(self, tmp_path, server, policy):
+        """Logger with one event held in flight and a full queue of two behind it."""
+        logger = make_logger(
+            tmp_path, server, batch_size=1, max_queue_size=2,
+            overflow_policy=policy, replay_interval_seconds=60
+        )
+        server.gate.clear()
+        assert logger.log(make_event("0"))
+        wait_for(lambda: logger._in_flight == 1)
+        assert logger.log(make_event("1"))
+        assert logger.log(make_event("2"))
+        return logger
+
+    def test_sends_batch_once_full(self, tmp_path):
+        server = Server()
+        logger = make_logger(tmp_path, server, batch_size=3, flush_interval_seconds=60)
+        for i in range(3):
+            assert logger.log(make_event(str(i)))
+        wait_for(lambda: server.delivered == ["0", "1", "2"])
+        assert server.batches == [["0", "1", "2"]]
+        logger.close()
+
+    def test_sends_partial_batch_after_interval(self, tmp_path):
+        server = Server()
+        logger = make_logger(tmp_path, server, batch_size=100, flush_interval_seconds=0.05)
+        logger.log(make_event("1"))
+        wait_for(lambda: server.delivered == ["1"])
+        logger.close()
+
+    def test_flush_sends_queued_events_in_order(self, tmp_path):
+        server = Server()
+        logger = make_logger(tmp_path, server, batch_size=2, flush_interval_seconds=60)
+        for i in range(5):
+            logger.log(make_event(str(i)))
+        assert logger.flush(timeout=5)
+        assert server.delivered == ["0", "1", "2", "3", "4"]
+        assert all(len(batch) <= 2 for batch in server.batches)
+        logger.log(make_event("5"))
+        assert logger.flush(timeout=5)
+        assert server.delivered[-1] == "5"
+        logger.close()
+
+    def test_flush_times_out_while_send_is_held(self, tmp_path):
+        server = Server()
+        logger = self.held_logger(tmp_path, server, "drop_oldest")
+        assert not logger.flush(timeout=0.05)
+        server.gate.set()
+        assert logger.flush(timeout=5)
+        logger.close()
+
+    def test_drop_oldest_policy(self, tmp_path):
+        server = Server()
+        logger = self.held_logger(tmp_path, server, "drop_oldest")
+        assert logger.log(make_event("3"))
+        assert logger.dropped_count == 1
+        server.gate.set()
+        assert logger.flush(timeout=5)
+        assert server.delivered == ["0", "2", "3"]
+        logger.close()
+
+    def test_spill_policy(self, tmp_path):
+        server = Server()
+        logger = self.held_logger(tmp_path, server, "spill")
+        assert not logger.log(make_event("3"))
+        assert logger.dropped_count == 0
+        server.gate.set()
+        assert logger.flush(timeout=5)
+        assert server.delivered == ["0", "1", "2"]
+        seq, offset, events = logger._spool.read(10)
+        assert [event["request_id"] for event in events] == ["3"]
+        logger.close()
+
+    def test_block_policy_waits_for_room(self, tmp_path):
+        server = Server()
+        logger = self.held_logger(tmp_path, server, "block")
+        results = []
+        producer = threading.Thread(target=lambda: results.append(logger.log(make_event("3"))))
+        producer.start()
+        producer.join(0.1)
+        assert producer.is_alive()
+
+        server.gate.set()
+        producer.join(5)
+        assert results == [True]
+        assert logger.flush(timeout=5)
+        assert server.delivered == ["0", "1", "2", "3"]
+        assert logger.dropped_count == 0
+        logger.close()
+
+    def test_close_spills_blocked_producer(self, tmp_path):
+        server = Server()
+        logger = self.held_logger(tmp_path, server, "block")
+        results = []
+        producer = threading.Thread(target=lambda: results.append(logger.log(make_event("3"))))
+        producer.start()
+        producer.join(0.1)
+
+        closer = threading.Thread(target=logger.close)
+        closer.start()
+        producer.join(5)
+        assert results == [False]
+        server.gate.set()
+        closer.join(5)
+        assert server.delivered == ["0", "1", "2"]
+
+    def test_close_drains_queue(self, tmp_path):
+        server = Server()
+        logger = make_logger(tmp_path, server, batch_size=100, flush_interval_seconds=60)
+        for i in range(3):
+            logger.log(make_event(str(i)))
+        logger.close()
+        assert server.delivered == ["0", "1", "2"]
+        assert not logger._worker.is_alive()
+
+        # Events logged after close go to the spool rather than being lost
+        assert not logger.log(make_event("3"))
+        assert logger._spool.pending()